@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+账户注册状态位图
+每个前缀一个文件，按整数索引记录注册状态（2位: 未知/已注册/未注册）和最近一次检查的日期（2字节天数），
+10万个账户约225KB，跨运行持久化：
+- check_account_status.py 只检查未知或超过有效期的索引，检查结果写回位图
+- get_invitation_codes.py / turbo / stable 加 --skip-unregistered 后，已知未注册的账户直接跳过，不再浪费一次认证请求
+
+用法:
+    python3 account_registry.py stats --prefix loadtestc --start 1 --end 30000
+    python3 account_registry.py import results/loadtestc_verification_complete_20250808_143022.json
+    python3 account_registry.py export --state unregistered --out results/loadtestc_unregistered.txt
+"""
+
+import argparse
+import json
+import os
+import re
+import struct
+import threading
+import time
+from typing import Dict, Iterator, Optional
+
+# 注册状态（2位）
+UNKNOWN = 0
+REGISTERED = 1
+UNREGISTERED = 2
+STATE_NAMES = {UNKNOWN: 'unknown', REGISTERED: 'registered', UNREGISTERED: 'unregistered'}
+
+# 头部: 魔数 + 容量（可记录的最大索引+1）
+_HEADER_FORMAT = '<8sI4x'
+_HEADER_SIZE = struct.calcsize(_HEADER_FORMAT)
+_MAGIC = b'LTREG001'
+_SECONDS_PER_DAY = 86400
+
+
+def today() -> int:
+    """当前日期（1970-01-01起的天数）；0保留表示从未检查"""
+    return int(time.time() // _SECONDS_PER_DAY)
+
+
+class AccountRegistry:
+    """单个前缀的注册状态位图（线程安全；只在save时整体落盘）"""
+
+    DEFAULT_DIR = "results/registry"
+    # 检查结果的默认有效期（天），超过后视为需要重新检查
+    DEFAULT_MAX_AGE_DAYS = 7
+
+    def __init__(self, prefix: str, directory: str = DEFAULT_DIR):
+        self.prefix = prefix
+        self.path = os.path.join(directory, f"{prefix}.bin")
+        self.lock = threading.Lock()
+        self.capacity = 0
+        # 每字节4个索引的2位状态
+        self.states = bytearray()
+        # 每个索引的检查日期（uint16天数）
+        self.days = memoryview(bytearray()).cast('H')
+        self.dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        magic, capacity = struct.unpack_from(_HEADER_FORMAT, data, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{self.path} 不是注册状态位图文件")
+        states_size = (capacity + 3) // 4
+        self.capacity = capacity
+        self.states = bytearray(data[_HEADER_SIZE:_HEADER_SIZE + states_size])
+        days_offset = _HEADER_SIZE + states_size
+        self.days = memoryview(bytearray(data[days_offset:days_offset + capacity * 2])).cast('H')
+
+    def _grow(self, index: int):
+        """扩容到能容纳index（按4096对齐，避免逐个扩容）"""
+        capacity = (index // 4096 + 1) * 4096
+        states = bytearray((capacity + 3) // 4)
+        states[:len(self.states)] = self.states
+        days = bytearray(capacity * 2)
+        days[:len(self.days) * 2] = self.days.tobytes()
+        self.states = states
+        self.days = memoryview(days).cast('H')
+        self.capacity = capacity
+
+    def state(self, index: int) -> int:
+        if index >= self.capacity or index < 0:
+            return UNKNOWN
+        return (self.states[index >> 2] >> ((index & 3) * 2)) & 3
+
+    def checked_day(self, index: int) -> int:
+        return self.days[index] if 0 <= index < self.capacity else 0
+
+    def set(self, index: int, state: int, day: Optional[int] = None):
+        """记录检查结果"""
+        with self.lock:
+            if index >= self.capacity:
+                self._grow(index)
+            shift = (index & 3) * 2
+            self.states[index >> 2] = (self.states[index >> 2] & ~(3 << shift) & 0xFF) | (state << shift)
+            self.days[index] = today() if day is None else day
+            self.dirty = True
+
+    def is_unregistered(self, index: int) -> bool:
+        return self.state(index) == UNREGISTERED
+
+    def needs_check(self, index: int, max_age_days: int = DEFAULT_MAX_AGE_DAYS, now_day: Optional[int] = None) -> bool:
+        """状态未知或检查结果已超过有效期"""
+        if self.state(index) == UNKNOWN:
+            return True
+        now_day = today() if now_day is None else now_day
+        return now_day - self.checked_day(index) > max_age_days
+
+    def stale_indices(self, start: int, end: int, max_age_days: int = DEFAULT_MAX_AGE_DAYS) -> Iterator[int]:
+        """惰性产出范围内需要检查的索引"""
+        now_day = today()
+        for index in range(start, end + 1):
+            if self.needs_check(index, max_age_days, now_day):
+                yield index
+
+    def counts(self, start: int, end: int) -> Dict[str, int]:
+        """范围内各状态的数量"""
+        counts = {name: 0 for name in STATE_NAMES.values()}
+        for index in range(start, end + 1):
+            counts[STATE_NAMES[self.state(index)]] += 1
+        return counts
+
+    def indices(self, state: int, start: int = 0, end: Optional[int] = None) -> Iterator[int]:
+        """按顺序产出处于某个状态的索引"""
+        end = self.capacity - 1 if end is None else end
+        for index in range(start, end + 1):
+            if self.state(index) == state:
+                yield index
+
+    def save(self):
+        """原子写入（先写临时文件再rename，读取方不会读到写了一半的位图）"""
+        with self.lock:
+            if not self.dirty:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(struct.pack(_HEADER_FORMAT, _MAGIC, self.capacity))
+                f.write(self.states)
+                f.write(self.days.tobytes())
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+
+    def import_results(self, path: str) -> int:
+        """导入旧版检查结果（*_verification_complete_*.json 或 registered/unregistered 的txt列表），返回导入数量"""
+        pattern = re.compile(rf"^{re.escape(self.prefix)}(\d+)@")
+        day = int(os.path.getmtime(path) // _SECONDS_PER_DAY)
+        if path.endswith(".json"):
+            with open(path, 'r', encoding='utf-8') as f:
+                groups = json.load(f)
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                emails = [line.strip() for line in f if line.strip()]
+            groups = {'unregistered' if '_unregistered_' in os.path.basename(path) else 'registered': emails}
+
+        imported = 0
+        for name, state in (('registered', REGISTERED), ('unregistered', UNREGISTERED)):
+            for email in groups.get(name, []):
+                match = pattern.match(email)
+                if match:
+                    self.set(int(match.group(1)), state, day)
+                    imported += 1
+        return imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description='🗂️ 账户注册状态位图工具')
+    parser.add_argument('--prefix', '-p', default="loadtestc", help='邮箱前缀')
+    parser.add_argument('--registry-dir', default=AccountRegistry.DEFAULT_DIR, help='位图文件目录')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    stats_parser = subparsers.add_parser('stats', help='查看范围内各状态的数量')
+    stats_parser.add_argument('--start', type=int, default=1, help='起始索引')
+    stats_parser.add_argument('--end', type=int, default=30000, help='结束索引')
+    stats_parser.add_argument('--max-age-days', type=int, default=AccountRegistry.DEFAULT_MAX_AGE_DAYS,
+                              help='检查结果有效期(天)')
+
+    import_parser = subparsers.add_parser('import', help='导入旧版检查结果文件')
+    import_parser.add_argument('files', nargs='+')
+
+    export_parser = subparsers.add_parser('export', help='导出某个状态的邮箱列表')
+    export_parser.add_argument('--state', choices=['registered', 'unregistered'], default='registered')
+    export_parser.add_argument('--out', required=True, help='输出文件路径')
+
+    args = parser.parse_args()
+    registry = AccountRegistry(args.prefix, args.registry_dir)
+
+    if args.command == 'stats':
+        counts = registry.counts(args.start, args.end)
+        stale = sum(1 for _ in registry.stale_indices(args.start, args.end, args.max_age_days))
+        print(f"📈 {args.prefix}{args.start} - {args.prefix}{args.end}:")
+        print(f"   ✅ 已注册: {counts['registered']}")
+        print(f"   ❌ 未注册: {counts['unregistered']}")
+        print(f"   ❔ 未知: {counts['unknown']}")
+        print(f"   🔄 需要检查(未知或超过{args.max_age_days}天): {stale}")
+    elif args.command == 'import':
+        for path in args.files:
+            print(f"📥 {path}: 导入 {registry.import_results(path)} 个账户状态")
+        registry.save()
+    elif args.command == 'export':
+        state = REGISTERED if args.state == 'registered' else UNREGISTERED
+        count = 0
+        with open(args.out, 'w', encoding='utf-8') as f:
+            for index in registry.indices(state):
+                f.write(f"{args.prefix}{index}@teml.net\n")
+                count += 1
+        print(f"📁 已导出 {count} 个{args.state}账户到: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AIMD 自适应并发限制器
+加性增长（additive-increase）/ 乘性减少（multiplicative-decrease）：
+p95延迟和错误率健康时每个窗口把在途上限+1，出现超时、5xx、524、429时立即按比例收缩，
+让fetcher自动稳定在后端能承受的最高速率附近，不再需要手工调 turbo/stable 预设
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+# 视为后端过载的HTTP状态码（5xx包含Cloudflare 524）
+OVERLOAD_STATUS_MIN = 500
+TOO_MANY_REQUESTS = 429
+
+
+def is_overload_status(status_code: int) -> bool:
+    """判断HTTP状态码是否表示后端过载"""
+    return status_code >= OVERLOAD_STATUS_MIN or status_code == TOO_MANY_REQUESTS
+
+
+class AIMDLimiter:
+    """在途请求数上限随观测到的延迟与错误率自动调整
+
+    同一个实例只供一种引擎使用：线程引擎调用 acquire/release，async引擎调用 async_acquire/async_release
+    """
+
+    # 基线回升速度：窗口p95高于最佳p95时，基线每个窗口向当前p95靠拢的比例
+    # （最佳p95只降不升时，短暂的低延迟阶段会把目标永久压低，之后每个窗口都判为不健康）
+    BASELINE_DRIFT = 0.1
+
+    def __init__(self, initial: int, min_limit: int = 4, max_limit: int = 500,
+                 latency_target: Optional[float] = None, window: int = 50,
+                 increase: int = 1, decrease: float = 0.5, max_error_rate: float = 0.02,
+                 latency_tolerance: float = 2.0):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        # 固定p95目标（秒）；为None时以该端点观测到的最佳p95 × latency_tolerance 作为目标
+        self.latency_target = latency_target
+        self.latency_tolerance = latency_tolerance
+        # 端点 -> 延迟基线（最佳p95，缓慢回升）；/connect/token 与 invitation/info 延迟相差一个数量级，各自比较
+        self.best_p95: Dict[str, float] = {}
+        self.window = window
+        self.increase = increase
+        self.decrease = decrease
+        self.max_error_rate = max_error_rate
+
+        self.inflight = 0
+        # 端点 -> 当前窗口的样本（延迟秒数，过载记为None）
+        self.samples: Dict[str, List[Optional[float]]] = {}
+        # 收缩后的冷却截止时间：同一波并发失败只收缩一次，避免上限瞬间塌到底
+        self.cooldown_until = 0.0
+        self.peak_limit = self.limit
+        self.lowest_limit = self.limit
+
+        self.condition = threading.Condition()
+        self.async_condition: Optional[asyncio.Condition] = None
+
+    # 🔒 线程引擎
+    def acquire(self):
+        """占用一个在途名额，超过当前上限时阻塞等待"""
+        with self.condition:
+            while self.inflight >= int(self.limit):
+                self.condition.wait()
+            self.inflight += 1
+
+    def release(self, latency: float, overloaded: bool, endpoint: str = 'default'):
+        """归还名额并反馈本次请求的端点、延迟与是否过载"""
+        with self.condition:
+            self.inflight -= 1
+            self._record(endpoint, latency, overloaded)
+            self.condition.notify_all()
+
+    # ⚡ async引擎（仅在事件循环线程内调用）
+    async def async_acquire(self):
+        if self.async_condition is None:
+            self.async_condition = asyncio.Condition()
+        async with self.async_condition:
+            while self.inflight >= int(self.limit):
+                await self.async_condition.wait()
+            self.inflight += 1
+
+    async def async_release(self, latency: float, overloaded: bool, endpoint: str = 'default'):
+        async with self.async_condition:
+            self.inflight -= 1
+            self._record(endpoint, latency, overloaded)
+            self.async_condition.notify_all()
+
+    def _record(self, endpoint: str, latency: float, overloaded: bool):
+        """记录一个样本并按AIMD规则调整上限（调用方已持有锁）
+        在途上限是所有端点共用的，延迟窗口和基线按端点分开
+        """
+        now = time.time()
+        samples = self.samples.setdefault(endpoint, [])
+        samples.append(None if overloaded else latency)
+        if overloaded and now >= self.cooldown_until:
+            self._set_limit(self.limit * self.decrease, "后端过载(超时/5xx/524)")
+            # 冷却一个当前延迟周期，让收缩后的并发生效；收缩前的样本已经过时
+            self.cooldown_until = now + max(latency, 1.0)
+            self.samples.clear()
+            return
+
+        if len(samples) < self.window:
+            return
+        # 冷却期内不清空窗口，只保留最近window个样本，冷却结束后用它们重新判断
+        del samples[:-self.window]
+
+        latencies = sorted(sample for sample in samples if sample is not None)
+        p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)] if latencies else 0.0
+        error_rate = (len(samples) - len(latencies)) / len(samples)
+        target = self._target(endpoint, p95) if latencies else float('inf')
+
+        if error_rate <= self.max_error_rate and p95 <= target:
+            self.limit = min(self.limit + self.increase, self.max_limit)
+            self.peak_limit = max(self.peak_limit, self.limit)
+        elif now >= self.cooldown_until:
+            if error_rate > self.max_error_rate:
+                reason = f"错误率 {error_rate:.1%}"
+            else:
+                reason = f"{endpoint} p95 {p95*1000:.0f}ms 超过目标 {target*1000:.0f}ms"
+            self._set_limit(self.limit * self.decrease, reason)
+            self.cooldown_until = now + p95
+        else:
+            return
+        samples.clear()
+
+    def _target(self, endpoint: str, p95: float) -> float:
+        """更新该端点的延迟基线并返回本窗口的p95目标"""
+        if self.latency_target is not None:
+            return self.latency_target
+        best = self.best_p95.get(endpoint)
+        if best is None or p95 < best:
+            best = p95
+        else:
+            best += (p95 - best) * self.BASELINE_DRIFT
+        self.best_p95[endpoint] = best
+        return best * self.latency_tolerance
+
+    def _set_limit(self, new_limit: float, reason: str):
+        old_limit = int(self.limit)
+        self.limit = max(float(self.min_limit), new_limit)
+        self.lowest_limit = min(self.lowest_limit, self.limit)
+        logging.warning(f"📉 并发上限 {old_limit} → {int(self.limit)} ({reason})")
+
+    def summary(self) -> str:
+        """运行结束时的上限变化摘要"""
+        return (f"当前 {int(self.limit)}, 峰值 {int(self.peak_limit)}, 最低 {int(self.lowest_limit)}"
+                f" (范围 {self.min_limit}-{self.max_limit})")
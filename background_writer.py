@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后台批量落盘线程
+断点日志、增量结果文件、token缓存、结果索引库的写入方法只把记录追加到内存缓冲区
+（持锁时间只有一次list.append），由每个进程一个的后台线程按时间间隔、
+或缓冲区攒满一个批次时被唤醒，依次调用它们的 flush() 批量写文件/SQLite，
+请求线程上不再有任何文件或数据库写入
+"""
+
+import atexit
+import logging
+import multiprocessing.util
+import os
+import threading
+from typing import List, Optional
+
+
+class BackgroundWriter:
+    """定期调用已注册对象的 flush()，register/unregister/wake 都是线程安全的"""
+
+    # 没有被唤醒时多久落盘一次
+    INTERVAL = 1.0
+
+    def __init__(self, interval: float = INTERVAL):
+        self.interval = interval
+        self.targets: List = []
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='background-writer', daemon=True)
+        self.thread.start()
+
+    def register(self, target):
+        with self.lock:
+            self.targets.append(target)
+
+    def unregister(self, target):
+        with self.lock:
+            if target in self.targets:
+                self.targets.remove(target)
+
+    def wake(self):
+        """缓冲区攒满一个批次时调用，让后台线程立即落盘"""
+        self.wakeup.set()
+
+    def flush_all(self):
+        """同步落盘所有已注册对象（进程退出前调用）"""
+        with self.lock:
+            targets = list(self.targets)
+        for target in targets:
+            try:
+                target.flush()
+            except Exception as e:
+                logging.error(f"💥 后台落盘失败 ({getattr(target, 'path', target)}): {e}")
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            self.flush_all()
+
+
+_writer: Optional[BackgroundWriter] = None
+_writer_pid: Optional[int] = None
+_writer_lock = threading.Lock()
+
+
+def background_writer() -> BackgroundWriter:
+    """当前进程的后台落盘线程（首次调用时启动；fork出的子进程里线程不存在，会重新启动一个）"""
+    global _writer, _writer_pid
+    with _writer_lock:
+        if _writer is None or _writer_pid != os.getpid():
+            _writer = BackgroundWriter()
+            _writer_pid = os.getpid()
+            # 进程正常退出时（包括不执行atexit的multiprocessing worker进程）把缓冲区写完
+            atexit.register(_writer.flush_all)
+            multiprocessing.util.Finalize(None, _writer.flush_all, exitpriority=20)
+        return _writer
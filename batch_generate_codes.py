@@ -8,9 +8,10 @@
 import subprocess
 import time
 import json
-import os
 from datetime import datetime
 
+from code_store import CodeStore
+
 def run_batch_generation():
     """分批生成邀请码"""
     total_count = 30000
@@ -23,6 +24,8 @@ def run_batch_generation():
     
     all_invitation_codes = {}
     all_failed_accounts = []
+    # 子进程把结果写入索引库，每批结束后按该批的索引范围查询
+    store = CodeStore()
     
     for batch_num in range(0, total_count, batch_size):
         current_start = start_index + batch_num
@@ -30,6 +33,7 @@ def run_batch_generation():
         
         print(f"\n📋 第 {batch_num//batch_size + 1} 批: loadtestc{current_start} - loadtestc{current_start + current_count - 1}")
         
+        batch_start_time = time.time()
         try:
             # 运行单批次
             cmd = [
@@ -46,20 +50,10 @@ def run_batch_generation():
                 print(f"✅ 第 {batch_num//batch_size + 1} 批完成")
                 
                 # 收集这批的结果
-                timestamp_pattern = datetime.now().strftime("%Y%m%d")
-                
-                # 查找最新生成的文件
-                results_dir = "results"
-                if os.path.exists(results_dir):
-                    files = os.listdir(results_dir)
-                    # 查找最新的邀请码文件
-                    invitation_files = [f for f in files if f.startswith(f"loadtestc_invitation_codes_{timestamp_pattern}")]
-                    if invitation_files:
-                        latest_file = max(invitation_files, key=lambda x: os.path.getctime(os.path.join(results_dir, x)))
-                        with open(os.path.join(results_dir, latest_file), 'r', encoding='utf-8') as f:
-                            batch_codes = json.load(f)
-                            all_invitation_codes.update(batch_codes)
-                            print(f"📊 已收集 {len(batch_codes)} 个邀请码，总计: {len(all_invitation_codes)}")
+                batch_codes = store.codes("loadtestc", current_start, current_start + current_count - 1,
+                                          since=batch_start_time)
+                all_invitation_codes.update(batch_codes)
+                print(f"📊 已收集 {len(batch_codes)} 个邀请码，总计: {len(all_invitation_codes)}")
                 
             else:
                 print(f"❌ 第 {batch_num//batch_size + 1} 批失败: {result.stderr}")
@@ -72,6 +66,8 @@ def run_batch_generation():
         # 批次间休息2秒
         time.sleep(2)
     
+    store.close()
+    
     # 保存最终结果
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fetcher / checker 吞吐基准
+在本机启动 mock_server.py（固定的延迟配置），按 引擎 × 线程数 × 进程数 × 分片大小 扫描，
+每个组合在独立子进程中运行（RSS/CPU互不干扰），记录 账户/秒、各阶段p99延迟、峰值RSS、每千账户CPU秒，写成JSON。
+compare 对比两次结果，吞吐下降或CPU上升超过阈值时以非0退出，30k正式运行前先确认改动没有退化
+
+用法:
+    python3 bench_fetchers.py run --accounts 2000 --workers 20,50,100 --processes 1,4 --batch-size 250,500
+    python3 bench_fetchers.py run --engine thread,async --workers 50,200 --profile slow --repeat 3
+    python3 bench_fetchers.py run --tool checker --workers 20,50,100
+    python3 bench_fetchers.py compare results/bench_fetcher_上次.json results/bench_fetcher_本次.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 延迟配置: 传给 mock_server.py 的参数（staging 即 mock_server.py 的默认分布）
+PROFILES = {
+    'fast': ['--latency', 'all=const:5'],
+    'staging': [],
+    'slow': ['--latency', 'all=lognormal:80,0.5', '--latency', 'token=lognormal:250,0.5'],
+    'lossy': ['--fault', 'token=524:0.02,timeout:0.005', '--fault', 'info=500:0.01', '--hang-seconds', '5'],
+}
+# 吞吐下降 / CPU上升超过该比例视为退化
+DEFAULT_THRESHOLD = 0.10
+
+
+def case_key(case: dict) -> str:
+    key = f"{case['tool']}/{case['engine']}/w{case['workers']}/p{case['processes']}/b{case['batch_size'] or '-'}"
+    return f"{key}/warm" if case.get('warmup') else key
+
+
+def build_cases(args) -> List[dict]:
+    """展开扫描组合；分片大小只对多进程有意义，async引擎只支持单进程"""
+    cases = []
+    for engine, workers, processes, batch_size in itertools.product(
+            args.engine, args.workers, args.processes, args.batch_size):
+        if args.tool == 'checker':
+            engine, processes, batch_size = 'thread', 1, None
+        elif processes == 1:
+            batch_size = None
+        elif engine == 'async':
+            continue
+        case = {'tool': args.tool, 'engine': engine, 'workers': workers, 'processes': processes,
+                'batch_size': batch_size, 'warmup': args.warmup and args.tool == 'fetcher'}
+        if case not in cases:
+            cases.append(case)
+    return cases
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_mock(profile: str, processes: int) -> Tuple[subprocess.Popen, str]:
+    """启动模拟服务并等待端口可连接，返回 (进程, 根地址)"""
+    port = free_port()
+    cmd = [sys.executable, os.path.join(SCRIPT_DIR, 'mock_server.py'), '--port', str(port),
+           '--processes', str(processes), *PROFILES[profile]]
+    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise SystemExit("❌ mock_server.py 启动失败")
+
+
+def run_case(case: dict, accounts: int, base_url: str, timeout: float) -> dict:
+    """在独立子进程中运行一个组合（临时目录作为工作目录，结果/日志文件不落在仓库里）"""
+    spec = dict(case, accounts=accounts, base_url=base_url)
+    with tempfile.TemporaryDirectory(prefix='bench_') as workdir:
+        result = subprocess.run([sys.executable, os.path.abspath(__file__), 'case', json.dumps(spec)],
+                                cwd=workdir, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                text=True, timeout=timeout)
+    if result.returncode != 0 or not result.stdout.strip():
+        raise RuntimeError(f"{case_key(case)} 子进程退出码 {result.returncode}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def execute_case(spec: dict):
+    """子进程入口: 真正执行一次获取/检查，最后一行输出测量结果JSON"""
+    from get_invitation_codes import Config, setup_logging
+    from latency_histogram import LatencyRecorder
+
+    start, end = 1, spec['accounts']
+    api_url = f"{spec['base_url']}/godgptpressure-client/api"
+    # 与正式运行一样写INFO日志文件，日志开销计入结果
+    setup_logging("bench.log")
+
+    started = time.perf_counter()
+    if spec['tool'] == 'checker':
+        from check_account_status import AccountChecker, Config as CheckConfig
+        CheckConfig.CHECK_URL = f"{api_url}/account/check-email-registered"
+        checker = AccountChecker("loadtestc", start, end, spec['workers'])
+        checker.run_check()
+        succeeded = len(checker.results['registered']) + len(checker.results['unregistered'])
+        latency = checker.latency
+    else:
+        # 开启预热时所有组合都把预热计入计时：多进程的预热发生在worker初始化里，无法单独扣除
+        # 单进程和多进程写同样的输出（与正式运行的默认值一致，只写结果索引库），落盘开销都计入耗时
+        auth_url = f"{spec['base_url']}/connect/token"
+        invitation_url = f"{api_url}/godgpt/invitation/info"
+        if spec['processes'] > 1:
+            from shard_pool import run_sharded, split_ranges
+            latency = LatencyRecorder()
+            # 地址显式传给worker：spawn启动的worker（macOS默认）不会继承本进程对Config的修改，否则会打到staging
+            codes, _ = run_sharded("loadtestc", split_ranges(start, end, spec['batch_size']), spec['processes'],
+                                   spec['workers'], auth_url=auth_url, invitation_url=invitation_url,
+                                   token_cache_path=None, warmup=spec['warmup'], latency=latency)
+            succeeded = len(codes)
+        else:
+            from code_store import CodeStore
+            from get_invitation_codes import InvitationCodeFetcher
+            Config.AUTH_URL, Config.INVITATION_CODE_URL = auth_url, invitation_url
+            store = CodeStore()
+            fetcher = InvitationCodeFetcher("loadtestc", start, end, spec['workers'], Config.DEFAULT_PASSWORD,
+                                            max_inflight=spec['workers'], store=store,
+                                            warmup=spec['workers'] if spec['warmup'] else 0)
+            if spec['engine'] == 'async':
+                asyncio.run(fetcher._run_fetch_async())
+            else:
+                if fetcher.warmup:
+                    fetcher.warm_up(fetcher.warmup)
+                fetcher.fetch_range(start, end)
+            store.close()
+            succeeded = len(fetcher.invitation_codes)
+            latency = fetcher.latency
+    elapsed = time.perf_counter() - started
+
+    # 本进程 + 已回收的子进程（进程池worker）；Linux下ru_maxrss单位是KB
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    print(json.dumps({
+        'elapsed': round(elapsed, 3),
+        'succeeded': succeeded,
+        'cpu_seconds': round(own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime, 3),
+        'peak_rss_mb': round(max(own.ru_maxrss, children.ru_maxrss) / 1024, 1),
+        'p99_ms': {f"{stage}/{outcome}": round(histogram.percentile(99) * 1000, 1)
+                   for (stage, outcome), histogram in sorted(latency.histograms.items())},
+    }))
+
+
+def summarize_runs(case: dict, runs: List[dict], accounts: int) -> dict:
+    """多次重复取吞吐中位数的那一次作为代表值"""
+    for run in runs:
+        run['accounts_per_sec'] = round(accounts / run['elapsed'], 1)
+        run['cpu_per_1k'] = round(run['cpu_seconds'] / accounts * 1000, 3)
+    ranked = sorted(runs, key=lambda run: run['accounts_per_sec'])
+    median = ranked[len(ranked) // 2]
+    return dict(case, key=case_key(case),
+                accounts_per_sec=median['accounts_per_sec'],
+                accounts_per_sec_spread=[ranked[0]['accounts_per_sec'], ranked[-1]['accounts_per_sec']],
+                success_rate=round(median['succeeded'] / accounts * 100, 2),
+                p99_ms=median['p99_ms'],
+                peak_rss_mb=max(run['peak_rss_mb'] for run in runs),
+                cpu_per_1k=statistics.median(run['cpu_per_1k'] for run in runs),
+                runs=runs)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPT_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmark(args):
+    cases = build_cases(args)
+    print(f"🏁 基准: {args.tool}, {args.accounts} 个账户 × {len(cases)} 个组合 × {args.repeat} 次, 延迟配置 {args.profile}")
+    mock, base_url = start_mock(args.profile, args.mock_processes)
+    results = []
+    try:
+        for case in cases:
+            runs = []
+            for _ in range(args.repeat):
+                try:
+                    runs.append(run_case(case, args.accounts, base_url, args.case_timeout))
+                except (RuntimeError, subprocess.TimeoutExpired) as e:
+                    print(f"   💥 {case_key(case)}: {e}")
+            if not runs:
+                continue
+            result = summarize_runs(case, runs, args.accounts)
+            results.append(result)
+            worst_p99 = max(result['p99_ms'].values(), default=0)
+            print(f"   {result['key']:<32} {result['accounts_per_sec']:>8.1f} 账户/秒  "
+                  f"p99最大 {worst_p99:>7.0f}ms  RSS {result['peak_rss_mb']:>6.1f}MB  "
+                  f"CPU {result['cpu_per_1k']:.2f}s/千账户  成功率 {result['success_rate']:.1f}%")
+    finally:
+        mock.terminate()
+        mock.wait()
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'tool': args.tool,
+        'profile': args.profile,
+        'mock_args': PROFILES[args.profile],
+        'accounts': args.accounts,
+        'repeat': args.repeat,
+        'warmup': args.warmup,
+        'cases': results,
+    }
+    out = args.out or f"results/bench_{args.tool}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"📁 基准结果保存到: {out}")
+
+
+def compare_reports(baseline_path: str, current_path: str, threshold: float) -> int:
+    """按组合对比两次结果，返回退化的组合数"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {case['key']: case for case in json.load(f)['cases']}
+    with open(current_path, 'r', encoding='utf-8') as f:
+        current = json.load(f)['cases']
+
+    regressions = 0
+    print(f"📊 {baseline_path} → {current_path}（阈值 {threshold:.0%}）")
+    for case in current:
+        before = baseline.get(case['key'])
+        if before is None:
+            print(f"   🆕 {case['key']}: {case['accounts_per_sec']:.1f} 账户/秒（基线中没有该组合）")
+            continue
+        throughput = case['accounts_per_sec'] / before['accounts_per_sec'] - 1
+        cpu = case['cpu_per_1k'] / before['cpu_per_1k'] - 1 if before['cpu_per_1k'] else 0
+        regressed = throughput < -threshold or cpu > threshold
+        regressions += regressed
+        print(f"   {'❌' if regressed else '✅'} {case['key']:<32} 吞吐 {throughput:+7.1%}  CPU/千账户 {cpu:+7.1%}  "
+              f"RSS {before['peak_rss_mb']:.0f}→{case['peak_rss_mb']:.0f}MB")
+    return regressions
+
+
+def int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='🏁 fetcher / checker 吞吐基准')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='启动本地模拟服务并扫描参数组合')
+    run_parser.add_argument('--tool', choices=['fetcher', 'checker'], default='fetcher', help='测试对象')
+    run_parser.add_argument('--accounts', type=int, default=2000, help='每个组合处理的账户数')
+    run_parser.add_argument('--engine', type=lambda value: value.split(','), default=['thread'],
+                            help='执行引擎列表: thread,async（async只测单进程）')
+    run_parser.add_argument('--workers', type=int_list, default=[20, 50, 100],
+                            help='每进程并发数列表（async引擎为最大在途请求数）')
+    run_parser.add_argument('--processes', type=int_list, default=[1], help='进程数列表（>1时走shard_pool进程池）')
+    run_parser.add_argument('--batch-size', type=int_list, default=[500], help='多进程的分片大小列表')
+    run_parser.add_argument('--profile', choices=sorted(PROFILES), default='staging', help='模拟服务延迟配置')
+    run_parser.add_argument('--mock-processes', type=int, default=1, help='模拟服务进程数')
+    run_parser.add_argument('--warmup', action='store_true',
+                            help='fetcher的所有组合都先预热连接池（单进程、async、多进程一致，预热计入耗时）')
+    run_parser.add_argument('--repeat', type=int, default=1, help='每个组合重复次数（取吞吐中位数）')
+    run_parser.add_argument('--case-timeout', type=float, default=1800, help='单个组合的超时(秒)')
+    run_parser.add_argument('--out', default=None, help='输出路径（默认 results/bench_{tool}_时间戳.json）')
+
+    compare_parser = subparsers.add_parser('compare', help='对比两次基准结果')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help='吞吐下降/CPU上升超过该比例视为退化')
+
+    case_parser = subparsers.add_parser('case', help='（内部）在子进程中运行单个组合')
+    case_parser.add_argument('spec')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run_benchmark(args)
+    elif args.command == 'compare':
+        if compare_reports(args.baseline, args.current, args.threshold):
+            sys.exit(1)
+    elif args.command == 'case':
+        execute_case(json.loads(args.spec))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@
 """
 账户注册状态批量检查器
 通过API直接验证账户是否已注册
+检查结果写入注册状态位图（account_registry.py），重跑时只检查状态未知或已过期的账户
 """
 
 import requests
@@ -10,16 +11,24 @@ import json
 import time
 import threading
 import argparse
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import logging
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+import metrics
+from account_registry import REGISTERED, UNREGISTERED, AccountRegistry
+from latency_histogram import LatencyRecorder
+from log_pipeline import LogSampler, setup_queue_logging
+from task_stream import PENDING_PER_WORKER, submit_bounded
 
 # 🚀 配置参数
 class Config:
     CHECK_URL = "https://station-developer-dev-staging.aevatar.ai/godgptpressure-client/api/account/check-email-registered"
     DEFAULT_WORKERS = 20
     REQUEST_TIMEOUT = 10
+    # 逐账户检查结果日志每N个账户记录1条（检查失败日志全部记录）
+    LOG_SAMPLE = 100
     
 # 📊 全局统计
 class GlobalStats:
@@ -38,26 +47,36 @@ def setup_logging(log_filename: str):
     import os
     os.makedirs("results", exist_ok=True)
     
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(f"results/{log_filename}", encoding='utf-8'),
-            logging.StreamHandler()
-        ]
-    )
+    # 文件和终端由后台线程写出，检查线程只入队
+    setup_queue_logging([
+        logging.FileHandler(f"results/{log_filename}", encoding='utf-8'),
+        logging.StreamHandler()
+    ])
 
 class AccountChecker:
-    def __init__(self, prefix: str, start_index: int, end_index: int, workers: int):
+    # 每完成多少个检查把位图落盘一次（进程被杀最多丢失这一段结果）
+    REGISTRY_SAVE_EVERY = 1000
+
+    def __init__(self, prefix: str, start_index: int, end_index: int, workers: int,
+                 registry: Optional[AccountRegistry] = None, max_age_days: int = AccountRegistry.DEFAULT_MAX_AGE_DAYS,
+                 log_sample: int = Config.LOG_SAMPLE):
         self.prefix = prefix
         self.start_index = start_index
         self.end_index = end_index
         self.workers = workers
         self.check_url = Config.CHECK_URL
         self.session = requests.Session()
+        # 按结果分组的索引（整数，不再保存邮箱字符串）
         self.results = {'registered': [], 'unregistered': [], 'failed_check': []}
+        # 注册状态位图（None表示每次检查整个范围且不持久化）
+        self.registry = registry
+        self.max_age_days = max_age_days
         self.lock = threading.Lock()
         self.start_time = time.time()
+        # 按检查结果分组的延迟直方图
+        self.latency = LatencyRecorder()
+        # 逐账户检查结果日志的采样（检查失败日志不采样）
+        self.log_sampler = LogSampler(log_sample)
 
     def generate_email(self, index: int) -> str:
         """生成邮箱地址"""
@@ -69,50 +88,78 @@ class AccountChecker:
         url = self.check_url
         payload = {"emailAddress": email}
         
+        status = 'exception'
+        outcome = 'failed_check'
+        metrics.INFLIGHT.inc(endpoint='check')
+        start = time.perf_counter()
         try:
             response = self.session.post(url, json=payload, timeout=Config.REQUEST_TIMEOUT)
+            status = response.status_code
             
             if response.status_code == 200:
                 data = response.json()
                 is_registered = data.get('data', False) if data.get('code') == '20000' else False
                 
+                outcome = 'registered' if is_registered else 'unregistered'
+                metrics.ACCOUNTS.inc(tool='checker', outcome=outcome)
                 with self.lock:
-                    if is_registered:
-                        self.results['registered'].append(email)
-                        logging.info(f"✅ {email} - 已注册")
-                    else:
-                        self.results['unregistered'].append(email)
-                        logging.info(f"❌ {email} - 未注册")
+                    self.results[outcome].append(index)
+                # 日志在锁外写入队列，不让其他线程等待
+                if self.log_sampler.hit():
+                    logging.info(f"✅ {email} - 已注册" if is_registered else f"❌ {email} - 未注册")
+                if self.registry:
+                    self.registry.set(index, REGISTERED if is_registered else UNREGISTERED)
             else:
+                metrics.ACCOUNTS.inc(tool='checker', outcome='failed_check')
                 with self.lock:
-                    self.results['failed_check'].append(email)
-                    logging.error(f"⚠️ {email} - 检查失败: HTTP {response.status_code}")
-                    if response.text:
-                        logging.error(f"   响应: {response.text}")
+                    self.results['failed_check'].append(index)
+                logging.error(f"⚠️ {email} - 检查失败: HTTP {response.status_code}")
+                if response.text:
+                    logging.error(f"   响应: {response.text}")
                         
         except requests.exceptions.Timeout:
+            metrics.ACCOUNTS.inc(tool='checker', outcome='failed_check')
             with self.lock:
-                self.results['failed_check'].append(email)
-                logging.error(f"⚠️ {email} - 检查超时")
+                self.results['failed_check'].append(index)
+            logging.error(f"⚠️ {email} - 检查超时")
         except Exception as e:
+            metrics.ACCOUNTS.inc(tool='checker', outcome='failed_check')
             with self.lock:
-                self.results['failed_check'].append(email)
-                logging.error(f"⚠️ {email} - 检查异常: {str(e)}")
+                self.results['failed_check'].append(index)
+            logging.error(f"⚠️ {email} - 检查异常: {str(e)}")
+        finally:
+            latency = time.perf_counter() - start
+            metrics.INFLIGHT.dec(endpoint='check')
+            metrics.observe_request('check', status, latency)
+            self.latency.record('check', outcome, latency)
 
     def run_check(self):
         """运行账户状态检查"""
         logging.info(f"🔍 检查账户状态 ({self.prefix}{self.start_index}-{self.prefix}{self.end_index})...")
-        account_indices = list(range(self.start_index, self.end_index + 1))
+        indices = range(self.start_index, self.end_index + 1)
+        total = len(indices)
+        skipped = 0
+        if self.registry:
+            # 位图中状态已知且未过期的账户不再发请求
+            total = sum(1 for _ in self.registry.stale_indices(self.start_index, self.end_index, self.max_age_days))
+            skipped = len(indices) - total
+            indices = self.registry.stale_indices(self.start_index, self.end_index, self.max_age_days)
+            logging.info(f"🗂️ 注册状态位图: {skipped} 个账户{self.max_age_days}天内已检查过，本次检查 {total} 个")
         
+        # 索引惰性生成，只保留 workers × k 个在途任务，内存不随范围大小增长
         with ThreadPoolExecutor(max_workers=self.workers) as executor:
-            futures = [executor.submit(self.check_single_account, idx) for idx in account_indices]
-            
-            for i, future in enumerate(as_completed(futures)):
+            completed = submit_bounded(executor, self.check_single_account,
+                                       indices, self.workers * PENDING_PER_WORKER)
+            for i, _ in enumerate(completed):
+                if self.registry and (i + 1) % self.REGISTRY_SAVE_EVERY == 0:
+                    self.registry.save()
                 if (i + 1) % 100 == 0:
                     elapsed = time.time() - self.start_time
                     speed = (i + 1) / elapsed if elapsed > 0 else 0
-                    logging.info(f"📊 进度: {i+1}/{len(account_indices)} ({((i+1)/len(account_indices))*100:.1f}%), 速度: {speed:.2f}账户/秒")
+                    logging.info(f"📊 进度: {i+1}/{total} ({((i+1)/total)*100:.1f}%), 速度: {speed:.2f}账户/秒")
 
+        if self.registry:
+            self.registry.save()
         elapsed_time = time.time() - self.start_time
         logging.info(f"✨ 检查完成! 总耗时: {elapsed_time:.2f}秒")
         
@@ -128,13 +175,19 @@ class AccountChecker:
         logging.info(f"   未注册: {unregistered_count} 个")
         logging.info(f"   检查失败: {failed_count} 个")
         
-        print("==================================================")
-        print("🎯 验证总结:")
-        print(f"   总检查账户: {total_checked}")
-        print(f"   ✅ 已注册: {registered_count} 个")
-        print(f"   ❌ 未注册: {unregistered_count} 个")
-        print(f"   ⚠️ 检查失败: {failed_count} 个")
-        print(f"   📊 注册成功率: {success_rate:.2f}%")
+        logging.info("==================================================")
+        logging.info("🎯 验证总结:")
+        logging.info(f"   总检查账户: {total_checked}")
+        logging.info(f"   ✅ 已注册: {registered_count} 个")
+        logging.info(f"   ❌ 未注册: {unregistered_count} 个")
+        logging.info(f"   ⚠️ 检查失败: {failed_count} 个")
+        logging.info(f"   📊 注册成功率: {success_rate:.2f}%")
+        if self.registry:
+            counts = self.registry.counts(self.start_index, self.end_index)
+            logging.info(f"   🗂️ 位图跳过: {skipped} 个; 范围内已注册 {counts['registered']} / 未注册 {counts['unregistered']}"
+                         f" / 未知 {counts['unknown']}")
+        for line in self.latency.summary_lines():
+            logging.info(f"   ⏱️ {line}")
 
         # 保存结果
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -143,41 +196,63 @@ class AccountChecker:
         if self.results['registered']:
             registered_filename = f"{self.prefix}_verification_registered_{timestamp}.txt"
             with open(f"results/{registered_filename}", "w") as f:
-                for email in self.results['registered']:
-                    f.write(f"{email}\n")
+                for index in self.results['registered']:
+                    f.write(f"{self.generate_email(index)}\n")
             logging.info(f"📁 已注册账户保存到: results/{registered_filename}")
 
         # 保存未注册账户列表
         if self.results['unregistered']:
             unregistered_filename = f"{self.prefix}_verification_unregistered_{timestamp}.txt"
             with open(f"results/{unregistered_filename}", "w") as f:
-                for email in self.results['unregistered']:
-                    f.write(f"{email}\n")
+                for index in self.results['unregistered']:
+                    f.write(f"{self.generate_email(index)}\n")
             logging.info(f"📁 未注册账户保存到: results/{unregistered_filename}")
 
         # 保存完整结果
         full_results_filename = f"{self.prefix}_verification_complete_{timestamp}.json"
         with open(f"results/{full_results_filename}", "w") as f:
-            json.dump(self.results, f, indent=2)
+            json.dump({group: [self.generate_email(index) for index in indices]
+                       for group, indices in self.results.items()}, f, indent=2)
         logging.info(f"📁 完整结果保存到: results/{full_results_filename}")
 
+        # 保存延迟直方图
+        latency_filename = f"results/{self.prefix}_check_latency_{timestamp}.json"
+        self.latency.save(latency_filename)
+        logging.info(f"📁 延迟直方图保存到: {latency_filename}")
+
 def main():
     parser = argparse.ArgumentParser(description='🚀 账户注册状态批量检查器')
     parser.add_argument('--prefix', '-p', default="loadtestc", help='邮箱前缀')
     parser.add_argument('--start', '-s', type=int, default=1, help='起始索引')
     parser.add_argument('--count', '-c', type=int, default=100, help='检查数量')
     parser.add_argument('--workers', '-w', type=int, default=Config.DEFAULT_WORKERS, help='并发线程数')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='在该端口提供 /metrics 实时指标（被占用时顺延到下一个空闲端口）')
+    parser.add_argument('--metrics-host', default=metrics.DEFAULT_HOST,
+                        help='指标服务监听地址（默认只监听本机；0.0.0.0 会在所有网卡上暴露运行数据）')
+    parser.add_argument('--registry-dir', default=AccountRegistry.DEFAULT_DIR, help='注册状态位图目录')
+    parser.add_argument('--no-registry', action='store_true', help='不使用注册状态位图，检查整个范围')
+    parser.add_argument('--max-age-days', type=int, default=AccountRegistry.DEFAULT_MAX_AGE_DAYS,
+                        help='位图中检查结果的有效期(天)，超过后重新检查；0表示只复用当天的结果')
+    parser.add_argument('--check-url', default=Config.CHECK_URL, help='注册检查接口地址（可指向 mock_server.py）')
+    parser.add_argument('--log-sample', type=int, default=Config.LOG_SAMPLE,
+                        help='逐账户检查结果日志每N个账户记录1条（1全部记录，0不记录；检查失败日志总是记录）')
     
     args = parser.parse_args()
+    Config.CHECK_URL = args.check_url
     
     end_index = args.start + args.count - 1
     
     # 设置日志
     log_filename = f"check_status_{args.prefix}_{args.start}-{end_index}.log"
     setup_logging(log_filename)
+    if args.metrics_port:
+        metrics.start_metrics_server(args.metrics_port, args.metrics_host)
     
     # 开始检查
-    checker = AccountChecker(args.prefix, args.start, end_index, args.workers)
+    registry = None if args.no_registry else AccountRegistry(args.prefix, args.registry_dir)
+    checker = AccountChecker(args.prefix, args.start, end_index, args.workers, registry=registry,
+                             max_age_days=args.max_age_days, log_sample=args.log_sample)
     checker.run_check()
 
 if __name__ == "__main__":
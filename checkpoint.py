@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+断点续跑日志（checkpoint journal）
+每个账户完成后把结果追加到 JSONL 日志（O_APPEND，多线程/多进程可同时追加），
+请求线程只写内存缓冲区，由后台落盘线程按条数或时间间隔批量写入。进程被杀时最多丢失最后一个批次，
+--resume 读取日志跳过已成功的索引，重启只需几秒而不是重跑整个范围
+
+日志行格式: {"i": 索引, "e": 邮箱, "c": 邀请码或null, "t": 时间戳}
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from background_writer import background_writer
+
+
+class AppendLog:
+    """按批次落盘的追加写行日志（线程安全，多进程可同时追加同一个文件）
+    append() 只把行放进内存缓冲区，文件写入由后台落盘线程完成
+    """
+
+    # 累计多少条唤醒后台线程落盘（否则按后台线程的时间间隔落盘）
+    FLUSH_EVERY = 50
+
+    def __init__(self, path: str, flush_every: int = FLUSH_EVERY):
+        self.path = path
+        self.flush_every = flush_every
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # O_APPEND保证每次write整体追加到文件末尾，多个进程写同一个日志不会互相覆盖
+        self.fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self.buffer = []
+        # lock只保护缓冲区；write_lock串行化落盘，append不会等待文件写入
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.writer = background_writer()
+        self.writer.register(self)
+
+    def append(self, line: str):
+        """追加一行（不含换行符）"""
+        with self.lock:
+            self.buffer.append(line)
+            full = len(self.buffer) >= self.flush_every
+        if full:
+            self.writer.wake()
+
+    def flush(self):
+        """把缓冲区写入文件"""
+        with self.write_lock:
+            with self.lock:
+                lines, self.buffer = self.buffer, []
+            if lines and self.fd is not None:
+                # 整批一次write，保证行的完整性
+                os.write(self.fd, ('\n'.join(lines) + '\n').encode('utf-8'))
+
+    def close(self):
+        self.writer.unregister(self)
+        self.flush()
+        with self.write_lock:
+            if self.fd is not None:
+                os.fsync(self.fd)
+                os.close(self.fd)
+                self.fd = None
+
+
+class CheckpointJournal(AppendLog):
+    """追加写的账户结果日志"""
+
+    @staticmethod
+    def default_path(prefix: str) -> str:
+        return f"results/{prefix}_checkpoint.jsonl"
+
+    def record(self, index: int, email: str, invitation_code: Optional[str]):
+        """记录一个账户的最终结果"""
+        self.append(json.dumps({'i': index, 'e': email, 'c': invitation_code, 't': round(time.time(), 3)},
+                               ensure_ascii=False))
+
+    @staticmethod
+    def load_successes(path: str, start_index: int, end_index: int) -> Dict[int, Tuple[str, str]]:
+        """读取日志中指定范围内已成功的账户: {索引: (邮箱, 邀请码)}"""
+        successes: Dict[int, Tuple[str, str]] = {}
+        if not os.path.exists(path):
+            return successes
+
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # 进程被杀时可能留下半行，直接跳过
+                    continue
+                index = entry.get('i')
+                if entry.get('c') and isinstance(index, int) and start_index <= index <= end_index:
+                    successes[index] = (entry['e'], entry['c'])
+        return successes
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+邀请码消耗台账
+每个邀请码只能兑换一次。每次兑换压测前从邀请码池（export_code_pool.py 导出）分配一段台账中从未分配过的切片，
+分配即记为已消耗；切片按VU数预先切成连续区间写进一个定宽邀请码池文件（头部带 vus=N），
+k6端第 v 个VU只使用区间 [(v-1)*每VU数量, v*每VU数量)，O(1)取码，无需防冲突检查，
+多次运行之间也不会重复使用已兑换过的邀请码
+
+用法:
+    python3 code_ledger.py allocate --count 6000 --vus 100
+    python3 code_ledger.py allocate --qps 10 --duration 600        # 按QPS和时长估算数量
+    python3 code_ledger.py runs
+    python3 code_ledger.py release RUN_ID                            # 运行未开始就中止时归还整段切片
+    python3 code_ledger.py stats
+"""
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from export_code_pool import DEFAULT_OUT, pool_codes, read_pool, write_pool
+
+# 按QPS估算数量时多分配的比例（覆盖k6结束前的余量）
+HEADROOM = 1.1
+
+
+class CodeLedger:
+    """基于SQLite(WAL)的邀请码消耗台账"""
+
+    DEFAULT_PATH = "results/code_ledger.db"
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS consumed (
+                code        TEXT PRIMARY KEY,
+                run_id      TEXT NOT NULL,
+                consumed_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS consumed_by_run ON consumed (run_id)")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id     TEXT PRIMARY KEY,
+                pool       TEXT NOT NULL,
+                slice      TEXT NOT NULL,
+                count      INTEGER NOT NULL,
+                vus        INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+        self.lock = threading.Lock()
+
+    def allocate(self, pool_path: str, count: int, vus: int, slice_path: str, run_id: str) -> Tuple[int, int]:
+        """从池中按顺序取count个未消耗的邀请码写成切片文件并记入台账，返回 (实际数量, 每VU数量)
+        数量会向下取整到vus的整数倍，保证每个VU的区间一样长
+        """
+        header, body = read_pool(pool_path)
+        with self.lock:
+            # 事务内完成查重和写入，多个终端同时分配也不会拿到同一个邀请码
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                consumed = {row[0] for row in self.conn.execute("SELECT code FROM consumed")}
+                target = count // vus * vus
+                fresh: List[str] = []
+                for code in pool_codes(header, body):
+                    if len(fresh) >= target:
+                        break
+                    if code not in consumed:
+                        fresh.append(code)
+                # 剩余不足时按实际可用数量重新均分
+                per_vu = len(fresh) // vus
+                fresh = fresh[:per_vu * vus]
+                if not fresh:
+                    self.conn.rollback()
+                    return 0, 0
+
+                write_pool(fresh, slice_path, header['width'], vus=vus)
+                now = time.time()
+                self.conn.executemany("INSERT INTO consumed (code, run_id, consumed_at) VALUES (?, ?, ?)",
+                                      [(code, run_id, now) for code in fresh])
+                self.conn.execute(
+                    "INSERT INTO runs (run_id, pool, slice, count, vus, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (run_id, pool_path, slice_path, len(fresh), vus, now))
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+        return len(fresh), per_vu
+
+    def release(self, run_id: str) -> int:
+        """归还一次运行的全部邀请码（只应在该运行未实际发出兑换请求时使用），返回归还数量"""
+        with self.lock:
+            released = self.conn.execute("DELETE FROM consumed WHERE run_id = ?", (run_id,)).rowcount
+            self.conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+            self.conn.commit()
+        return released
+
+    def runs(self) -> List[Dict]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT run_id, slice, count, vus, created_at FROM runs ORDER BY created_at").fetchall()
+        return [{'run_id': run_id, 'slice': slice_path, 'count': count, 'vus': vus, 'created_at': created_at}
+                for run_id, slice_path, count, vus, created_at in rows]
+
+    def remaining(self, pool_path: str) -> int:
+        """池中尚未消耗的邀请码数量"""
+        header, body = read_pool(pool_path)
+        with self.lock:
+            consumed = {row[0] for row in self.conn.execute("SELECT code FROM consumed")}
+        return sum(1 for code in pool_codes(header, body) if code not in consumed)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def estimate_count(qps: float, duration: float) -> int:
+    """按目标QPS和持续时间(秒)估算需要的邀请码数量"""
+    return int(qps * duration * HEADROOM)
+
+
+def default_vus(qps: Optional[float]) -> int:
+    """与 invitation-redeem-qps-test.js 的 maxVUs 计算保持一致（加载切片时k6会预分配全部VU，轮流使用各自的区间）"""
+    if qps is None:
+        return 100
+    return int(min(max(qps * 4, 6), 100))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='📒 邀请码消耗台账')
+    parser.add_argument('--ledger', default=CodeLedger.DEFAULT_PATH, help='台账文件路径')
+    parser.add_argument('--pool', default=DEFAULT_OUT, help='邀请码池文件（export_code_pool.py 导出）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    allocate_parser = subparsers.add_parser('allocate', help='为一次压测分配未使用过的邀请码切片')
+    allocate_parser.add_argument('--count', type=int, default=None, help='分配数量')
+    allocate_parser.add_argument('--qps', type=float, default=None, help='目标QPS（未指定--count时用于估算数量）')
+    allocate_parser.add_argument('--duration', type=float, default=600, help='压测持续时间(秒)，默认600')
+    allocate_parser.add_argument('--vus', type=int, default=None,
+                                 help='切分的VU数，需与k6的maxVUs一致（默认按--qps计算，未指定时为100）')
+    allocate_parser.add_argument('--run-id', default=None, help='运行标识（默认 redeem_时间戳）')
+    allocate_parser.add_argument('--out', default=None, help='切片文件路径（默认 results/code_slice_{run_id}.pool）')
+
+    subparsers.add_parser('runs', help='列出已分配的运行')
+    release_parser = subparsers.add_parser('release', help='归还一次运行的全部邀请码')
+    release_parser.add_argument('run_id')
+    subparsers.add_parser('stats', help='查看池中剩余可用的邀请码数量')
+
+    args = parser.parse_args()
+    ledger = CodeLedger(args.ledger)
+
+    if args.command == 'allocate':
+        if args.count is None and args.qps is None:
+            parser.error("allocate 需要 --count 或 --qps")
+        count = args.count if args.count is not None else estimate_count(args.qps, args.duration)
+        vus = args.vus or default_vus(args.qps)
+        run_id = args.run_id or f"redeem_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        slice_path = args.out or f"results/code_slice_{run_id}.pool"
+        allocated, per_vu = ledger.allocate(args.pool, count, vus, slice_path, run_id)
+        if not allocated:
+            print(f"❌ {args.pool} 中剩余的邀请码不足 {vus} 个，无法按VU切分，请先获取新的邀请码")
+        else:
+            print(f"📒 运行 {run_id}: 分配 {allocated} 个邀请码, {vus} 个VU × 每VU {per_vu} 个")
+            if allocated < count // vus * vus:
+                print(f"⚠️ 剩余邀请码不足，请求 {count} 个，实际分配 {allocated} 个")
+            print(f"📁 切片文件: {slice_path}")
+            print(f"💡 使用示例: k6 run -e INVITE_CODES_FILE={os.path.abspath(slice_path)} invitation-redeem-qps-test.js")
+    elif args.command == 'runs':
+        for run in ledger.runs():
+            created = datetime.fromtimestamp(run['created_at']).strftime('%Y-%m-%d %H:%M:%S')
+            print(f"📒 {run['run_id']}: {run['count']} 个邀请码, {run['vus']} 个VU, {created}, {run['slice']}")
+    elif args.command == 'release':
+        print(f"♻️ 已归还 {ledger.release(args.run_id)} 个邀请码")
+    elif args.command == 'stats':
+        print(f"📦 {args.pool} 剩余可用邀请码: {ledger.remaining(args.pool)}")
+
+    ledger.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+账户/邀请码索引库
+按 (prefix, index) 保存每个账户的最新结果: 邮箱、邀请码、状态(success/failed)、失败原因、更新时间。
+fetcher批量upsert写入（SQLite WAL，多进程可同时写），合并结果、覆盖率统计、导出k6数据都是带索引的查询，
+不再按日期前缀扫描 results/ 下的批次JSON文件（跨零点不会漏、同一天的旧文件不会混入）
+
+用法:
+    python3 code_store.py stats
+    python3 code_store.py coverage --start 1 --end 30000
+    python3 code_store.py export-k6 --out scripts/stress/data/loadtest_invite_codes.json
+    python3 code_store.py import results/loadtestc_invitation_codes_20250808_143022.json
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from background_writer import background_writer
+
+
+class CodeStore:
+    """基于SQLite(WAL)的账户结果库，线程安全，多进程可同时读写
+    add() 只把记录放进待写入列表，由后台落盘线程批量upsert
+    """
+
+    DEFAULT_PATH = "results/code_store.db"
+    # 累计多少条待写入记录后唤醒后台线程落盘（否则按后台线程的时间间隔落盘）
+    FLUSH_EVERY = 200
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS accounts (
+                prefix     TEXT NOT NULL,
+                idx        INTEGER NOT NULL,
+                email      TEXT NOT NULL,
+                code       TEXT,
+                status     TEXT NOT NULL,
+                reason     TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (prefix, idx)
+            )
+        """)
+        # 监控按时间窗口统计尝试数/成功数
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS accounts_by_time ON accounts (prefix, updated_at, status)")
+        self.conn.commit()
+
+        # lock只保护待写入列表；write_lock串行化SQLite连接的使用
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.pending: List[Tuple[str, int, str, Optional[str], str, Optional[str], float]] = []
+        self.writer = background_writer()
+        self.writer.register(self)
+
+    def add(self, prefix: str, index: int, email: str, code: Optional[str], reason: Optional[str] = None):
+        """记录一个账户的结果（后台批量落盘）；code为空表示失败，reason为失败原因"""
+        status = 'success' if code else 'failed'
+        with self.lock:
+            self.pending.append((prefix, index, email, code, status, None if code else reason, time.time()))
+            full = len(self.pending) >= self.FLUSH_EVERY
+        if full:
+            self.writer.wake()
+
+    def flush(self):
+        """把待写入的记录落盘"""
+        with self.write_lock:
+            with self.lock:
+                pending, self.pending = self.pending, []
+            if not pending or self.conn is None:
+                return
+            # 已成功的账户不会被之后的失败记录覆盖（例如重跑时token接口超时）
+            self.conn.executemany("""
+                INSERT INTO accounts (prefix, idx, email, code, status, reason, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(prefix, idx) DO UPDATE SET
+                    email      = excluded.email,
+                    code       = excluded.code,
+                    status     = excluded.status,
+                    reason     = excluded.reason,
+                    updated_at = excluded.updated_at
+                WHERE excluded.status = 'success' OR accounts.status != 'success'
+            """, pending)
+            self.conn.commit()
+
+    def close(self):
+        """落盘并关闭连接"""
+        self.writer.unregister(self)
+        self.flush()
+        with self.write_lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    def import_json(self, path: str, prefix: str) -> int:
+        """导入旧版 {email: code} 结果文件（索引从邮箱中解析，更新时间取文件修改时间），返回导入数量"""
+        pattern = re.compile(rf"^{re.escape(prefix)}(\d+)@")
+        with open(path, 'r', encoding='utf-8') as f:
+            codes = json.load(f)
+        updated_at = os.path.getmtime(path)
+        records = [(prefix, int(match.group(1)), email, code, 'success', None, updated_at)
+                   for email, code in codes.items()
+                   if code and (match := pattern.match(email))]
+        with self.lock:
+            self.pending.extend(records)
+        self.flush()
+        return len(records)
+
+    def _query(self, sql: str, params: tuple) -> List[tuple]:
+        self.flush()
+        with self.write_lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def codes(self, prefix: str, start: int, end: int, since: Optional[float] = None) -> Dict[str, str]:
+        """按索引顺序返回范围内已成功账户的 {email: code}；since只取该时间戳之后更新的记录"""
+        rows = self._query("""
+            SELECT email, code FROM accounts
+            WHERE prefix = ? AND idx BETWEEN ? AND ? AND status = 'success' AND updated_at >= ?
+            ORDER BY idx
+        """, (prefix, start, end, since or 0))
+        return dict(rows)
+
+    def successes(self, prefix: str, start: int, end: int) -> Dict[int, Tuple[str, str]]:
+        """范围内已成功的账户: {索引: (邮箱, 邀请码)}，与 CheckpointJournal.load_successes 格式相同，供 --resume 使用"""
+        rows = self._query("""
+            SELECT idx, email, code FROM accounts
+            WHERE prefix = ? AND idx BETWEEN ? AND ? AND status = 'success'
+        """, (prefix, start, end))
+        return {index: (email, code) for index, email, code in rows}
+
+    def coverage(self, prefix: str, start: int, end: int) -> Dict:
+        """范围内的覆盖率: 成功/失败/未尝试数、失败原因分布、成功索引的最小/最大值"""
+        rows = self._query("""
+            SELECT status, COALESCE(reason, ''), COUNT(*), MIN(idx), MAX(idx) FROM accounts
+            WHERE prefix = ? AND idx BETWEEN ? AND ?
+            GROUP BY status, reason
+        """, (prefix, start, end))
+        coverage = {'total': end - start + 1, 'success': 0, 'failed': 0, 'reasons': {},
+                    'min_index': None, 'max_index': None}
+        for status, reason, count, min_index, max_index in rows:
+            if status == 'success':
+                coverage['success'] = count
+                coverage['min_index'], coverage['max_index'] = min_index, max_index
+            else:
+                coverage['failed'] += count
+                coverage['reasons'][reason or 'unknown'] = count
+        coverage['missing'] = coverage['total'] - coverage['success'] - coverage['failed']
+        return coverage
+
+    def progress(self, prefix: str, since: float) -> Dict[str, int]:
+        """since之后有结果的账户数（attempted）及其中成功的数量（succeeded），供监控轮询"""
+        rows = self._query("""
+            SELECT status, COUNT(*) FROM accounts
+            WHERE prefix = ? AND updated_at >= ?
+            GROUP BY status
+        """, (prefix, since))
+        counts = dict(rows)
+        return {'attempted': sum(counts.values()), 'succeeded': counts.get('success', 0)}
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """按前缀统计账户总数与成功数"""
+        rows = self._query("""
+            SELECT prefix, COUNT(*), SUM(status = 'success'), MIN(idx), MAX(idx)
+            FROM accounts GROUP BY prefix
+        """, ())
+        return {prefix: {'total': total, 'success': success, 'min_index': min_index, 'max_index': max_index}
+                for prefix, total, success, min_index, max_index in rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='🗄️ 账户/邀请码索引库工具')
+    parser.add_argument('--store', default=CodeStore.DEFAULT_PATH, help='索引库文件路径')
+    parser.add_argument('--prefix', '-p', default="loadtestc", help='邮箱前缀')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('stats', help='按前缀查看账户数和成功数')
+
+    coverage_parser = subparsers.add_parser('coverage', help='查看索引范围内的覆盖率和失败原因')
+    coverage_parser.add_argument('--start', type=int, default=1, help='起始索引')
+    coverage_parser.add_argument('--end', type=int, default=30000, help='结束索引')
+
+    export_parser = subparsers.add_parser('export-k6', help='按索引顺序导出范围内的邀请码数组')
+    export_parser.add_argument('--start', type=int, default=1, help='起始索引')
+    export_parser.add_argument('--end', type=int, default=30000, help='结束索引')
+    export_parser.add_argument('--out', default='scripts/stress/data/loadtest_invite_codes.json',
+                               help='输出文件路径')
+
+    import_parser = subparsers.add_parser('import', help='导入旧版 {email: code} 结果JSON文件')
+    import_parser.add_argument('files', nargs='+')
+
+    args = parser.parse_args()
+    store = CodeStore(args.store)
+
+    if args.command == 'stats':
+        for prefix, stats in sorted(store.stats().items()):
+            print(f"📦 {prefix}: {stats['total']} 个账户, ✅ 成功 {stats['success']} 个"
+                  f" (索引 {stats['min_index']}-{stats['max_index']})")
+    elif args.command == 'coverage':
+        coverage = store.coverage(args.prefix, args.start, args.end)
+        print(f"📈 {args.prefix}{args.start} - {args.prefix}{args.end}: 共 {coverage['total']} 个账户")
+        print(f"✅ 成功: {coverage['success']} ({coverage['success'] / coverage['total'] * 100:.1f}%)")
+        print(f"❌ 失败: {coverage['failed']}")
+        for reason, count in sorted(coverage['reasons'].items(), key=lambda item: -item[1]):
+            print(f"   {reason}: {count}")
+        print(f"⏳ 未尝试: {coverage['missing']}")
+    elif args.command == 'export-k6':
+        codes = list(store.codes(args.prefix, args.start, args.end).values())
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(codes, f, indent=2, ensure_ascii=False)
+        print(f"📁 已导出 {len(codes)} 个邀请码到: {args.out}")
+    elif args.command == 'import':
+        for path in args.files:
+            print(f"📥 {path}: 导入 {store.import_json(path, args.prefix)} 个邀请码")
+
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导出k6使用的定宽邀请码池
+邀请码都是7位字符串，无需JSON的引号、逗号和缩进：文件第一行是头部（数量、宽度、CRC32校验），
+第二行把所有邀请码首尾相连，第i个邀请码就是 body[i*width:(i+1)*width]。
+30000个邀请码约210KB（格式化JSON数组约380KB，邮箱映射约1.1MB），k6启动时无需JSON.parse和Object.values，
+由 scripts/utils/code-pool.js 的 parseCodePool 解析进SharedArray
+
+用法:
+    python3 export_code_pool.py                                   # 从结果索引库导出 loadtestc1-30000
+    python3 export_code_pool.py --start 1 --end 100000 --out scripts/stress/data/loadtest_invite_codes.pool
+    python3 export_code_pool.py --from-json scripts/stress/data/loadtest_invite_codes.json
+    python3 export_code_pool.py --verify scripts/stress/data/loadtest_invite_codes.pool
+"""
+
+import argparse
+import json
+import re
+import zlib
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from code_store import CodeStore
+
+# 头部格式（一行文本，k6端用正则解析）
+POOL_MAGIC = "LTPOOL1"
+DEFAULT_WIDTH = 7
+DEFAULT_OUT = "scripts/stress/data/loadtest_invite_codes.pool"
+# 可选的 vus=N 表示文件已按N个VU预先切分为连续区间（code_ledger.py 分配的运行切片）
+_HEADER_PATTERN = re.compile(rf"^{POOL_MAGIC} count=(\d+) width=(\d+) crc32=([0-9a-f]{{8}})(?: vus=(\d+))?$")
+
+
+def write_pool(codes: List[str], path: str, width: int = DEFAULT_WIDTH, vus: int = 0) -> Tuple[int, List[str]]:
+    """写入定宽邀请码池，返回 (写入数量, 因长度不符被跳过的邀请码)；vus>0时在头部记录VU切分数"""
+    kept = [code for code in codes if len(code) == width and code.isascii()]
+    skipped = [code for code in codes if len(code) != width or not code.isascii()]
+    body = "".join(kept).encode('ascii')
+    header = f"{POOL_MAGIC} count={len(kept)} width={width} crc32={zlib.crc32(body):08x}"
+    header += f" vus={vus}\n" if vus else "\n"
+    with open(path, 'wb') as f:
+        f.write(header.encode('ascii'))
+        f.write(body)
+    return len(kept), skipped
+
+
+def read_pool(path: str) -> Tuple[Dict[str, int], bytes]:
+    """读取并校验邀请码池，返回 (头部字段, 正文)；头部、长度或校验和不符时抛出ValueError"""
+    with open(path, 'rb') as f:
+        header_line, _, body = f.read().partition(b"\n")
+    match = _HEADER_PATTERN.match(header_line.decode('ascii', 'replace'))
+    if not match:
+        raise ValueError(f"{path} 不是邀请码池文件")
+    header = {'count': int(match.group(1)), 'width': int(match.group(2)), 'crc32': int(match.group(3), 16),
+              'vus': int(match.group(4) or 0)}
+    if len(body) != header['count'] * header['width']:
+        raise ValueError(f"{path} 长度不符: 头部 {header['count']}x{header['width']}, 实际 {len(body)} 字节")
+    if zlib.crc32(body) != header['crc32']:
+        raise ValueError(f"{path} CRC32校验失败")
+    return header, body
+
+
+def pool_codes(header: Dict[str, int], body: bytes) -> List[str]:
+    """把正文按宽度切分为邀请码列表"""
+    width = header['width']
+    return [body[i:i + width].decode('ascii') for i in range(0, len(body), width)]
+
+
+def load_json_codes(path: str) -> List[str]:
+    """读取旧格式的邀请码文件（数组或 {email: code} 映射）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return list(data.values()) if isinstance(data, dict) else list(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='📦 导出k6定宽邀请码池')
+    parser.add_argument('--prefix', '-p', default="loadtestc", help='邮箱前缀')
+    parser.add_argument('--start', type=int, default=1, help='起始索引')
+    parser.add_argument('--end', type=int, default=30000, help='结束索引')
+    parser.add_argument('--store', default=CodeStore.DEFAULT_PATH, help='结果索引库路径')
+    parser.add_argument('--from-json', default=None, help='改为从JSON数组或邮箱映射文件导出')
+    parser.add_argument('--width', type=int, default=DEFAULT_WIDTH, help='邀请码宽度')
+    parser.add_argument('--out', default=DEFAULT_OUT, help='输出文件路径')
+    parser.add_argument('--verify', metavar='POOL', default=None, help='只校验已有的邀请码池文件')
+    args = parser.parse_args()
+
+    if args.verify:
+        header, _ = read_pool(args.verify)
+        print(f"✅ {args.verify}: {header['count']} 个邀请码, 宽度 {header['width']}, crc32={header['crc32']:08x}")
+        return
+
+    if args.from_json:
+        codes = load_json_codes(args.from_json)
+        source = args.from_json
+    else:
+        store = CodeStore(args.store)
+        codes = list(store.codes(args.prefix, args.start, args.end).values())
+        store.close()
+        source = f"{args.store} ({args.prefix}{args.start}-{args.prefix}{args.end})"
+
+    # 去重并保持原有顺序（同一邀请码只能兑换一次）
+    codes = list(dict.fromkeys(code for code in codes if code))
+    count, skipped = write_pool(codes, args.out, args.width)
+    print(f"📁 已从 {source} 导出 {count} 个邀请码到: {args.out}")
+    if skipped:
+        lengths = Counter(len(code) for code in skipped)
+        print(f"⚠️ 跳过 {len(skipped)} 个宽度不是 {args.width} 的邀请码 (长度分布: {dict(lengths)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+失败账户分类记录
+每个最终失败的账户记录一条结构化原因：原因代码（阶段_类别，如 token_http_400、token_timeout、invitation_http_524、
+invitation_no_code）、阶段、HTTP状态码、最后一次请求的延迟、尝试次数。运行结束时按原因输出汇总表，
+失败文件写成JSONL（每行一个账户），定向重试和容量分析可以按原因筛选，不必翻日志
+
+用法:
+    python3 failure_report.py summary results/loadtestc_invitation_failed_20250808_143022.jsonl
+    python3 failure_report.py select results/loadtestc_invitation_failed_*.jsonl --reason token_timeout --out retry.txt
+    python3 failure_report.py select results/loadtestc_invitation_failed_*.jsonl --transient --format ranges
+"""
+
+import argparse
+import json
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from retry_queue import Failure, is_transient
+
+
+def reason_code(stage: str, failure: Optional[Failure]) -> str:
+    """原因代码: token_http_401 / invitation_timeout / invitation_no_code ..."""
+    if isinstance(failure, int):
+        return f"{stage}_http_{failure}"
+    return f"{stage}_{failure or 'unknown'}"
+
+
+class FailureReport:
+    """一次运行中所有最终失败账户的结构化记录（线程安全）"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.records: List[Dict] = []
+
+    def add(self, index: int, email: str, stage: str, failure: Optional[Failure], latency: Optional[float],
+            attempts: int) -> Dict:
+        """记录一个最终失败的账户，返回该条记录"""
+        record = {
+            'index': index,
+            'email': email,
+            'reason': reason_code(stage, failure),
+            'stage': stage,
+            'status': failure if isinstance(failure, int) else None,
+            'error': None if isinstance(failure, int) else failure,
+            'latency_ms': None if latency is None else round(latency * 1000, 1),
+            'attempts': attempts,
+            'time': round(time.time(), 3),
+        }
+        with self.lock:
+            self.records.append(record)
+        return record
+
+    def extend(self, records: Iterable[Dict]):
+        """合并其他进程回传的记录"""
+        with self.lock:
+            self.records.extend(records)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def summary_lines(self) -> List[str]:
+        """按原因汇总的表格（数量降序）"""
+        return summarize(self.records)
+
+    def save(self, path: str):
+        """按索引顺序写成JSONL"""
+        with self.lock:
+            records = sorted(self.records, key=lambda record: record['index'])
+        with open(path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def summarize(records: List[Dict]) -> List[str]:
+    """按原因汇总：数量、占比、平均/最大延迟、平均尝试次数"""
+    groups: Dict[str, List[Dict]] = defaultdict(list)
+    for record in records:
+        groups[record['reason']].append(record)
+    if not groups:
+        return []
+
+    # 表头是全角字符，按显示宽度（每字2列）对齐
+    columns = (('数量', 8), ('占比', 11), ('平均延迟', 12), ('最大延迟', 12), ('平均尝试', 10))
+    lines = ["原因" + " " * 24 + "".join(" " * (width - 2 * len(title)) + title for title, width in columns)]
+    for reason, group in sorted(groups.items(), key=lambda item: -len(item[1])):
+        latencies = [record['latency_ms'] for record in group if record['latency_ms'] is not None]
+        avg_latency = f"{sum(latencies) / len(latencies):.0f}ms" if latencies else "-"
+        max_latency = f"{max(latencies):.0f}ms" if latencies else "-"
+        attempts = sum(record['attempts'] for record in group) / len(group)
+        lines.append(f"{reason:<28}{len(group):>8}{len(group) / len(records) * 100:>10.1f}%"
+                     f"{avg_latency:>12}{max_latency:>12}{attempts:>10.1f}")
+    return lines
+
+
+def load_failures(paths: Iterable[str]) -> List[Dict]:
+    """读取一个或多个失败JSONL文件（同一账户出现多次时保留最后一条）"""
+    records: Dict[str, Dict] = {}
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    records[record['email']] = record
+    return list(records.values())
+
+
+def index_ranges(indices: List[int]) -> List[str]:
+    """把索引压缩成 start-end 区间（可直接作为 get_invitation_codes.py 的 --start/--count）"""
+    ranges = []
+    for index in sorted(indices):
+        if ranges and index == ranges[-1][1] + 1:
+            ranges[-1][1] = index
+        else:
+            ranges.append([index, index])
+    return [f"{start}-{end}" if start != end else str(start) for start, end in ranges]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='📋 失败账户分类工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    summary_parser = subparsers.add_parser('summary', help='按原因汇总失败文件')
+    summary_parser.add_argument('files', nargs='+')
+
+    select_parser = subparsers.add_parser('select', help='按原因筛选失败账户')
+    select_parser.add_argument('files', nargs='+')
+    select_parser.add_argument('--reason', action='append', default=None,
+                               help='原因代码（可重复，也可写前缀如 token_），默认全部')
+    select_parser.add_argument('--transient', action='store_true', help='只选瞬时失败（超时、连接断开、5xx、429）')
+    select_parser.add_argument('--format', choices=['emails', 'ranges'], default='emails',
+                               help='emails: 每行一个邮箱; ranges: 合并后的索引区间')
+    select_parser.add_argument('--out', default=None, help='输出文件（默认打印到终端）')
+
+    args = parser.parse_args()
+    records = load_failures(args.files)
+
+    if args.command == 'summary':
+        print(f"📋 共 {len(records)} 个失败账户")
+        for line in summarize(records):
+            print(f"   {line}")
+    elif args.command == 'select':
+        if args.reason:
+            records = [record for record in records
+                       if any(record['reason'].startswith(reason) for reason in args.reason)]
+        if args.transient:
+            records = [record for record in records
+                       if is_transient(record['status'] if record['status'] is not None else record['error'])]
+        if args.format == 'ranges':
+            lines = index_ranges([record['index'] for record in records])
+        else:
+            lines = [record['email'] for record in sorted(records, key=lambda record: record['index'])]
+        if args.out:
+            with open(args.out, 'w', encoding='utf-8') as f:
+                f.writelines(f"{line}\n" for line in lines)
+            print(f"📁 已导出 {len(records)} 个失败账户到: {args.out}")
+        else:
+            for line in lines:
+                print(line)
+
+
+if __name__ == "__main__":
+    main()
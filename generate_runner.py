@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+turbo / stable 批量生成脚本共用的驱动
+两个脚本只在进程数、分片大小、并发数和输出文件标签上不同：命令行参数、进程池模式、
+子进程批次模式以及结果/延迟/失败记录的汇总保存都在这里实现一次
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import metrics
+from code_store import CodeStore
+from failure_report import FailureReport
+from latency_histogram import LatencyRecorder
+from progress_shm import ProgressBoard, default_name, format_totals
+from shard_pool import print_shard_progress, run_sharded, split_ranges
+
+PREFIX = "loadtestc"
+
+
+def add_generate_arguments(parser):
+    """两个生成脚本共用的命令行参数"""
+    parser.add_argument('--mode', choices=['pool', 'subprocess'], default='pool',
+                        help='pool: 常驻进程池(默认); subprocess: 每批启动一个get_invitation_codes.py子进程')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='启用AIMD自适应并发：预设并发只作为起点，按延迟和5xx/524自动收敛')
+    parser.add_argument('--auth-qps', type=float, default=0,
+                        help='/connect/token 全局QPS预算（所有进程合计，0表示不限速）')
+    parser.add_argument('--api-qps', type=float, default=0,
+                        help='invitation/info 全局QPS预算（所有进程合计，0表示不限速）')
+    parser.add_argument('--resume', action='store_true',
+                        help='跳过已成功获取的账户（从结果索引库读取，--no-code-store 时读取断点日志）')
+    parser.add_argument('--checkpoint', action='store_true',
+                        help='额外记录断点日志 results/{prefix}_checkpoint.jsonl（默认只写结果索引库）')
+    parser.add_argument('--result-sink', action='store_true',
+                        help='额外写增量结果文件 results/{prefix}_codes.ndjson（默认只写结果索引库）')
+    parser.add_argument('--no-code-store', action='store_true',
+                        help='不写入账户/邀请码索引库（结果只在内存中合并，subprocess模式与覆盖率统计不可用）')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='各worker进程从该端口起依次提供 /metrics 实时指标')
+    parser.add_argument('--metrics-host', default=metrics.DEFAULT_HOST,
+                        help='指标服务监听地址（默认只监听本机；0.0.0.0 会在所有网卡上暴露运行数据）')
+    parser.add_argument('--skip-unregistered', action='store_true',
+                        help='跳过注册状态位图中已知未注册的账户（先用 check_account_status.py 检查）')
+    parser.add_argument('--http2', action='store_true',
+                        help='改用HTTP/2连接，每个进程的所有线程在少量连接上多路复用（需要 httpx[http2]）')
+    parser.add_argument('--warmup', action='store_true',
+                        help='每个进程开始前预热连接池：解析DNS并用HEAD请求建立与并发数相同的连接（默认不预热）')
+
+
+def generate_options(args) -> Dict:
+    """把命令行参数整理成传给各批次的选项"""
+    if args.resume and args.no_code_store and not args.checkpoint:
+        raise SystemExit("❌ --resume 需要结果索引库或断点日志：--no-code-store 时请同时指定 --checkpoint")
+    if args.mode == 'subprocess' and args.no_code_store:
+        raise SystemExit("❌ subprocess模式从结果索引库合并结果，不能与 --no-code-store 同时使用")
+    return {
+        'adaptive': args.adaptive,
+        'qps_budget': (args.auth_qps, args.api_qps),
+        'resume': args.resume,
+        'checkpoint': args.checkpoint,
+        'result_sink': args.result_sink,
+        'code_store': not args.no_code_store,
+        'metrics_port': args.metrics_port,
+        'metrics_host': args.metrics_host,
+        'skip_unregistered': args.skip_unregistered,
+        'http2': args.http2,
+        'warmup': args.warmup,
+    }
+
+
+def run_batch(batch: Tuple[int, int, int, int], options: Dict, timeout: int,
+              progress_name: Optional[str] = None, latency_out: Optional[str] = None):
+    """以get_invitation_codes.py子进程运行单个批次，返回 (batch_id, 是否成功, 错误信息)"""
+    batch_id, start_idx, count, workers = batch
+
+    cmd = [
+        sys.executable,
+        "get_invitation_codes.py",
+        "--prefix", PREFIX,
+        "--start", str(start_idx),
+        "--count", str(count),
+        "--workers", str(workers)
+    ]
+    if options['adaptive']:
+        cmd.append("--adaptive")
+    # QPS预算是全局的，各子进程共用同一组令牌桶
+    auth_qps, api_qps = options['qps_budget']
+    cmd += ["--auth-qps", str(auth_qps), "--api-qps", str(api_qps)]
+    if options['resume']:
+        cmd.append("--resume")
+    if options['checkpoint']:
+        cmd.append("--checkpoint")
+    if options['result_sink']:
+        cmd.append("--result-sink")
+    if options['metrics_port']:
+        # 端口被占用时子进程自动顺延，同时运行的批次各占一个端口
+        cmd += ["--metrics-port", str(options['metrics_port']), "--metrics-host", options['metrics_host']]
+    if progress_name:
+        # 每个批次独占一个槽位，父进程汇总所有槽位得到实时进度
+        cmd += ["--progress-shm", progress_name, "--progress-slot", str(batch_id - 1)]
+    if latency_out:
+        cmd += ["--latency-out", latency_out]
+    if options['skip_unregistered']:
+        cmd.append("--skip-unregistered")
+    if options['http2']:
+        cmd.append("--http2")
+    if options['warmup']:
+        cmd.append("--warmup")
+
+    print(f"🚀 批次 {batch_id}: {PREFIX}{start_idx} - {PREFIX}{start_idx + count - 1} (并发:{workers})")
+
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+
+        if result.returncode == 0:
+            print(f"✅ 批次 {batch_id} 完成")
+            return batch_id, True, None
+        else:
+            print(f"❌ 批次 {batch_id} 失败: {result.stderr}")
+            return batch_id, False, result.stderr
+
+    except subprocess.TimeoutExpired:
+        print(f"⏰ 批次 {batch_id} 超时")
+        return batch_id, False, "timeout"
+    except Exception as e:
+        print(f"💥 批次 {batch_id} 异常: {str(e)}")
+        return batch_id, False, str(e)
+
+
+def generate_pool(tag: str, title: str, total_accounts: int, num_processes: int, batch_size: int,
+                  workers_per_batch: int, options: Dict) -> Optional[Dict]:
+    """进程池模式：长驻worker进程复用fetcher，结果经队列流式回传；返回结果库覆盖率（没有结果时为None）"""
+    shards = split_ranges(1, total_accounts, batch_size)
+
+    print(f"📦 总分片数: {len(shards)}")
+    print(f"🔧 常驻worker进程数: {num_processes}")
+    print(f"⚡ 每进程并发数: {workers_per_batch}")
+
+    start_time = time.time()
+    # 每个worker进程一个槽位（worker异常退出时进程池直接报错，不会重建worker）
+    progress_board = ProgressBoard.create(default_name(PREFIX), num_processes)
+    latency = LatencyRecorder()
+    failures = FailureReport()
+    auth_qps, api_qps = options['qps_budget']
+    try:
+        all_codes, failed_accounts = run_sharded(
+            PREFIX, shards, num_processes, workers_per_batch, checkpoint=options['checkpoint'],
+            result_sink=options['result_sink'],
+            code_store_path=CodeStore.DEFAULT_PATH if options['code_store'] else None, adaptive=options['adaptive'],
+            auth_qps=auth_qps, api_qps=api_qps, resume=options['resume'], metrics_port=options['metrics_port'],
+            metrics_host=options['metrics_host'],
+            progress_name=progress_board.name, skip_unregistered=options['skip_unregistered'],
+            http2=options['http2'], warmup=options['warmup'], latency=latency, failures=failures,
+            on_shard_done=print_shard_progress(len(shards), start_time)
+        )
+    finally:
+        progress_board.close()
+
+    elapsed = time.time() - start_time
+    print(f"\n🎉 {title}完成!")
+    print(f"⏱️  总耗时: {elapsed/60:.1f}分钟")
+    print(f"✅ 成功获取: {len(all_codes)}")
+    print(f"❌ 获取失败: {len(failed_accounts)}")
+
+    save_merged_latency(latency, tag)
+    save_failure_report(failures, tag)
+
+    # 结果已在内存中，直接保存，无需再扫描批次文件
+    return save_merged_results(all_codes, total_accounts, tag, options['code_store'])
+
+
+def generate_subprocess(tag: str, title: str, total_accounts: int, num_processes: int,
+                        batches: List[Tuple[int, int, int, int]], options: Dict,
+                        batch_timeout: int, poll_interval: float) -> Optional[Dict]:
+    """子进程模式：每个批次启动一个get_invitation_codes.py，结束后从结果库合并；返回结果库覆盖率"""
+    print(f"📦 总批次数: {len(batches)}")
+    print(f"🔧 并行进程数: {num_processes}")
+    print(f"⚡ 每批并发数: {batches[0][3] if batches else 0}")
+
+    start_time = time.time()
+
+    # 每个批次一个槽位，子进程运行期间父进程也能看到实时进度
+    progress_board = ProgressBoard.create(default_name(PREFIX), len(batches))
+    # 每个批次各写一个延迟直方图文件，全部结束后合并
+    run_tag = datetime.now().strftime("%Y%m%d_%H%M%S")
+    latency_files = {batch[0]: f"results/{PREFIX}_latency_{run_tag}_batch{batch[0]}.json" for batch in batches}
+
+    # 使用进程池并行执行
+    try:
+        with ProcessPoolExecutor(max_workers=num_processes) as executor:
+            pending = {executor.submit(run_batch, batch, options, batch_timeout, progress_board.name,
+                                       latency_files[batch[0]])
+                       for batch in batches}
+
+            completed = 0
+            failed = 0
+
+            while pending:
+                done, pending = wait(pending, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                if not done:
+                    # 没有批次结束时定期从共享内存读取一次汇总进度（无文件I/O）
+                    print(format_totals(progress_board.totals(), total_accounts))
+
+                for future in done:
+                    batch_id, success, error = future.result()
+
+                    if success:
+                        completed += 1
+                        elapsed = time.time() - start_time
+                        eta_minutes = (len(batches) - completed) * elapsed / completed / 60
+                        print(f"📊 进度: {completed}/{len(batches)} 批次完成 (预计剩余: {eta_minutes:.1f}分钟)")
+                    else:
+                        failed += 1
+                        print(f"❌ 批次 {batch_id} 失败: {error}")
+    finally:
+        progress_board.close()
+
+    elapsed = time.time() - start_time
+    print(f"\n🎉 {title}完成!")
+    print(f"⏱️  总耗时: {elapsed/60:.1f}分钟")
+    print(f"✅ 成功批次: {completed}")
+    print(f"❌ 失败批次: {failed}")
+
+    latency = LatencyRecorder.load(latency_files.values())
+    for path in latency_files.values():
+        if os.path.exists(path):
+            os.remove(path)
+    save_merged_latency(latency, tag)
+
+    # 收集和合并结果
+    print("📝 正在收集和合并结果...")
+    # 续跑时取范围内全部成功账户，否则只取本次运行写入的记录
+    return collect_and_merge_results(total_accounts, tag, None if options['resume'] else start_time)
+
+
+def collect_and_merge_results(total_accounts: int, tag: str, since: Optional[float] = None) -> Optional[Dict]:
+    """按索引范围查询结果库中的邀请码并合并（不再扫描批次JSON文件）"""
+    store = CodeStore()
+    all_codes = store.codes(PREFIX, 1, total_accounts, since)
+    store.close()
+    print(f"🔍 从 {CodeStore.DEFAULT_PATH} 查询到 {len(all_codes)} 个邀请码")
+
+    return save_merged_results(all_codes, total_accounts, tag)
+
+
+def save_merged_latency(latency: LatencyRecorder, tag: str):
+    """输出合并后的各阶段延迟分位数并保存直方图"""
+    lines = latency.summary_lines()
+    if not lines:
+        return
+    print("⏱️ 延迟分布:")
+    for line in lines:
+        print(f"   {line}")
+    latency_file = f"results/{PREFIX}_{tag}_latency_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    latency.save(latency_file)
+    print(f"📁 延迟直方图: {latency_file}")
+
+
+def save_failure_report(failures: FailureReport, tag: str):
+    """输出按原因汇总的失败表并保存失败记录JSONL"""
+    if not failures:
+        return
+    print("📋 失败原因:")
+    for line in failures.summary_lines():
+        print(f"   {line}")
+    failure_file = f"results/{PREFIX}_{tag}_failed_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+    failures.save(failure_file)
+    print(f"📁 失败记录: {failure_file}")
+
+
+def range_coverage(total_accounts: int) -> Dict:
+    """查询结果库中 1..total_accounts 的覆盖率"""
+    store = CodeStore()
+    coverage = store.coverage(PREFIX, 1, total_accounts)
+    store.close()
+    return coverage
+
+
+def save_merged_results(all_codes: Dict[str, str], total_accounts: int, tag: str,
+                        with_coverage: bool = True) -> Optional[Dict]:
+    """保存合并后的邀请码（完整映射、K6数组、测试数据目录），返回结果库覆盖率（没有结果或不查询结果库时为None）"""
+    if not all_codes:
+        print("❌ 没有找到任何邀请码数据")
+        return None
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    # 保存合并后的完整数据
+    merged_file = f"results/{PREFIX}_{tag}_30k_codes_{timestamp}.json"
+    with open(merged_file, "w", encoding='utf-8') as f:
+        json.dump(all_codes, f, indent=2, ensure_ascii=False)
+
+    # 保存K6格式数据
+    codes_list = list(all_codes.values())
+    k6_file = f"results/{PREFIX}_{tag}_30k_k6_{timestamp}.json"
+    with open(k6_file, "w", encoding='utf-8') as f:
+        json.dump(codes_list, f, indent=2, ensure_ascii=False)
+
+    # 更新测试数据目录
+    test_data_file = f"scripts/stress/data/loadtest_invite_codes_{tag}.json"
+    with open(test_data_file, "w", encoding='utf-8') as f:
+        json.dump(codes_list, f, indent=2, ensure_ascii=False)
+
+    print("\n🎯 最终结果:")
+    print(f"📊 总邀请码数量: {len(all_codes):,}")
+    print(f"📁 完整数据: {merged_file}")
+    print(f"📁 K6数据: {k6_file}")
+    print(f"📁 测试数据: {test_data_file}")
+
+    if not with_coverage:
+        return None
+    # 显示覆盖范围（按索引查询结果库，包含此前运行已成功的账户）
+    coverage = range_coverage(total_accounts)
+    print(f"📈 覆盖范围: {PREFIX}{coverage['min_index']} - {PREFIX}{coverage['max_index']}")
+    print(f"📉 覆盖率: {coverage['success']/coverage['total']*100:.2f}% "
+          f"(失败 {coverage['failed']}, 未尝试 {coverage['missing']})")
+    for reason, count in sorted(coverage['reasons'].items(), key=lambda item: -item[1]):
+        print(f"   ❌ {reason}: {count}")
+    return coverage
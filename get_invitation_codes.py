@@ -6,14 +6,35 @@
 """
 
 import requests
+import asyncio
 import json
+import importlib.util
+import queue
+import socket
 import time
 import threading
 import argparse
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import logging
-from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+from typing import Callable, Dict, Optional, Tuple
+
+import metrics
+from account_registry import AccountRegistry
+from adaptive_limiter import AIMDLimiter, is_overload_status
+from checkpoint import CheckpointJournal
+from code_store import CodeStore
+from latency_histogram import LatencyRecorder
+from progress_shm import ProgressBoard, ProgressSlot
+from rate_limiter import EndpointRateLimits
+from result_sink import ResultSink
+from failure_report import FailureReport
+from http2_session import Http2Session
+from log_pipeline import LogSampler, setup_queue_logging
+from retry_queue import Failure, RetryPolicy, RetryScheduler, classify_exception, describe_failure, is_transient
+from task_stream import PENDING_PER_WORKER, submit_bounded
+from token_cache import TokenCache
 
 # 🚀 配置参数
 class Config:
@@ -25,9 +46,89 @@ class Config:
     DEFAULT_WORKERS = 30
     REQUEST_TIMEOUT = 30
     
+    # 执行引擎：thread（线程池+requests）或 async（asyncio+aiohttp）
+    DEFAULT_ENGINE = "thread"
+    # 线程引擎的HTTP/2模式（httpx）：整个进程对两个域名合计的最大连接数，
+    # 所有线程的请求在这些连接上多路复用
+    HTTP2_MAX_CONNECTIONS = 4
+    # async引擎下单进程同时在途的最大请求数
+    DEFAULT_MAX_INFLIGHT = 200
+    
+    # refresh_token被authserver拒绝（invalid_grant）时的状态码：只有这种情况才回退password登录，
+    # 超时、5xx、524说明authserver过载，再追加一次昂贵的password请求只会加重负载
+    REFRESH_REJECTED_STATUSES = (400, 401)
+    
+    # 自适应并发（AIMD）的上下限
+    ADAPTIVE_MIN_INFLIGHT = 4
+    ADAPTIVE_MAX_INFLIGHT = 500
+    
+    # 全局QPS预算（所有进程合计，0表示不限速）
+    DEFAULT_AUTH_QPS = 0
+    DEFAULT_API_QPS = 0
+    
+    # 瞬时失败（超时、5xx、524、429）的重试：包含首次在内的最大尝试次数与退避时间(秒)
+    DEFAULT_MAX_ATTEMPTS = 3
+    RETRY_BASE_DELAY = 1.0
+    RETRY_MAX_DELAY = 30.0
+    
+    # 逐账户成功日志每N个账户记录1条（失败日志全部记录）
+    LOG_SAMPLE = 100
+    
     # 默认密码（根据实际情况调整）
     DEFAULT_PASSWORD = "Wh520520!"
 
+# 🌐 请求头（线程引擎与async引擎共用）
+AUTH_HEADERS = {
+    'accept': 'application/json',
+    'accept-language': 'en,zh-CN;q=0.9,zh;q=0.8',
+    'content-type': 'application/x-www-form-urlencoded',
+    'origin': 'https://godgpt-ui-testnet.aelf.dev',
+    'referer': 'https://godgpt-ui-testnet.aelf.dev/',
+    'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+}
+
+API_HEADERS = {
+    'accept': 'application/json',
+    'content-type': 'application/json',
+    'origin': 'https://godgpt-ui-testnet.aelf.dev',
+    'referer': 'https://godgpt-ui-testnet.aelf.dev/',
+    'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+}
+
+def warmup_targets() -> Dict[str, str]:
+    """预热目标: 域名 -> 该域名上的接口地址（认证和邀请码接口同域名时只预热一次）"""
+    targets = {}
+    for url in (Config.AUTH_URL, Config.INVITATION_CODE_URL):
+        targets.setdefault(urlsplit(url).netloc, url)
+    return targets
+
+def resolve_hosts(targets: Dict[str, str]) -> Dict[str, Optional[float]]:
+    """每个域名解析一次DNS，返回耗时(毫秒)；解析失败记为None，之后的请求会给出具体错误"""
+    dns = {}
+    for netloc, url in targets.items():
+        parts = urlsplit(url)
+        start = time.perf_counter()
+        try:
+            socket.getaddrinfo(parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80),
+                               type=socket.SOCK_STREAM)
+            dns[netloc] = round((time.perf_counter() - start) * 1000, 1)
+        except OSError as e:
+            logging.warning(f"⚠️ DNS解析失败 {parts.hostname}: {e}")
+            dns[netloc] = None
+    return dns
+
+def describe_warmup(stats: dict) -> str:
+    """预热结果的一行描述"""
+    hosts = []
+    for netloc, opened in stats['connections'].items():
+        dns = stats['dns_ms'][netloc]
+        dns_text = "失败" if dns is None else f"{dns:.0f}ms"
+        hosts.append(f"{netloc} DNS {dns_text} 连接 {opened}/{stats['requested']}")
+    return f"{'; '.join(hosts)}, 用时 {stats['seconds']:.2f}秒"
+
+# 请求端点 -> 延迟直方图中的阶段名
+LATENCY_STAGES = {'auth': 'token', 'invitation': 'invitation'}
+
 # 📊 全局统计
 class GlobalStats:
     def __init__(self):
@@ -38,38 +139,126 @@ class GlobalStats:
         self.start_time = time.time()
         self.lock = threading.Lock()
 
+# ⏱️ 流水线阶段统计
+class StageStats:
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.processed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.busy_seconds = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds: float, ok: bool):
+        """记录一次阶段处理耗时与结果"""
+        with self.lock:
+            self.processed += 1
+            self.busy_seconds += seconds
+            if not ok:
+                self.failed += 1
+
+    def summary(self, wall_seconds: float) -> str:
+        avg_ms = self.busy_seconds / self.processed * 1000 if self.processed else 0
+        # 利用率 = 阶段忙碌时间 / (线程数 × 墙钟时间)，接近100%说明该阶段是瓶颈
+        utilization = self.busy_seconds / (self.workers * wall_seconds) * 100 if wall_seconds > 0 else 0
+        text = (f"{self.name}: 处理 {self.processed} 个, 失败 {self.failed} 个, 平均 {avg_ms:.0f}ms, "
+                f"线程 {self.workers}, 利用率 {utilization:.0f}%")
+        if self.skipped:
+            text += f", 缓存命中跳过 {self.skipped} 个"
+        return text
+
 # 🔧 设置日志
 def setup_logging(log_filename: str):
     """设置日志配置"""
     import os
     os.makedirs("results", exist_ok=True)
     
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(f"results/{log_filename}", encoding='utf-8'),
-            logging.StreamHandler()
-        ]
-    )
+    # 文件和终端由后台线程写出，请求线程只入队
+    setup_queue_logging([
+        logging.FileHandler(f"results/{log_filename}", encoding='utf-8'),
+        logging.StreamHandler()
+    ])
 
 class InvitationCodeFetcher:
-    def __init__(self, prefix: str, start_index: int, end_index: int, workers: int, password: str):
+    def __init__(self, prefix: str, start_index: int, end_index: int, workers: int, password: str,
+                 max_inflight: int = Config.DEFAULT_MAX_INFLIGHT, token_cache: Optional[TokenCache] = None,
+                 limiter: Optional[AIMDLimiter] = None, rate_limits: Optional[EndpointRateLimits] = None,
+                 pipeline: Optional[Tuple[int, int]] = None, journal: Optional[CheckpointJournal] = None,
+                 sink: Optional[ResultSink] = None, progress: Optional[ProgressSlot] = None,
+                 store: Optional[CodeStore] = None, registry: Optional[AccountRegistry] = None,
+                 retry_policy: Optional[RetryPolicy] = None, http2: bool = False, warmup: int = 0,
+                 log_sample: int = Config.LOG_SAMPLE):
         self.prefix = prefix
         self.start_index = start_index
         self.end_index = end_index
-        self.workers = workers
         self.password = password
-        # 优化连接池配置 - 增加最大连接数
-        self.session = requests.Session()
-        adapter = requests.adapters.HTTPAdapter(
-            pool_connections=workers,
-            pool_maxsize=workers * 2,
-            max_retries=1,
-            pool_block=False
-        )
-        self.session.mount('http://', adapter)
-        self.session.mount('https://', adapter)
+        # 自适应并发限制器（None表示固定并发）
+        self.limiter = limiter
+        # 线程引擎: 固定并发的线程数；自适应模式下线程池随限制器的当前上限按需扩张（见fetch_range）
+        self.workers = workers
+        # async引擎: 自适应模式下协程数取上限（等待限制器的协程几乎没有开销），实际在途请求数由限制器控制
+        self.max_inflight = limiter.max_limit if limiter else max_inflight
+        # 跨进程共享的端点QPS预算（None表示不限速）
+        self.rate_limits = rate_limits
+        # token缓存（None表示每次都重新登录）
+        self.token_cache = token_cache
+        # 认证方式统计: password / refresh_token / refresh_failed
+        self.auth_counts = {}
+        # 每个账户完成后的回调 (email, invitation_code或None, 失败记录或None)，进程池模式用它把结果流式回传父进程
+        self.result_callback: Optional[Callable[[str, Optional[str], Optional[dict]], None]] = None
+        # 断点续跑日志（None表示不记录），以及从日志恢复、本次无需再获取的索引
+        self.journal = journal
+        self.resumed_indices = set()
+        # 增量结果输出（None表示只在结束时写JSON文件），下游工具按偏移增量读取
+        self.sink = sink
+        # 按 (prefix, index) 索引的结果库（None表示不写入），合并/覆盖率统计/导出直接查询
+        self.store = store
+        # 注册状态位图（None表示不过滤），位图中已知未注册的账户不发认证请求
+        self.registry = registry
+        self.skipped_unregistered = 0
+        # 瞬时失败的重试策略，以及当前区间的任务调度器（首次任务 + 到期的重试）
+        self.retry_policy = retry_policy or RetryPolicy(Config.DEFAULT_MAX_ATTEMPTS, Config.RETRY_BASE_DELAY,
+                                                        Config.RETRY_MAX_DELAY)
+        self.scheduler: Optional[RetryScheduler] = None
+        # 每个账户本次尝试最近一次失败的 (阶段, 类别, 延迟)，类别为HTTP状态码或异常类别，决定是否重试
+        self.last_failures: Dict[str, Tuple[str, Failure, float]] = {}
+        # 最终失败账户的结构化记录（原因代码、阶段、状态码、延迟），结束时输出汇总表和JSONL
+        self.failures = FailureReport()
+        # 重试统计: scheduled 放回队列次数 / recovered 重试后成功 / exhausted 用完次数仍失败 / permanent 非瞬时失败
+        self.retry_counts = {'scheduled': 0, 'recovered': 0, 'exhausted': 0, 'permanent': 0}
+        # 共享内存进度槽位（None表示不上报），父进程/监控进程可无I/O读取实时进度
+        self.progress = progress
+        # 按 (阶段, 结果) 记录的延迟直方图: token/success、invitation/failed ...
+        self.latency = LatencyRecorder()
+        # 逐账户成功日志的采样（失败日志不采样）
+        self.log_sampler = LogSampler(log_sample)
+        # 直方图输出路径（None表示写入带时间戳的默认文件）
+        self.latency_out: Optional[str] = None
+        # 两阶段流水线 (认证线程数, 邀请码线程数)，None表示每个线程顺序完成认证+获取
+        self.pipeline = pipeline
+        pool_size = sum(pipeline) if pipeline else limiter.max_limit if limiter else self.workers
+        # 计时阶段开始前每个域名预先建立的连接数（0表示不预热）
+        self.warmup = warmup
+        # 线程引擎的连接池每个域名最多保留的空闲连接数，预热超过这个数的连接会被丢弃
+        self.pool_connections = Config.HTTP2_MAX_CONNECTIONS if http2 else pool_size * 2
+        # 预热耗时（DNS、连接建立），单独报告，不计入总耗时和吞吐
+        self.setup_stats: Optional[dict] = None
+        if http2:
+            # HTTP/2: 所有线程共用少量连接上的多路流，不再每个线程各占一条TLS连接
+            self.session = Http2Session(Config.HTTP2_MAX_CONNECTIONS,
+                                        urls=(Config.AUTH_URL, Config.INVITATION_CODE_URL))
+        else:
+            # 优化连接池配置 - 增加最大连接数
+            self.session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=pool_size,
+                pool_maxsize=pool_size * 2,
+                max_retries=1,
+                pool_block=False
+            )
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
         self.invitation_codes = {}
         self.failed_accounts = []
         self.lock = threading.Lock()
@@ -79,101 +268,689 @@ class InvitationCodeFetcher:
         """生成邮箱地址"""
         return f"{self.prefix}{index}@teml.net"
 
-    def get_bearer_token(self, email: str) -> Optional[str]:
-        """获取用户的Bearer Token"""
+    def build_token_form(self, email: str) -> Dict[str, str]:
+        """构造password模式的token请求表单"""
+        return {
+            'grant_type': 'password',
+            'client_id': 'AevatarAuthServer',
+            'apple_app_id': 'com.gpt.god',
+            'scope': 'Aevatar offline_access',
+            'username': email,
+            'password': self.password
+        }
+
+    @staticmethod
+    def parse_invitation_code(data: dict) -> Optional[str]:
+        """从invitation/info响应中解析邀请码"""
+        # API返回格式: {"code": "20000", "data": {"inviteCode": "xxx", ...}}
+        if data.get('code') == '20000' and data.get('data'):
+            invite_data = data.get('data', {})
+            if isinstance(invite_data, dict) and 'inviteCode' in invite_data:
+                return invite_data['inviteCode']
+        return None
+
+    def build_refresh_form(self, refresh_token: str) -> Dict[str, str]:
+        """构造refresh_token模式的token请求表单"""
+        return {
+            'grant_type': 'refresh_token',
+            'client_id': 'AevatarAuthServer',
+            'apple_app_id': 'com.gpt.god',
+            'refresh_token': refresh_token
+        }
+
+    def cache_token(self, email: str, token_data: dict, issued_at: float):
+        """把登录响应写入token缓存（含refresh_token）"""
+        if self.token_cache:
+            self.token_cache.put(email, token_data.get('access_token'), token_data.get('expires_in'), issued_at,
+                                 refresh_token=token_data.get('refresh_token'))
+
+    def count_auth(self, grant: str):
+        """统计各类认证方式的调用次数"""
+        with self.lock:
+            self.auth_counts[grant] = self.auth_counts.get(grant, 0) + 1
+
+    def note_failure(self, email: str, stage: str, failure: Failure, started: float):
+        """记录账户本次尝试在某个阶段的失败类别和请求延迟（started为请求开始的perf_counter）"""
+        with self.lock:
+            self.last_failures[email] = (stage, failure, time.perf_counter() - started)
+
+    def log_token_failure(self, email: str, grant: str, reason: str):
+        """记录token获取失败（refresh失败被拒绝时会回退password，仅记警告）"""
+        if grant == 'refresh_token':
+            logging.warning(f"⚠️ {email} - refresh_token刷新失败: {reason}")
+        else:
+            logging.error(f"❌ {email} - 获取token失败: {reason}")
+
+    def record_latency(self, endpoint: str, status, latency: float):
+        """把一次HTTP调用的延迟记入直方图：阶段为 token / invitation，2xx记为success，其余状态码和异常记为failed"""
+        outcome = 'success' if isinstance(status, int) and 200 <= status < 300 else 'failed'
+        self.latency.record(LATENCY_STAGES[endpoint], outcome, latency)
+
+    def send_request(self, method: str, url: str, endpoint: str, **kwargs) -> requests.Response:
+        """发送HTTP请求（所有请求的统一出口）
+        endpoint 为 auth / invitation：先按端点领取全局QPS令牌；
+        开启自适应并发时再占用一个在途名额，结束后把延迟和是否过载反馈给限流器；
+        每个请求的状态码、延迟和在途数都记入 metrics，延迟同时记入直方图（只计HTTP调用本身，不含限流等待）
+        """
+        if self.rate_limits:
+            self.rate_limits.acquire(endpoint)
+        if self.limiter:
+            self.limiter.acquire()
+        status = 'exception'
+        metrics.INFLIGHT.inc(endpoint=endpoint)
+        if self.progress:
+            self.progress.request_started()
+        start = time.perf_counter()
         try:
-            response = self.session.post(Config.AUTH_URL, data={
-                'grant_type': 'password',
-                'client_id': 'AevatarAuthServer',
-                'apple_app_id': 'com.gpt.god',
-                'scope': 'Aevatar offline_access',
-                'username': email,
-                'password': self.password
-            }, headers={
-                'accept': 'application/json',
-                'accept-language': 'en,zh-CN;q=0.9,zh;q=0.8',
-                'content-type': 'application/x-www-form-urlencoded',
-                'origin': 'https://godgpt-ui-testnet.aelf.dev',
-                'referer': 'https://godgpt-ui-testnet.aelf.dev/',
-                'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-            }, timeout=Config.REQUEST_TIMEOUT)
+            response = self.session.request(method, url, timeout=Config.REQUEST_TIMEOUT, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            latency = time.perf_counter() - start
+            metrics.INFLIGHT.dec(endpoint=endpoint)
+            metrics.observe_request(endpoint, status, latency)
+            self.record_latency(endpoint, status, latency)
+            if self.progress:
+                self.progress.request_finished()
+            if self.limiter:
+                # 抛出异常（超时、连接失败）同样视为过载
+                self.limiter.release(latency, status == 'exception' or is_overload_status(status), endpoint)
+                metrics.ADAPTIVE_LIMIT.set(int(self.limiter.limit))
+
+    def request_token(self, email: str, form: Dict[str, str]) -> Optional[dict]:
+        """向/connect/token提交表单，成功时写入缓存并返回响应JSON"""
+        grant = form['grant_type']
+        start = time.perf_counter()
+        try:
+            issued_at = time.time()
+            response = self.send_request('POST', Config.AUTH_URL, 'auth', data=form, headers=AUTH_HEADERS)
 
             if response.status_code == 200:
                 token_data = response.json()
-                return token_data.get('access_token')
+                if token_data.get('access_token'):
+                    self.cache_token(email, token_data, issued_at)
+                    metrics.TOKENS.inc(source='refreshed' if grant == 'refresh_token' else 'fetched')
+                    return token_data
+                self.note_failure(email, 'token', 'invalid_response', start)
+                self.log_token_failure(email, grant, "响应中没有access_token")
             else:
-                logging.error(f"❌ {email} - 获取token失败: HTTP {response.status_code}")
-                return None
+                self.note_failure(email, 'token', response.status_code, start)
+                self.log_token_failure(email, grant, f"HTTP {response.status_code}")
                 
         except Exception as e:
-            logging.error(f"❌ {email} - 获取token异常: {str(e)}")
-            return None
+            self.note_failure(email, 'token', classify_exception(e), start)
+            self.log_token_failure(email, grant, f"异常 {str(e)}")
+        return None
+
+    def lookup_cached_token(self, email: str) -> Tuple[Optional[str], Optional[str]]:
+        """查询token缓存，返回 (仍有效的access_token, refresh_token)"""
+        if self.token_cache:
+            cached_token, refresh_token = self.token_cache.lookup(email)
+            if cached_token:
+                metrics.TOKENS.inc(source='cached')
+            return cached_token, refresh_token
+        return None, None
+
+    def drop_revoked_token(self, email: str) -> bool:
+        """invitation/info刚以401拒绝了缓存中的token（服务端已吊销）时，把它从缓存中作废，返回是否作废
+        401是确定性失败不会进重试队列，不作废的话该账户在缓存的expires_in到期前每次运行都会失败
+        """
+        with self.lock:
+            stage, failure, _ = self.last_failures.get(email, (None, None, None))
+        if (stage, failure) != ('invitation', 401):
+            return False
+        self.token_cache.invalidate(email)
+        metrics.TOKENS.inc(source='revoked')
+        logging.warning(f"⚠️ {email} - 缓存的token被拒绝(HTTP 401)，作废后重新认证")
+        return True
+
+    def refresh_rejected(self, email: str) -> bool:
+        """刚失败的refresh请求是否被authserver拒绝（400/401 invalid_grant），而不是超时、5xx等瞬时失败"""
+        with self.lock:
+            _, failure, _ = self.last_failures.get(email, (None, None, None))
+        return failure in Config.REFRESH_REJECTED_STATUSES
+
+    def authenticate(self, email: str, refresh_token: Optional[str] = None) -> Optional[str]:
+        """向authserver认证：有refresh_token先刷新，refresh_token被拒绝时再走password登录"""
+        # password模式是authserver上昂贵的哈希校验路径，能刷新就先刷新
+        if refresh_token:
+            token_data = self.request_token(email, self.build_refresh_form(refresh_token))
+            self.count_auth('refresh_token' if token_data else 'refresh_failed')
+            if token_data:
+                return token_data['access_token']
+            if not self.refresh_rejected(email):
+                # 瞬时失败按普通失败处理，由重试队列稍后再用refresh_token重试
+                return None
+            logging.warning(f"⚠️ {email} - refresh_token已失效，回退password登录")
+
+        self.count_auth('password')
+        token_data = self.request_token(email, self.build_token_form(email))
+        return token_data['access_token'] if token_data else None
+
+    def fetch_code_with_token(self, email: str, bearer_token: str, refresh_token: Optional[str],
+                              cached: bool) -> Tuple[Optional[str], str]:
+        """用bearer_token获取邀请码，返回 (邀请码, 失败阶段 token / invitation)
+        cached表示token取自缓存：被401拒绝时作废缓存，重新认证一次（先用refresh_token）再请求
+        """
+        invitation_code = self.get_invitation_code(email, bearer_token)
+        if invitation_code is None and cached and self.drop_revoked_token(email):
+            bearer_token = self.authenticate(email, refresh_token)
+            if not bearer_token:
+                return None, 'token'
+            invitation_code = self.get_invitation_code(email, bearer_token)
+        return invitation_code, 'invitation'
 
     def get_invitation_code(self, email: str, bearer_token: str) -> Optional[str]:
         """获取用户的邀请码"""
+        start = time.perf_counter()
         try:
             # 使用正确的invitation/info API获取邀请码
-            response = self.session.get(Config.INVITATION_CODE_URL, headers={
-                'accept': 'application/json',
-                'authorization': f'Bearer {bearer_token}',
-                'content-type': 'application/json',
-                'origin': 'https://godgpt-ui-testnet.aelf.dev',
-                'referer': 'https://godgpt-ui-testnet.aelf.dev/',
-                'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-            }, timeout=Config.REQUEST_TIMEOUT)
+            response = self.send_request('GET', Config.INVITATION_CODE_URL, 'invitation', headers={
+                **API_HEADERS,
+                'authorization': f'Bearer {bearer_token}'
+            })
 
             if response.status_code == 200:
-                data = response.json()
-                if data.get('code') == '20000' and data.get('data'):
-                    # API返回格式: {"code": "20000", "data": {"inviteCode": "xxx", ...}}
-                    invite_data = data.get('data', {})
-                    if isinstance(invite_data, dict) and 'inviteCode' in invite_data:
-                        return invite_data['inviteCode']
+                invitation_code = self.parse_invitation_code(response.json())
+                if not invitation_code:
+                    self.note_failure(email, 'invitation', 'no_code', start)
+                return invitation_code
             else:
+                self.note_failure(email, 'invitation', response.status_code, start)
                 logging.error(f"❌ {email} - 获取邀请码API失败: HTTP {response.status_code}, 响应: {response.text}")
             
             return None
             
         except Exception as e:
+            self.note_failure(email, 'invitation', classify_exception(e), start)
             logging.error(f"❌ {email} - 获取邀请码异常: {str(e)}")
             return None
 
-    def fetch_single_invitation_code(self, index: int):
-        """获取单个账户的邀请码"""
+    def restore_checkpoint(self, start_index: int, end_index: int) -> int:
+        """从结果索引库（未启用时从断点日志）恢复范围内已成功的账户，返回恢复数量"""
+        if self.store:
+            successes = self.store.successes(self.prefix, start_index, end_index)
+        elif self.journal:
+            successes = CheckpointJournal.load_successes(self.journal.path, start_index, end_index)
+        else:
+            return 0
+        with self.lock:
+            for index, (email, invitation_code) in successes.items():
+                self.invitation_codes[email] = invitation_code
+                self.resumed_indices.add(index)
+        return len(successes)
+
+    def pending_indices(self, start_index: int, end_index: int):
+        """惰性产出范围内尚未成功的索引（跳过断点恢复的账户和位图中已知未注册的账户）"""
+        for index in range(start_index, end_index + 1):
+            if index in self.resumed_indices:
+                continue
+            if self.registry and self.registry.is_unregistered(index):
+                self.skipped_unregistered += 1
+                continue
+            if self.progress:
+                self.progress.dispatched()
+            yield index
+
+    def count_pending(self, start_index: int, end_index: int) -> int:
+        resumed = sum(1 for index in self.resumed_indices if start_index <= index <= end_index)
+        unregistered = 0
+        if self.registry:
+            unregistered = sum(1 for index in range(start_index, end_index + 1)
+                               if index not in self.resumed_indices and self.registry.is_unregistered(index))
+        return end_index - start_index + 1 - resumed - unregistered
+
+    def record_result(self, index: int, email: str, invitation_code: Optional[str], log_failure: bool = True,
+                      failure: Optional[dict] = None) -> int:
+        """记录单个账户的获取结果（线程引擎与async引擎共用），failure为失败时的结构化记录
+        返回记录后的已完成账户总数（在锁内计算，并发调用时各自拿到不同的值）
+        """
+        metrics.ACCOUNTS.inc(tool='fetcher', outcome='success' if invitation_code else 'failed')
+        if self.progress:
+            self.progress.finished(invitation_code is not None)
+        with self.lock:
+            if invitation_code:
+                self.invitation_codes[email] = invitation_code
+            else:
+                self.failed_accounts.append(email)
+            finished_total = len(self.invitation_codes) + len(self.failed_accounts)
+        # 日志在锁外写入队列，不让其他线程等待
+        if invitation_code:
+            if self.log_sampler.hit():
+                logging.info(f"✅ {email} - 邀请码: {invitation_code}")
+        elif log_failure:
+            logging.error(f"❌ {email} - 无法获取邀请码 ({failure['reason'] if failure else 'unknown'})")
+
+        if self.journal:
+            self.journal.record(index, email, invitation_code)
+        if self.sink and invitation_code:
+            self.sink.add(email, invitation_code)
+        if self.store:
+            self.store.add(self.prefix, index, email, invitation_code, failure['reason'] if failure else None)
+
+        if self.result_callback:
+            self.result_callback(email, invitation_code, failure)
+        return finished_total
+
+    def finish_attempt(self, index: int, email: str, attempt: int, invitation_code: Optional[str],
+                       log_failure: bool = True, stage: str = 'invitation') -> int:
+        """结束一次尝试：瞬时失败且还有剩余次数时放回重试队列，否则记录最终结果
+        返回记录后的已完成账户总数，0表示已放回重试队列（可直接当作"是否已记录最终结果"使用）
+        stage为失败发生的阶段（token / invitation），没有记录到具体失败类别时用于生成原因代码
+        """
+        with self.lock:
+            stage, failure, latency = self.last_failures.pop(email, (stage, None, None))
+        if invitation_code is None and self.scheduler and self.retry_policy.should_retry(failure, attempt):
+            delay = self.scheduler.retry(index, attempt)
+            with self.lock:
+                self.retry_counts['scheduled'] += 1
+            metrics.RETRIES.inc(failure=failure)
+            logging.warning(f"🔁 {email} - 第{attempt}次尝试失败({describe_failure(failure)})，{delay:.1f}秒后重试")
+            return 0
+
+        with self.lock:
+            if invitation_code and attempt > 1:
+                self.retry_counts['recovered'] += 1
+            elif invitation_code is None:
+                self.retry_counts['exhausted' if is_transient(failure) else 'permanent'] += 1
+        record = None
+        if invitation_code is None:
+            record = self.failures.add(index, email, stage, failure, latency, attempt)
+        return self.record_result(index, email, invitation_code, log_failure, record)
+
+    def fetch_single_invitation_code(self, index: int, attempt: int = 1) -> int:
+        """获取单个账户的邀请码，返回finish_attempt的结果（0表示已放回重试队列）"""
         email = self.generate_email(index)
         
-        # 步骤1: 获取Bearer Token
-        bearer_token = self.get_bearer_token(email)
+        # 步骤1: 获取Bearer Token，优先级：缓存中未过期的token > refresh_token刷新 > password登录
+        cached_token, refresh_token = self.lookup_cached_token(email)
+        bearer_token = cached_token or self.authenticate(email, refresh_token)
         if not bearer_token:
-            with self.lock:
-                self.failed_accounts.append(email)
-            return
+            # token失败原因已在request_token中记录
+            return self.finish_attempt(index, email, attempt, None, log_failure=False, stage='token')
         
         # 步骤2: 获取邀请码
-        invitation_code = self.get_invitation_code(email, bearer_token)
+        invitation_code, stage = self.fetch_code_with_token(email, bearer_token, refresh_token, bool(cached_token))
+        return self.finish_attempt(index, email, attempt, invitation_code, log_failure=stage == 'invitation',
+                                   stage=stage)
+
+    def run_task(self, task: Tuple[int, int]) -> int:
+        """线程池任务: 执行一次 (index, attempt) 尝试"""
+        try:
+            return self.fetch_single_invitation_code(*task)
+        finally:
+            self.scheduler.task_done()
+
+    def log_progress(self, done: int, total: int):
+        """输出进度日志"""
+        elapsed = time.time() - self.start_time
+        speed = done / elapsed if elapsed > 0 else 0
+        logging.info(f"📊 进度: {done}/{total} ({(done/total)*100:.1f}%), 速度: {speed:.2f}账户/秒")
+
+    def fetch_range(self, start_index: int, end_index: int):
+        """用线程池获取一个索引区间的邀请码（不写结果文件，可在同一个fetcher上反复调用）"""
+        if self.pipeline:
+            self.fetch_range_pipelined(start_index, end_index)
+            return
+
+        total = self.count_pending(start_index, end_index)
+        self.scheduler = RetryScheduler(self.pending_indices(start_index, end_index), self.retry_policy)
         
-        with self.lock:
-            if invitation_code:
-                self.invitation_codes[email] = invitation_code
-                logging.info(f"✅ {email} - 邀请码: {invitation_code}")
+        # 索引惰性生成，只保留 workers × k 个在途任务，内存不随范围大小增长；
+        # 瞬时失败的账户按退避时间重新进入同一个任务流
+        # 自适应模式下在途任务数跟随限制器的当前上限：ThreadPoolExecutor只在没有空闲线程时才新建线程，
+        # 线程数随上限升高惰性增长，不会一开始就按max_limit建出大批阻塞在限制器上的线程
+        if self.limiter:
+            max_workers, max_pending = self.limiter.max_limit, lambda: int(self.limiter.limit)
+        else:
+            max_workers, max_pending = self.workers, self.workers * PENDING_PER_WORKER
+        done = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            completed = submit_bounded(executor, self.run_task, self.scheduler.tasks(), max_pending)
+            for future in completed:
+                if future.exception() is None and future.result():
+                    done += 1
+                    if done % 50 == 0:
+                        self.log_progress(done, total)
+
+    def fetch_range_pipelined(self, start_index: int, end_index: int):
+        """两阶段流水线：认证线程池经有界队列把token交给邀请码线程池
+        慢的/connect/token不再占住本可以发送invitation/info的线程，缓存命中的账户直接跳过认证阶段
+        """
+        auth_workers, api_workers = self.pipeline
+        total = self.count_pending(start_index, end_index)
+        auth_stats = StageStats("🔐 认证阶段", auth_workers)
+        api_stats = StageStats("🎟️ 邀请码阶段", api_workers)
+        # 有界队列提供背压：下游跟不上时上游自动阻塞
+        auth_queue = queue.Queue(maxsize=auth_workers * 2)
+        token_queue = queue.Queue(maxsize=api_workers * 2)
+        done_before = len(self.invitation_codes) + len(self.failed_accounts)
+        stage_start = time.time()
+
+        def report_progress(finished_total: int):
+            # finished_total在finish_attempt的锁内算出，每个完成数只属于一个线程，进度行不会重复或跳过
+            done = finished_total - done_before
+            if finished_total and done % 50 == 0:
+                self.log_progress(done, total)
+
+        # 每个任务无论成败（包括异常）都要task_done，否则调度器永远等不到在途任务结束；
+        # 异常只记日志不结束线程，阶段线程全部退出会让上游在有界队列上永久阻塞
+        def auth_stage():
+            while True:
+                item = auth_queue.get()
+                if item is None:
+                    return
+                index, attempt, email, refresh_token = item
+                handed_off = False
+                try:
+                    start = time.perf_counter()
+                    bearer_token = self.authenticate(email, refresh_token)
+                    auth_stats.observe(time.perf_counter() - start, bearer_token is not None)
+                    if bearer_token:
+                        # 交给邀请码阶段，由它负责task_done
+                        token_queue.put((index, attempt, email, bearer_token, refresh_token, False))
+                        handed_off = True
+                    else:
+                        report_progress(self.finish_attempt(index, email, attempt, None, log_failure=False,
+                                                            stage='token'))
+                except Exception as e:
+                    logging.error(f"💥 {email} - 认证阶段异常: {type(e).__name__}: {e}")
+                finally:
+                    if not handed_off:
+                        self.scheduler.task_done()
+
+        def invitation_stage():
+            while True:
+                item = token_queue.get()
+                if item is None:
+                    return
+                index, attempt, email, bearer_token, refresh_token, cached = item
+                try:
+                    start = time.perf_counter()
+                    # 缓存的token被吊销时在本阶段内直接重新认证，不回送认证队列（两个有界队列互相等待会死锁）
+                    invitation_code, stage = self.fetch_code_with_token(email, bearer_token, refresh_token, cached)
+                    api_stats.observe(time.perf_counter() - start, invitation_code is not None)
+                    report_progress(self.finish_attempt(index, email, attempt, invitation_code,
+                                                        log_failure=stage == 'invitation', stage=stage))
+                except Exception as e:
+                    logging.error(f"💥 {email} - 邀请码阶段异常: {type(e).__name__}: {e}")
+                finally:
+                    self.scheduler.task_done()
+
+        auth_threads = [threading.Thread(target=auth_stage, daemon=True) for _ in range(auth_workers)]
+        api_threads = [threading.Thread(target=invitation_stage, daemon=True) for _ in range(api_workers)]
+        for thread in auth_threads + api_threads:
+            thread.start()
+
+        # 调度：缓存中有有效token的账户直接进入邀请码阶段；瞬时失败的账户到期后重新调度
+        self.scheduler = RetryScheduler(self.pending_indices(start_index, end_index), self.retry_policy)
+        for idx, attempt in self.scheduler.tasks():
+            email = self.generate_email(idx)
+            cached_token, refresh_token = self.lookup_cached_token(email)
+            if cached_token:
+                auth_stats.skipped += 1
+                token_queue.put((idx, attempt, email, cached_token, refresh_token, True))
             else:
-                self.failed_accounts.append(email)
-                logging.error(f"❌ {email} - 无法获取邀请码")
+                auth_queue.put((idx, attempt, email, refresh_token))
+
+        for _ in auth_threads:
+            auth_queue.put(None)
+        for thread in auth_threads:
+            thread.join()
+        for _ in api_threads:
+            token_queue.put(None)
+        for thread in api_threads:
+            thread.join()
+
+        wall_seconds = time.time() - stage_start
+        logging.info(auth_stats.summary(wall_seconds))
+        logging.info(api_stats.summary(wall_seconds))
+
+    def warm_up(self, connections: int) -> dict:
+        """预热连接池（线程引擎）：每个域名解析一次DNS，再并发发出connections个HEAD请求，
+        握手完成的keep-alive连接留在连接池里，计时阶段一开始就是热连接，不再有集中的DNS查询和TLS握手
+        """
+        connections = min(connections, self.pool_connections)
+        started = time.perf_counter()
+        targets = warmup_targets()
+        dns = resolve_hosts(targets)
+        start_barrier = threading.Barrier(connections)
+        release_barrier = threading.Barrier(connections)
+        # HEAD响应没有响应体，requests收到响应头就把连接还回连接池，慢一步的线程会直接复用它；
+        # stream=True让每个响应一直占着自己的连接，全部请求都拿到响应后才一起归还，保证建立connections条不同的连接
+        # （HTTP/2本来就是少量连接上的多路流，不需要）
+        hold = {} if isinstance(self.session, Http2Session) else {'stream': True}
+
+        def wait(barrier: threading.Barrier):
+            try:
+                barrier.wait(timeout=Config.REQUEST_TIMEOUT)
+            except threading.BrokenBarrierError:
+                pass
+
+        def open_connection(url: str) -> bool:
+            # 所有线程到齐后同时发出
+            wait(start_barrier)
+            response = None
+            try:
+                response = self.session.request('HEAD', url, timeout=Config.REQUEST_TIMEOUT, **hold)
+                return True
+            except Exception as e:
+                logging.warning(f"⚠️ 预热连接失败 {url}: {e}")
+                return False
+            finally:
+                # 失败的线程同样要到齐，否则其他线程要等到超时才归还连接
+                wait(release_barrier)
+                if hold and response is not None:
+                    # 先读完（空的）响应体再关闭，连接作为keep-alive连接归还连接池，而不是被直接断开
+                    response.content
+                    response.close()
+
+        opened = {}
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            for netloc, url in targets.items():
+                start_barrier.reset()
+                release_barrier.reset()
+                opened[netloc] = sum(executor.map(open_connection, [url] * connections))
+        return self.finish_warm_up(started, dns, opened, connections)
+
+    def finish_warm_up(self, started: float, dns: Dict[str, Optional[float]], opened: Dict[str, int],
+                       connections: int) -> dict:
+        self.setup_stats = {'seconds': round(time.perf_counter() - started, 3), 'dns_ms': dns,
+                            'connections': opened, 'requested': connections}
+        logging.info(f"🔥 预热: {describe_warmup(self.setup_stats)}")
+        # 总耗时和吞吐从预热结束后开始计算
+        self.start_time = time.time()
+        return self.setup_stats
 
     def run_fetch(self):
-        """运行邀请码获取"""
+        """运行邀请码获取（线程引擎）"""
         logging.info(f"🔍 获取邀请码 ({self.prefix}{self.start_index}-{self.prefix}{self.end_index})...")
-        account_indices = list(range(self.start_index, self.end_index + 1))
-        
-        with ThreadPoolExecutor(max_workers=self.workers) as executor:
-            futures = [executor.submit(self.fetch_single_invitation_code, idx) for idx in account_indices]
-            
-            for i, future in enumerate(as_completed(futures)):
-                if (i + 1) % 50 == 0:
-                    elapsed = time.time() - self.start_time
-                    speed = (i + 1) / elapsed if elapsed > 0 else 0
-                    logging.info(f"📊 进度: {i+1}/{len(account_indices)} ({((i+1)/len(account_indices))*100:.1f}%), 速度: {speed:.2f}账户/秒")
+        if self.warmup:
+            self.warm_up(self.warmup)
+        self.fetch_range(self.start_index, self.end_index)
+        self.save_results()
+
+    # ⚡ async引擎：单线程事件循环 + aiohttp，在途请求数由协程数量控制
+    async def async_send_request(self, http, method: str, url: str, endpoint: str, **kwargs):
+        """发送HTTP请求（async版本的统一出口），返回 (状态码, 响应文本)"""
+        if self.rate_limits:
+            await self.rate_limits.async_acquire(endpoint)
+        if self.limiter:
+            await self.limiter.async_acquire()
+        status = 'exception'
+        metrics.INFLIGHT.inc(endpoint=endpoint)
+        if self.progress:
+            self.progress.request_started()
+        start = time.perf_counter()
+        try:
+            async with http.request(method, url, **kwargs) as response:
+                text = await response.text()
+                status = response.status
+                return response.status, text
+        finally:
+            latency = time.perf_counter() - start
+            metrics.INFLIGHT.dec(endpoint=endpoint)
+            metrics.observe_request(endpoint, status, latency)
+            self.record_latency(endpoint, status, latency)
+            if self.progress:
+                self.progress.request_finished()
+            if self.limiter:
+                await self.limiter.async_release(latency, status == 'exception' or is_overload_status(status),
+                                                 endpoint)
+                metrics.ADAPTIVE_LIMIT.set(int(self.limiter.limit))
+
+    async def async_request_token(self, http, email: str, form: Dict[str, str]) -> Optional[dict]:
+        """向/connect/token提交表单（async版本）"""
+        grant = form['grant_type']
+        start = time.perf_counter()
+        try:
+            issued_at = time.time()
+            status, text = await self.async_send_request(http, 'POST', Config.AUTH_URL, 'auth', data=form, headers=AUTH_HEADERS)
+            if status == 200:
+                token_data = json.loads(text)
+                if token_data.get('access_token'):
+                    self.cache_token(email, token_data, issued_at)
+                    metrics.TOKENS.inc(source='refreshed' if grant == 'refresh_token' else 'fetched')
+                    return token_data
+                self.note_failure(email, 'token', 'invalid_response', start)
+                self.log_token_failure(email, grant, "响应中没有access_token")
+            else:
+                self.note_failure(email, 'token', status, start)
+                self.log_token_failure(email, grant, f"HTTP {status}")
+        except Exception as e:
+            self.note_failure(email, 'token', classify_exception(e), start)
+            self.log_token_failure(email, grant, f"异常 {type(e).__name__} {str(e)}")
+        return None
+
+    async def async_authenticate(self, http, email: str, refresh_token: Optional[str] = None) -> Optional[str]:
+        """向authserver认证（async版本）：有refresh_token先刷新，refresh_token被拒绝时再走password登录"""
+        if refresh_token:
+            token_data = await self.async_request_token(http, email, self.build_refresh_form(refresh_token))
+            self.count_auth('refresh_token' if token_data else 'refresh_failed')
+            if token_data:
+                return token_data['access_token']
+            if not self.refresh_rejected(email):
+                return None
+            logging.warning(f"⚠️ {email} - refresh_token已失效，回退password登录")
+
+        self.count_auth('password')
+        token_data = await self.async_request_token(http, email, self.build_token_form(email))
+        return token_data['access_token'] if token_data else None
+
+    async def async_fetch_code_with_token(self, http, email: str, bearer_token: str, refresh_token: Optional[str],
+                                          cached: bool) -> Tuple[Optional[str], str]:
+        """用bearer_token获取邀请码（async版本，语义同fetch_code_with_token）"""
+        invitation_code = await self.async_get_invitation_code(http, email, bearer_token)
+        if invitation_code is None and cached and self.drop_revoked_token(email):
+            bearer_token = await self.async_authenticate(http, email, refresh_token)
+            if not bearer_token:
+                return None, 'token'
+            invitation_code = await self.async_get_invitation_code(http, email, bearer_token)
+        return invitation_code, 'invitation'
+
+    async def async_get_invitation_code(self, http, email: str, bearer_token: str) -> Optional[str]:
+        """获取用户的邀请码（async版本）"""
+        start = time.perf_counter()
+        try:
+            status, text = await self.async_send_request(http, 'GET', Config.INVITATION_CODE_URL, 'invitation', headers={
+                **API_HEADERS,
+                'authorization': f'Bearer {bearer_token}'
+            })
+            if status == 200:
+                invitation_code = self.parse_invitation_code(json.loads(text))
+                if not invitation_code:
+                    self.note_failure(email, 'invitation', 'no_code', start)
+                return invitation_code
+            self.note_failure(email, 'invitation', status, start)
+            logging.error(f"❌ {email} - 获取邀请码API失败: HTTP {status}, 响应: {text}")
+            return None
+        except Exception as e:
+            self.note_failure(email, 'invitation', classify_exception(e), start)
+            logging.error(f"❌ {email} - 获取邀请码异常: {type(e).__name__} {str(e)}")
+            return None
+
+    async def async_fetch_single_invitation_code(self, http, index: int, attempt: int = 1) -> int:
+        """获取单个账户的邀请码（async版本），返回finish_attempt的结果（0表示已放回重试队列）"""
+        email = self.generate_email(index)
+        cached_token, refresh_token = self.lookup_cached_token(email)
+        bearer_token = cached_token or await self.async_authenticate(http, email, refresh_token)
+        if not bearer_token:
+            return self.finish_attempt(index, email, attempt, None, log_failure=False, stage='token')
+        invitation_code, stage = await self.async_fetch_code_with_token(http, email, bearer_token, refresh_token,
+                                                                        bool(cached_token))
+        return self.finish_attempt(index, email, attempt, invitation_code, log_failure=stage == 'invitation',
+                                   stage=stage)
+
+    async def async_warm_up(self, http, connections: int) -> dict:
+        """预热连接池（async引擎）：与warm_up相同，并发的HEAD请求在连接器里留下connections条keep-alive连接"""
+        connections = min(connections, self.max_inflight)
+        started = time.perf_counter()
+        targets = warmup_targets()
+        dns = resolve_hosts(targets)
+
+        async def open_connection(url: str) -> bool:
+            try:
+                async with http.head(url) as response:
+                    await response.read()
+                return True
+            except Exception as e:
+                logging.warning(f"⚠️ 预热连接失败 {url}: {e}")
+                return False
+
+        opened = {}
+        for netloc, url in targets.items():
+            opened[netloc] = sum(await asyncio.gather(*(open_connection(url) for _ in range(connections))))
+        return self.finish_warm_up(started, dns, opened, connections)
+
+    async def _run_fetch_async(self):
+        import aiohttp
+
+        total = self.count_pending(self.start_index, self.end_index)
+        self.scheduler = RetryScheduler(self.pending_indices(self.start_index, self.end_index), self.retry_policy)
+        done = 0
+
+        # 连接数上限与在途上限一致，避免排队在连接池里
+        connector = aiohttp.TCPConnector(limit=self.max_inflight, limit_per_host=self.max_inflight,
+                                         ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=Config.REQUEST_TIMEOUT)
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as http:
+            if self.warmup:
+                await self.async_warm_up(http, self.warmup)
 
+            async def worker():
+                nonlocal done
+                # 所有协程共享同一个调度器；暂无到期的重试时让出事件循环等待，而不是占着协程阻塞
+                while True:
+                    task, wait = self.scheduler.next_task()
+                    if task is None:
+                        if wait is None:
+                            return
+                        await asyncio.sleep(wait)
+                        continue
+                    try:
+                        finished = await self.async_fetch_single_invitation_code(http, *task)
+                    finally:
+                        self.scheduler.task_done()
+                    if finished:
+                        done += 1
+                        if done % 50 == 0:
+                            self.log_progress(done, total)
+
+            await asyncio.gather(*(worker() for _ in range(min(self.max_inflight, total))))
+
+    def run_fetch_async(self):
+        """运行邀请码获取（async引擎）"""
+        if importlib.util.find_spec("aiohttp") is None:
+            raise SystemExit("❌ async引擎需要aiohttp，请先安装: pip install aiohttp")
+
+        logging.info(f"🔍 获取邀请码 ({self.prefix}{self.start_index}-{self.prefix}{self.end_index})"
+                     f" [async引擎, 最大在途请求: {self.max_inflight}]...")
+        asyncio.run(self._run_fetch_async())
+        self.save_results()
+
+    def save_results(self):
+        """输出统计并保存结果文件"""
         elapsed_time = time.time() - self.start_time
         logging.info(f"✨ 获取完成! 总耗时: {elapsed_time:.2f}秒")
         
@@ -186,13 +963,44 @@ class InvitationCodeFetcher:
         logging.info("📈 统计结果:")
         logging.info(f"   成功获取: {success_count} 个")
         logging.info(f"   获取失败: {failed_count} 个")
+        if self.resumed_indices:
+            logging.info(f"   其中断点恢复: {len(self.resumed_indices)} 个")
+        if self.skipped_unregistered:
+            logging.info(f"   跳过位图中未注册的账户: {self.skipped_unregistered} 个")
+        if self.journal:
+            self.journal.flush()
+        if self.sink:
+            self.sink.flush()
+        if self.store:
+            self.store.flush()
         
-        print("==================================================")
-        print("🎯 获取总结:")
-        print(f"   总检查账户: {total_checked}")
-        print(f"   ✅ 成功获取: {success_count} 个")
-        print(f"   ❌ 获取失败: {failed_count} 个")
-        print(f"   📊 成功率: {success_rate:.2f}%")
+        logging.info("==================================================")
+        logging.info("🎯 获取总结:")
+        logging.info(f"   总检查账户: {total_checked}")
+        logging.info(f"   ✅ 成功获取: {success_count} 个")
+        logging.info(f"   ❌ 获取失败: {failed_count} 个")
+        logging.info(f"   📊 成功率: {success_rate:.2f}%")
+
+        if self.token_cache:
+            self.token_cache.flush()
+            logging.info(f"   🔐 Token缓存: 命中 {self.token_cache.hits} 个, 未命中 {self.token_cache.misses} 个")
+        if self.auth_counts:
+            logging.info(f"   🔑 认证调用: refresh刷新 {self.auth_counts.get('refresh_token', 0)} 次"
+                         f" (失败 {self.auth_counts.get('refresh_failed', 0)} 次), password登录 {self.auth_counts.get('password', 0)} 次")
+        if self.setup_stats:
+            logging.info(f"   🔥 预热(不计入总耗时): {describe_warmup(self.setup_stats)}")
+        if self.limiter:
+            logging.info(f"   🎚️ 自适应并发上限: {self.limiter.summary()}")
+        if self.retry_counts['scheduled'] or failed_count:
+            logging.info(f"   🔁 重试: {self.retry_counts['scheduled']} 次, 重试后成功 {self.retry_counts['recovered']} 个;"
+                         f" 最终失败中 瞬时(用完{self.retry_policy.max_attempts}次) {self.retry_counts['exhausted']} 个"
+                         f" / 非瞬时不重试 {self.retry_counts['permanent']} 个")
+        for line in self.latency.summary_lines():
+            logging.info(f"   ⏱️ {line}")
+        if self.failures:
+            logging.info("   📋 失败原因:")
+            for line in self.failures.summary_lines():
+                logging.info(f"      {line}")
 
         # 保存结果
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -212,14 +1020,25 @@ class InvitationCodeFetcher:
                 json.dump(invite_codes_list, f, indent=2, ensure_ascii=False)
             logging.info(f"📁 K6测试数据保存到: results/{k6_data_filename}")
 
-        # 保存失败账户列表
-        if self.failed_accounts:
-            failed_filename = f"{self.prefix}_invitation_failed_{timestamp}.txt"
-            with open(f"results/{failed_filename}", "w", encoding='utf-8') as f:
-                for email in self.failed_accounts:
-                    f.write(f"{email}\n")
+        # 保存延迟直方图（可用 latency_histogram.py diff 对比两次运行）
+        latency_filename = self.latency_out or f"results/{self.prefix}_latency_{timestamp}.json"
+        self.latency.save(latency_filename)
+        logging.info(f"📁 延迟直方图保存到: {latency_filename}")
+
+        # 保存失败账户（每行一个JSON: 原因代码、阶段、状态码、延迟、尝试次数，可用 failure_report.py 筛选）
+        if self.failures:
+            failed_filename = f"{self.prefix}_invitation_failed_{timestamp}.jsonl"
+            self.failures.save(f"results/{failed_filename}")
             logging.info(f"📁 失败账户保存到: results/{failed_filename}")
 
+def build_rate_limits(auth_qps: float, api_qps: float) -> Optional[EndpointRateLimits]:
+    """按QPS预算创建跨进程令牌桶，均未配置时返回None"""
+    if auth_qps <= 0 and api_qps <= 0:
+        return None
+    rate_limits = EndpointRateLimits(auth_qps, api_qps)
+    logging.info(f"🚦 全局QPS预算: {rate_limits.describe()}")
+    return rate_limits
+
 def main():
     parser = argparse.ArgumentParser(description='🚀 批量获取loadtest账户邀请码')
     parser.add_argument('--prefix', '-p', default="loadtestc", help='邮箱前缀')
@@ -227,18 +1046,132 @@ def main():
     parser.add_argument('--count', '-c', type=int, default=100, help='获取数量')
     parser.add_argument('--workers', '-w', type=int, default=Config.DEFAULT_WORKERS, help='并发线程数')
     parser.add_argument('--password', '-pw', default=Config.DEFAULT_PASSWORD, help='账户密码')
+    parser.add_argument('--engine', '-e', choices=['thread', 'async'], default=Config.DEFAULT_ENGINE,
+                        help='执行引擎: thread(线程池) 或 async(asyncio+aiohttp)')
+    parser.add_argument('--max-inflight', type=int, default=Config.DEFAULT_MAX_INFLIGHT,
+                        help='async引擎的最大在途请求数')
+    parser.add_argument('--http2', action='store_true',
+                        help='线程引擎改用httpx的HTTP/2连接，所有线程的请求在少量连接上多路复用'
+                             '（需要 httpx[http2]；只对https地址生效）')
+    parser.add_argument('--http2-connections', type=int, default=Config.HTTP2_MAX_CONNECTIONS,
+                        help='HTTP/2模式下的最大连接数（两个域名合计）')
+    parser.add_argument('--warmup', action='store_true',
+                        help='计时开始前预热连接池：向认证和邀请码接口并发发出HEAD请求建立连接（默认不预热）')
+    parser.add_argument('--warmup-connections', type=int, default=None,
+                        help='预热时每个域名建立的连接数（默认等于并发数；指定即开启预热）')
+    parser.add_argument('--log-sample', type=int, default=Config.LOG_SAMPLE,
+                        help='逐账户成功日志每N个账户记录1条（1全部记录，0不记录；失败日志总是记录）')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='线程引擎下启用认证/邀请码两阶段流水线，两个阶段各自的线程池独立设置')
+    parser.add_argument('--auth-workers', type=int, default=None, help='流水线认证阶段线程数（默认同--workers）')
+    parser.add_argument('--api-workers', type=int, default=None, help='流水线邀请码阶段线程数（默认同--workers）')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='启用AIMD自适应并发: --workers/--max-inflight作为起始并发，按延迟和5xx/524自动增减')
+    parser.add_argument('--adaptive-min', type=int, default=Config.ADAPTIVE_MIN_INFLIGHT, help='自适应并发下限')
+    parser.add_argument('--adaptive-max', type=int, default=Config.ADAPTIVE_MAX_INFLIGHT, help='自适应并发上限')
+    parser.add_argument('--target-p95', type=float, default=None,
+                        help='自适应并发的p95延迟目标(秒)，默认取运行中观测到的最佳p95的2倍')
+    parser.add_argument('--auth-qps', type=float, default=Config.DEFAULT_AUTH_QPS,
+                        help='/connect/token 全局QPS预算（本机所有进程合计，0表示不限速）')
+    parser.add_argument('--api-qps', type=float, default=Config.DEFAULT_API_QPS,
+                        help='invitation/info 全局QPS预算（本机所有进程合计，0表示不限速）')
+    parser.add_argument('--checkpoint', nargs='?', const='', default=None, metavar='PATH',
+                        help='额外记录断点日志（默认不记录，路径默认 results/{prefix}_checkpoint.jsonl）')
+    parser.add_argument('--resume', action='store_true',
+                        help='跳过已成功获取的索引（从结果索引库读取，--no-code-store 时读取断点日志）')
+    parser.add_argument('--result-sink', nargs='?', const='', default=None, metavar='PATH',
+                        help='额外写增量结果文件（默认不写，路径默认 results/{prefix}_codes.ndjson）')
+    parser.add_argument('--code-store', default=CodeStore.DEFAULT_PATH, help='账户/邀请码索引库路径')
+    parser.add_argument('--no-code-store', action='store_true', help='不写入账户/邀请码索引库')
+    parser.add_argument('--skip-unregistered', action='store_true',
+                        help='跳过注册状态位图中已知未注册的账户（先用 check_account_status.py 检查）')
+    parser.add_argument('--registry-dir', default=AccountRegistry.DEFAULT_DIR, help='注册状态位图目录')
+    parser.add_argument('--max-attempts', type=int, default=Config.DEFAULT_MAX_ATTEMPTS,
+                        help='瞬时失败（超时、5xx、524、429）的最大尝试次数（含首次），1表示不重试')
+    parser.add_argument('--retry-base-delay', type=float, default=Config.RETRY_BASE_DELAY,
+                        help='重试退避的基础等待时间(秒)，每次翻倍并加随机抖动')
+    parser.add_argument('--token-cache', default=TokenCache.DEFAULT_PATH, help='token缓存文件路径')
+    parser.add_argument('--no-token-cache', action='store_true', help='禁用token缓存，每个账户都重新登录')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='在该端口提供 /metrics 实时指标（被占用时顺延到下一个空闲端口）')
+    parser.add_argument('--metrics-host', default=metrics.DEFAULT_HOST,
+                        help='指标服务监听地址（默认只监听本机；0.0.0.0 会在所有网卡上暴露运行数据）')
+    parser.add_argument('--progress-shm', default=None, help='上报进度的共享内存块名字（由turbo/stable父进程创建）')
+    parser.add_argument('--progress-slot', type=int, default=0, help='本进程在共享内存块中的槽位')
+    parser.add_argument('--latency-out', default=None,
+                        help='延迟直方图输出路径（默认 results/{prefix}_latency_时间戳.json）')
+    parser.add_argument('--auth-url', default=Config.AUTH_URL, help='认证接口地址（可指向 mock_server.py）')
+    parser.add_argument('--invitation-url', default=Config.INVITATION_CODE_URL, help='邀请码接口地址')
     
     args = parser.parse_args()
+    Config.AUTH_URL = args.auth_url
+    Config.INVITATION_CODE_URL = args.invitation_url
+    Config.HTTP2_MAX_CONNECTIONS = args.http2_connections
+    if args.pipeline and args.engine == 'async':
+        parser.error("--pipeline 仅适用于线程引擎")
+    if args.http2 and args.engine == 'async':
+        parser.error("--http2 仅适用于线程引擎（aiohttp不支持HTTP/2）")
+    if args.resume and args.no_code_store and args.checkpoint is None:
+        parser.error("--resume 需要结果索引库或断点日志：--no-code-store 时请同时指定 --checkpoint")
     
     end_index = args.start + args.count - 1
     
     # 设置日志
     log_filename = f"get_invitation_codes_{args.prefix}_{args.start}-{end_index}.log"
     setup_logging(log_filename)
+    if args.metrics_port:
+        metrics.start_metrics_server(args.metrics_port, args.metrics_host)
     
     # 开始获取
-    fetcher = InvitationCodeFetcher(args.prefix, args.start, end_index, args.workers, args.password)
-    fetcher.run_fetch()
+    token_cache = None if args.no_token_cache else TokenCache(args.token_cache)
+    # 结果默认只写入结果索引库；断点日志和增量结果文件按需开启
+    journal = None if args.checkpoint is None else CheckpointJournal(
+        args.checkpoint or CheckpointJournal.default_path(args.prefix))
+    sink = None if args.result_sink is None else ResultSink(
+        args.result_sink or ResultSink.default_path(args.prefix))
+    store = None if args.no_code_store else CodeStore(args.code_store)
+    progress_board = ProgressBoard.attach(args.progress_shm) if args.progress_shm else None
+    # 起始并发: 自适应并发的起点，也是默认的每域名预热连接数
+    concurrency = args.max_inflight if args.engine == 'async' else args.workers
+    limiter = None
+    if args.adaptive:
+        limiter = AIMDLimiter(concurrency, min_limit=args.adaptive_min, max_limit=args.adaptive_max,
+                              latency_target=args.target_p95)
+    fetcher = InvitationCodeFetcher(args.prefix, args.start, end_index, args.workers, args.password,
+                                    max_inflight=args.max_inflight, token_cache=token_cache, limiter=limiter,
+                                    rate_limits=build_rate_limits(args.auth_qps, args.api_qps),
+                                    pipeline=(args.auth_workers or args.workers,
+                                              args.api_workers or args.workers) if args.pipeline else None,
+                                    journal=journal, sink=sink,
+                                    progress=progress_board.slot(args.progress_slot) if progress_board else None,
+                                    store=store,
+                                    registry=AccountRegistry(args.prefix, args.registry_dir)
+                                    if args.skip_unregistered else None,
+                                    retry_policy=RetryPolicy(args.max_attempts, args.retry_base_delay,
+                                                             Config.RETRY_MAX_DELAY),
+                                    http2=args.http2,
+                                    warmup=args.warmup_connections or concurrency
+                                    if args.warmup or args.warmup_connections else 0,
+                                    log_sample=args.log_sample)
+    fetcher.latency_out = args.latency_out
+    if args.resume:
+        restored = fetcher.restore_checkpoint(args.start, end_index)
+        logging.info(f"♻️ 断点恢复: {restored} 个账户已成功，本次跳过")
+    if args.engine == 'async':
+        fetcher.run_fetch_async()
+    else:
+        fetcher.run_fetch()
+
+    if token_cache:
+        token_cache.close()
+    if journal:
+        journal.close()
+    if sink:
+        sink.close()
+    if store:
+        store.close()
+    if progress_board:
+        progress_board.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+线程引擎的HTTP/2传输
+requests每个线程各占一条HTTP/1.1连接（turbo 6进程 × 80线程最多960条TLS连接打到同两个域名）；
+Http2Session让一个进程内的所有线程共用少量HTTP/2连接，请求作为多路流并发，省去大部分TLS握手和建连延迟。
+
+所有HTTP/2收发都在一个私有事件循环线程里由 httpx.AsyncClient 完成，工作线程只提交请求并等待结果：
+httpx同步客户端在多线程共用一条HTTP/2连接时，流ID的分配和HEADERS的发送不在同一把锁内，
+流ID可能乱序发出，服务端会以PROTOCOL_ERROR关闭整条连接；事件循环里两步之间不会切换，没有这个问题
+"""
+
+import asyncio
+import importlib.util
+import logging
+import threading
+from typing import Iterable, List, Optional
+from urllib.parse import urlsplit
+
+
+def plaintext_urls(urls: Iterable[str]) -> List[str]:
+    """返回其中的http://地址：HTTP/2只能在https下通过ALPN协商，这些地址上httpx会退回HTTP/1.1"""
+    return [url for url in urls if urlsplit(url).scheme != 'https']
+
+
+class Http2Session:
+    """与requests.Session接口兼容的HTTP/2客户端（request返回的httpx.Response有status_code/json/text），线程安全"""
+
+    def __init__(self, max_connections: int, retries: int = 1, urls: Iterable[str] = ()):
+        """urls为将要请求的地址，其中有http://地址时给出警告"""
+        if importlib.util.find_spec("httpx") is None or importlib.util.find_spec("h2") is None:
+            raise SystemExit("❌ --http2 需要httpx和h2，请先安装: pip install 'httpx[http2]'")
+        import httpx
+
+        for url in plaintext_urls(urls):
+            logging.warning(f"⚠️ {url} 不是https地址，无法协商HTTP/2，将退回HTTP/1.1：所有线程只共用 "
+                            f"{max_connections} 条连接，吞吐会远低于默认的requests连接池（可去掉--http2）")
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="http2-session", daemon=True)
+        self.thread.start()
+        # 服务端不支持HTTP/2或http://地址时退回HTTP/1.1，此时max_connections就是并发上限
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        # retries只重试建连失败，与requests的max_retries=1对应
+        self.client = self._call(self._create_client(httpx, limits, retries))
+
+    @staticmethod
+    async def _create_client(httpx, limits, retries: int):
+        # 客户端需要在事件循环线程内创建
+        return httpx.AsyncClient(transport=httpx.AsyncHTTPTransport(http2=True, limits=limits, retries=retries))
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def request(self, method: str, url: str, timeout: Optional[float] = None, **kwargs):
+        """阻塞地发送一个请求（响应体已读完）；超时、连接错误以httpx异常抛出"""
+        return self._call(self.client.request(method, url, timeout=timeout, **kwargs))
+
+    def close(self):
+        self._call(self.client.aclose())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+对数分桶延迟直方图（HDR风格）
+每个2的幂区间再线性细分为16个子桶，相对误差约3%；只保存非空桶，几百字节就能表示整次运行的延迟分布。
+直方图可以直接相加合并：进程池worker把各自的直方图回传父进程合并，subprocess批次各写一个文件由父进程合并。
+按 (阶段, 结果) 分别记录，例如 token/success、invitation/failed、check/registered
+
+用法:
+    python3 latency_histogram.py show results/loadtestc_latency_20250808_143022.json
+    python3 latency_histogram.py diff 旧.json 新.json
+"""
+
+import argparse
+import json
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 每个2的幂区间的线性子桶数
+SUB_BUCKETS = 16
+# 汇总输出的分位数
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def _bucket_index(micros: int) -> int:
+    """微秒值 -> 桶编号（0-15微秒各占一个桶）"""
+    if micros < SUB_BUCKETS:
+        return micros
+    exponent = micros.bit_length() - 1
+    sub = (micros >> (exponent - 4)) - SUB_BUCKETS
+    return (exponent - 3) * SUB_BUCKETS + sub
+
+
+def _bucket_upper(index: int) -> int:
+    """桶编号 -> 该桶的上界（微秒）"""
+    if index < SUB_BUCKETS:
+        return index
+    exponent = index // SUB_BUCKETS + 3
+    sub = index % SUB_BUCKETS
+    return ((SUB_BUCKETS + sub + 1) << (exponent - 4)) - 1
+
+
+class LogHistogram:
+    """稀疏存储的对数分桶直方图（单位：微秒）"""
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.min: Optional[int] = None
+        self.max = 0
+
+    def record(self, seconds: float):
+        micros = max(0, int(seconds * 1_000_000))
+        index = _bucket_index(micros)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += micros
+        self.min = micros if self.min is None else min(self.min, micros)
+        self.max = max(self.max, micros)
+
+    def merge(self, other: 'LogHistogram'):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p: float) -> float:
+        """返回第p百分位的延迟（秒），取所在桶的上界且不超过观测到的最大值"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(_bucket_upper(index), self.max) / 1_000_000
+        return self.max / 1_000_000
+
+    def mean(self) -> float:
+        return self.total / self.count / 1_000_000 if self.count else 0.0
+
+    def to_dict(self) -> dict:
+        # 桶按编号排序并转成字符串键，便于JSON存储和跨运行diff
+        return {
+            'count': self.count,
+            'sum_us': self.total,
+            'min_us': self.min or 0,
+            'max_us': self.max,
+            'buckets': {str(index): self.buckets[index] for index in sorted(self.buckets)},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'LogHistogram':
+        histogram = cls()
+        histogram.buckets = {int(index): count for index, count in data.get('buckets', {}).items()}
+        histogram.count = data.get('count', 0)
+        histogram.total = data.get('sum_us', 0)
+        histogram.min = data.get('min_us') if histogram.count else None
+        histogram.max = data.get('max_us', 0)
+        return histogram
+
+
+class LatencyRecorder:
+    """按 (阶段, 结果) 分组的直方图集合（线程安全）"""
+
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, str], LogHistogram] = {}
+        self.lock = threading.Lock()
+
+    def record(self, stage: str, outcome: str, seconds: float):
+        with self.lock:
+            histogram = self.histograms.get((stage, outcome))
+            if histogram is None:
+                histogram = self.histograms[(stage, outcome)] = LogHistogram()
+            histogram.record(seconds)
+
+    def merge_dict(self, data: Dict[str, dict]):
+        """合并另一个进程导出的直方图（to_dict的结果）"""
+        with self.lock:
+            for key, histogram_data in data.items():
+                stage, _, outcome = key.partition('/')
+                histogram = self.histograms.get((stage, outcome))
+                if histogram is None:
+                    histogram = self.histograms[(stage, outcome)] = LogHistogram()
+                histogram.merge(LogHistogram.from_dict(histogram_data))
+
+    def to_dict(self) -> Dict[str, dict]:
+        with self.lock:
+            return {f"{stage}/{outcome}": self.histograms[(stage, outcome)].to_dict()
+                    for stage, outcome in sorted(self.histograms)}
+
+    def drain(self) -> Dict[str, dict]:
+        """导出并清空（worker每处理完一个分片把增量发给父进程）"""
+        with self.lock:
+            histograms, self.histograms = self.histograms, {}
+        return {f"{stage}/{outcome}": histograms[(stage, outcome)].to_dict() for stage, outcome in sorted(histograms)}
+
+    def summary_lines(self) -> List[str]:
+        """每个 (阶段, 结果) 一行: 次数 / 平均 / p50 / p90 / p99 / p99.9 / 最大"""
+        lines = []
+        with self.lock:
+            for stage, outcome in sorted(self.histograms):
+                histogram = self.histograms[(stage, outcome)]
+                quantiles = " ".join(f"p{p:g}={histogram.percentile(p)*1000:.0f}ms" for p in PERCENTILES)
+                lines.append(f"{stage}/{outcome}: {histogram.count}次, 平均 {histogram.mean()*1000:.0f}ms, "
+                             f"{quantiles}, 最大 {histogram.max/1000:.0f}ms")
+        return lines
+
+    def save(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, paths: Iterable[str]) -> 'LatencyRecorder':
+        """读取并合并多个直方图文件（不存在的文件跳过）"""
+        recorder = cls()
+        for path in paths:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    recorder.merge_dict(json.load(f))
+            except FileNotFoundError:
+                continue
+        return recorder
+
+
+def main():
+    parser = argparse.ArgumentParser(description='📐 延迟直方图工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    show_parser = subparsers.add_parser('show', help='合并并显示一个或多个直方图文件的分位数')
+    show_parser.add_argument('files', nargs='+')
+    diff_parser = subparsers.add_parser('diff', help='对比两次运行的分位数')
+    diff_parser.add_argument('old')
+    diff_parser.add_argument('new')
+    args = parser.parse_args()
+
+    if args.command == 'show':
+        for line in LatencyRecorder.load(args.files).summary_lines():
+            print(f"   ⏱️ {line}")
+        return
+
+    old, new = LatencyRecorder.load([args.old]), LatencyRecorder.load([args.new])
+    for key in sorted(set(old.histograms) | set(new.histograms)):
+        before, after = old.histograms.get(key, LogHistogram()), new.histograms.get(key, LogHistogram())
+        changes = " ".join(f"p{p:g} {before.percentile(p)*1000:.0f}→{after.percentile(p)*1000:.0f}ms"
+                           for p in PERCENTILES)
+        print(f"   {key[0]}/{key[1]}: {before.count}→{after.count}次, {changes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+非阻塞日志管道
+请求热路径上的logging调用只把记录放进内存队列，由后台线程写日志文件和终端，
+工作线程不再因为同步写 FileHandler / StreamHandler 而互相排队；
+逐账户的成功日志用 LogSampler 按 --log-sample 采样，失败、重试日志不采样，全部保留
+"""
+
+import atexit
+import itertools
+import logging
+import logging.handlers
+import multiprocessing.util
+import queue
+import threading
+from typing import List, Optional
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+def setup_queue_logging(handlers: List[logging.Handler],
+                        level: int = logging.INFO) -> Optional[logging.handlers.QueueListener]:
+    """根logger只挂一个QueueHandler，handlers由后台线程依次写出
+    与 logging.basicConfig 一样，根logger已有handler时不做任何修改（返回None）；
+    进程正常退出时（包括multiprocessing的worker进程，它们不执行atexit）先把队列中剩余的记录写完
+    """
+    root = logging.getLogger()
+    if root.handlers:
+        return None
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+
+    stop_lock = threading.Lock()
+    stopped = []
+
+    def stop():
+        # atexit和multiprocessing的退出钩子可能都会调用，只停止一次
+        with stop_lock:
+            if not stopped:
+                stopped.append(True)
+                listener.stop()
+
+    atexit.register(stop)
+    multiprocessing.util.Finalize(None, stop, exitpriority=10)
+    return listener
+
+
+class LogSampler:
+    """逐账户成功日志的采样：每 every 条记录1条（1表示全部记录，0表示不记录），线程安全"""
+
+    def __init__(self, every: int = 1):
+        self.every = every
+        # itertools.count的next在GIL下是原子的，不需要额外加锁
+        self.counter = itertools.count(1)
+
+    def hit(self) -> bool:
+        if self.every <= 1:
+            return self.every == 1
+        return next(self.counter) % self.every == 0
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程内实时指标（Prometheus文本格式）
+所有指标都是内存中的计数，记录开销只是一次加锁；--metrics-port 启动一个后台HTTP线程：
+    GET /metrics       Prometheus文本格式，可直接被Prometheus/Grafana抓取
+    GET /metrics.json  JSON快照，供监控脚本轮询
+运行中即可看到各端点的请求数/状态码、在途请求数、延迟分布、token缓存命中情况和自适应并发上限
+"""
+
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+# 指标服务默认只监听本机，需要从其他机器抓取时用 --metrics-host 显式指定
+DEFAULT_HOST = "127.0.0.1"
+
+# 延迟直方图的桶上界（秒）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+
+
+class _Metric:
+    """带标签的指标基类：按标签值元组分别计数"""
+
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self.lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def _format_labels(self, key: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{label}="{value}"' for label, value in zip(self.labels, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{self._format_labels(key)} {value:g}")
+        return lines
+
+    def snapshot(self) -> Dict[str, float]:
+        with self.lock:
+            return {",".join(key) or "_": value for key, value in self.values.items()}
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, value: float = 1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, value: float = 1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def dec(self, value: float = 1, **labels):
+        self.inc(-value, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = buckets
+        # 标签 -> [各桶计数..., 总次数, 总和]
+        self.series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            for key, series in sorted(self.series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    labels = self._format_labels(key, 'le="%g"' % bound)
+                    lines.append(f"{self.name}_bucket{labels} {cumulative:g}")
+                labels = self._format_labels(key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {series[-2]:g}")
+                lines.append(f"{self.name}_count{self._format_labels(key)} {series[-2]:g}")
+                lines.append(f"{self.name}_sum{self._format_labels(key)} {series[-1]:.6f}")
+        return lines
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self.lock:
+            return {",".join(key) or "_": {'count': series[-2], 'sum': round(series[-1], 6)}
+                    for key, series in self.series.items()}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {metric.name: metric.snapshot() for metric in self.metrics}
+
+
+# 📊 全局指标（同一进程内的fetcher与checker共用）
+REGISTRY = MetricsRegistry()
+REQUESTS = REGISTRY.register(Counter(
+    "loadtest_requests_total", "按端点和HTTP状态码统计的请求数（异常记为exception）", ("endpoint", "status")))
+INFLIGHT = REGISTRY.register(Gauge(
+    "loadtest_inflight_requests", "当前在途请求数", ("endpoint",)))
+LATENCY = REGISTRY.register(Histogram(
+    "loadtest_request_duration_seconds", "请求延迟（秒）", ("endpoint",)))
+TOKENS = REGISTRY.register(Counter(
+    "loadtest_tokens_total",
+    "Bearer token来源: cached(缓存命中) / refreshed(refresh_token) / fetched(password登录) / revoked(缓存token被401拒绝作废)",
+    ("source",)))
+ACCOUNTS = REGISTRY.register(Counter(
+    "loadtest_accounts_total", "已完成的账户数", ("tool", "outcome")))
+ADAPTIVE_LIMIT = REGISTRY.register(Gauge(
+    "loadtest_adaptive_limit", "AIMD自适应并发的当前上限"))
+RETRIES = REGISTRY.register(Counter(
+    "loadtest_retries_total", "按失败类别统计的重试次数（HTTP状态码或 timeout / connection）", ("failure",)))
+
+
+def observe_request(endpoint: str, status, latency: float):
+    """记录一次请求的状态码与延迟"""
+    REQUESTS.inc(endpoint=endpoint, status=status)
+    LATENCY.observe(latency, endpoint=endpoint)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body = REGISTRY.render().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path == "/metrics.json":
+            body = json.dumps(REGISTRY.snapshot(), ensure_ascii=False).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 抓取请求不写入日志
+        pass
+
+
+def start_metrics_server(port: int, host: str = DEFAULT_HOST, attempts: int = 64) -> Optional[int]:
+    """在后台线程启动指标服务，端口被占用时依次尝试后续端口（多进程各占一个），返回实际端口"""
+    for candidate in range(port, port + attempts):
+        try:
+            server = ThreadingHTTPServer((host, candidate), _MetricsHandler)
+        except OSError:
+            continue
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+        logging.info(f"📡 指标服务: http://{host}:{candidate}/metrics")
+        return candidate
+    logging.warning(f"⚠️ 端口 {port}-{port + attempts - 1} 均被占用，指标服务未启动")
+    return None
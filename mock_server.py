@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地模拟 GodGPT / auth-station 服务
+只依赖标准库（asyncio，装了 uvloop 会自动使用），在一台机器上复现 fetcher、checker 和 k6 脚本用到的接口，
+不再在共享的staging环境上评估并发改动：
+- POST /connect/token                        password / refresh_token 两种授权
+- GET  .../godgpt/invitation/info            每个账户固定的7位邀请码
+- POST .../account/check-email-registered    按邮箱哈希确定是否已注册
+- POST .../godgpt/invitation/redeem          每个邀请码只能兑换一次
+- POST .../godgpt/create-session             返回新的sessionId
+- POST .../gotgpt/chat、.../godgpt/guest/chat SSE流式响应（分块逐条推送）
+其他路径统一返回成功的空JSON。每个接口可单独配置延迟分布、容量（超过容量的请求排队，排队超时返回524）
+以及按概率注入的 5xx / 524 / 超时 / 断开连接；GET /mock/stats 查看各接口的请求数、状态码和排队情况
+
+用法:
+    python3 mock_server.py                                         # 默认 127.0.0.1:8900
+    python3 mock_server.py --latency token=lognormal:80,0.5 --capacity token=20 --queue-timeout 5
+    python3 mock_server.py --fault token=524:0.02,timeout:0.01 --fault info=500:0.01
+    python3 mock_server.py --processes 4                           # SO_REUSEPORT多进程（容量、统计按进程计算）
+
+    python3 get_invitation_codes.py --start 1 --count 5000 \\
+        --auth-url http://127.0.0.1:8900/connect/token \\
+        --invitation-url http://127.0.0.1:8900/godgptpressure-client/api/godgpt/invitation/info
+    k6 run -e BASE_URL=http://127.0.0.1:8900/godgptpressure-client/api \\
+        -e AUTH_URL=http://127.0.0.1:8900/connect/token scripts/stress/qps/user-profile-qps-test.js
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import multiprocessing as mp
+import os
+import random
+import signal
+import socket
+import time
+import uuid
+from collections import defaultdict
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+# 路径后缀 -> 接口名（按后缀匹配，兼容 /godgptpressure-client/api 等任意前缀）
+ROUTES = (
+    ('/connect/token', 'token'),
+    ('/godgpt/invitation/info', 'info'),
+    ('/account/check-email-registered', 'check'),
+    ('/godgpt/invitation/redeem', 'redeem'),
+    ('/godgpt/create-session', 'session'),
+    ('/godgpt/guest/create-session', 'session'),
+    ('/gotgpt/chat', 'chat'),
+    ('/godgpt/guest/chat', 'chat'),
+)
+ENDPOINTS = [name for _, name in ROUTES] + ['other']
+
+# 默认延迟分布（毫秒）：authserver的password登录是昂贵的哈希校验，其余接口较快
+DEFAULT_LATENCY = {
+    'token': 'lognormal:60,0.4',
+    'info': 'lognormal:15,0.3',
+    'check': 'lognormal:15,0.3',
+    'redeem': 'lognormal:25,0.3',
+    'session': 'lognormal:20,0.3',
+    'chat': 'const:0',
+    'other': 'lognormal:10,0.3',
+}
+DEFAULT_PASSWORD = "Wh520520!"
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 401: 'Unauthorized', 404: 'Not Found', 500: 'Internal Server Error',
+               502: 'Bad Gateway', 503: 'Service Unavailable', 504: 'Gateway Timeout', 524: 'A Timeout Occurred'}
+# 邀请码字符集：与真实邀请码（如k6脚本里的默认值 uSTbNld）一样是7位区分大小写的字母数字
+CODE_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """解析延迟分布（毫秒），返回以秒为单位的采样函数
+    const:20 / uniform:10,50 / lognormal:80,0.5（中位数, sigma） / exp:30（均值）
+    """
+    kind, _, params = spec.partition(':')
+    values = [float(value) for value in params.split(',') if value]
+    if kind == 'const':
+        return lambda: values[0] / 1000
+    if kind == 'uniform':
+        return lambda: random.uniform(values[0], values[1]) / 1000
+    if kind == 'lognormal':
+        mu = math.log(values[0])
+        return lambda: random.lognormvariate(mu, values[1]) / 1000
+    if kind == 'exp':
+        return lambda: random.expovariate(1 / values[0]) / 1000
+    raise ValueError(f"未知的延迟分布: {spec}")
+
+
+def parse_faults(spec: str) -> Tuple[Tuple[str, float], ...]:
+    """解析故障注入: 524:0.02,500:0.01,timeout:0.01,reset:0.005 -> ((类型, 概率), ...)"""
+    faults = []
+    for item in spec.split(','):
+        kind, _, probability = item.partition(':')
+        if kind not in ('timeout', 'reset') and not kind.isdigit():
+            raise ValueError(f"未知的故障类型: {kind}")
+        faults.append((kind, float(probability)))
+    return tuple(faults)
+
+
+def parse_endpoint_options(items, parse):
+    """解析 endpoint=value 形式的重复参数；endpoint 为 all 时应用到全部接口"""
+    options = {}
+    for item in items or []:
+        endpoint, _, value = item.partition('=')
+        targets = ENDPOINTS if endpoint == 'all' else [endpoint]
+        for target in targets:
+            if target not in ENDPOINTS:
+                raise ValueError(f"未知的接口: {target}（可选: {', '.join(ENDPOINTS)}, all）")
+            options[target] = parse(value)
+    return options
+
+
+def invite_code_for(email: str) -> str:
+    """每个账户固定的7位邀请码"""
+    digest = hashlib.blake2b(email.encode(), digest_size=8).digest()
+    number = int.from_bytes(digest, 'big')
+    chars = []
+    for _ in range(7):
+        number, remainder = divmod(number, len(CODE_ALPHABET))
+        chars.append(CODE_ALPHABET[remainder])
+    return "".join(chars)
+
+
+class MockState:
+    """单个进程内的接口行为配置和统计"""
+
+    def __init__(self, args):
+        latency = {endpoint: parse_latency(spec) for endpoint, spec in DEFAULT_LATENCY.items()}
+        latency.update(parse_endpoint_options(args.latency, parse_latency))
+        self.latency: Dict[str, Callable[[], float]] = latency
+        self.faults = parse_endpoint_options(args.fault, parse_faults)
+        # 容量: 同时处理的请求数上限，超过的请求排队
+        self.capacity = {endpoint: asyncio.Semaphore(limit)
+                         for endpoint, limit in parse_endpoint_options(args.capacity, int).items()}
+        self.queue_timeout = args.queue_timeout
+        self.hang_seconds = args.hang_seconds
+        self.password = args.password
+        self.token_ttl = args.token_ttl
+        self.unregistered_ratio = args.unregistered_ratio
+        self.chat_chunks = args.chat_chunks
+        self.chat_interval = args.chat_interval / 1000
+        self.redeemed = set()
+        # 统计
+        self.started = time.time()
+        self.requests: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.inflight: Dict[str, int] = defaultdict(int)
+        self.queued: Dict[str, int] = defaultdict(int)
+        self.max_queued: Dict[str, int] = defaultdict(int)
+        self.connections = 0
+        # 累计接受的连接数（对比请求数可以看出客户端的连接复用情况）
+        self.accepted = 0
+
+    def is_registered(self, email: str) -> bool:
+        """按邮箱哈希确定注册状态，同一个邮箱每次结果相同"""
+        if not self.unregistered_ratio:
+            return True
+        digest = hashlib.blake2b(email.encode(), digest_size=4).digest()
+        return int.from_bytes(digest, 'big') / 2 ** 32 >= self.unregistered_ratio
+
+    def pick_fault(self, endpoint: str) -> Optional[str]:
+        roll = random.random()
+        for kind, probability in self.faults.get(endpoint, ()):
+            if roll < probability:
+                return kind
+            roll -= probability
+        return None
+
+    def stats(self) -> dict:
+        elapsed = time.time() - self.started
+        return {
+            'pid': os.getpid(),
+            'uptime': round(elapsed, 1),
+            'connections': self.connections,
+            'accepted': self.accepted,
+            'endpoints': {
+                endpoint: {
+                    'requests': dict(statuses),
+                    'rps': round(sum(statuses.values()) / elapsed, 1) if elapsed > 0 else 0,
+                    'inflight': self.inflight[endpoint],
+                    'queued': self.queued[endpoint],
+                    'max_queued': self.max_queued[endpoint],
+                }
+                for endpoint, statuses in self.requests.items()
+            },
+        }
+
+
+def json_response(status: int, data) -> Tuple[int, str, bytes]:
+    return status, 'application/json; charset=utf-8', json.dumps(data, ensure_ascii=False).encode()
+
+
+def bearer_email(headers: Dict[str, str]) -> Optional[str]:
+    """从 mock token 中取出邮箱（token格式: mock.{email}.{过期时间戳}）"""
+    token = headers.get('authorization', '')[len('Bearer '):]
+    if not token.startswith('mock.'):
+        return None
+    email, _, expires_at = token[len('mock.'):].rpartition('.')
+    if not expires_at.isdigit() or int(expires_at) < time.time():
+        return None
+    return email
+
+
+def handle_api(state: MockState, endpoint: str, headers: Dict[str, str], body: bytes) -> Tuple[int, str, bytes]:
+    """非流式接口的业务逻辑"""
+    if endpoint == 'token':
+        form = {key: values[0] for key, values in parse_qs(body.decode()).items()}
+        if form.get('grant_type') == 'refresh_token':
+            refresh_token = form.get('refresh_token', '')
+            if not refresh_token.startswith('mockrefresh.'):
+                return json_response(400, {'error': 'invalid_grant', 'error_description': 'invalid refresh_token'})
+            email = refresh_token[len('mockrefresh.'):]
+        else:
+            email = form.get('username', '')
+            if not state.is_registered(email) or form.get('password') != state.password:
+                return json_response(400, {'error': 'invalid_grant',
+                                           'error_description': 'Invalid username or password!'})
+        expires_at = int(time.time()) + state.token_ttl
+        return json_response(200, {'access_token': f"mock.{email}.{expires_at}", 'token_type': 'Bearer',
+                                   'expires_in': state.token_ttl, 'refresh_token': f"mockrefresh.{email}"})
+
+    if endpoint == 'check':
+        email = json.loads(body or b'{}').get('emailAddress', '')
+        return json_response(200, {'code': '20000', 'data': state.is_registered(email), 'message': ''})
+
+    email = bearer_email(headers)
+    if email is None:
+        return 401, 'text/plain', b''
+    if endpoint == 'info':
+        return json_response(200, {'code': '20000', 'data': {'inviteCode': invite_code_for(email),
+                                                             'totalInvites': 0, 'validInvites': 0}})
+    if endpoint == 'redeem':
+        code = json.loads(body or b'{}').get('inviteCode', '')
+        if code in state.redeemed:
+            return json_response(200, {'code': '40001', 'data': False, 'message': 'Invitation code already used'})
+        state.redeemed.add(code)
+        return json_response(200, {'code': '20000', 'data': True, 'message': ''})
+    if endpoint == 'session':
+        return json_response(200, {'code': '20000', 'data': str(uuid.uuid4()), 'message': ''})
+    return json_response(200, {'code': '20000', 'data': {}, 'message': ''})
+
+
+def response_head(status: int, content_type: str, length: Optional[int], keep_alive: bool) -> bytes:
+    lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'Unknown')}", f"Content-Type: {content_type}"]
+    lines.append(f"Content-Length: {length}" if length is not None else "Transfer-Encoding: chunked")
+    lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+
+def route(path: str) -> str:
+    path = path.split('?', 1)[0].rstrip('/')
+    for suffix, endpoint in ROUTES:
+        if path.endswith(suffix):
+            return endpoint
+    return 'other'
+
+
+async def stream_chat(state: MockState, writer: asyncio.StreamWriter, keep_alive: bool):
+    """SSE: 分块逐条推送消息，最后发送结束事件"""
+    writer.write(response_head(200, 'text/event-stream', None, keep_alive))
+    for i in range(state.chat_chunks):
+        await asyncio.sleep(state.chat_interval)
+        event = json.dumps({'ResponseType': 2, 'Response': f"chunk {i} ", 'MessageId': i}).encode()
+        data = b"data: " + event + b"\n\n"
+        writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+        await writer.drain()
+    data = b"data: " + json.dumps({'ResponseType': 99, 'Response': ''}).encode() + b"\n\n"
+    writer.write(b"%x\r\n%s\r\n0\r\n\r\n" % (len(data), data))
+
+
+async def serve_request(state: MockState, method: str, path: str, headers: Dict[str, str], body: bytes,
+                        writer: asyncio.StreamWriter, keep_alive: bool) -> bool:
+    """处理一个请求，返回连接是否还能继续使用"""
+    if path.startswith('/mock/stats'):
+        status, content_type, payload = json_response(200, state.stats())
+        writer.write(response_head(status, content_type, len(payload), keep_alive) + payload)
+        return keep_alive
+
+    endpoint = route(path)
+    if method == 'HEAD':
+        # 客户端预热连接用，只返回响应头
+        state.requests[endpoint]['HEAD'] += 1
+        writer.write(response_head(200, 'text/plain', 0, keep_alive))
+        return keep_alive
+
+    semaphore = state.capacity.get(endpoint)
+    if semaphore:
+        # 超过容量时排队，模拟服务端线程池/连接池耗尽后的排队延迟
+        state.queued[endpoint] += 1
+        state.max_queued[endpoint] = max(state.max_queued[endpoint], state.queued[endpoint])
+        try:
+            await asyncio.wait_for(semaphore.acquire(), state.queue_timeout)
+        except asyncio.TimeoutError:
+            # 排队超过网关超时，像Cloudflare一样返回524
+            state.requests[endpoint]['524'] += 1
+            writer.write(response_head(524, 'text/plain', 0, keep_alive))
+            return keep_alive
+        finally:
+            state.queued[endpoint] -= 1
+
+    state.inflight[endpoint] += 1
+    try:
+        fault = state.pick_fault(endpoint)
+        if fault == 'timeout':
+            # 不返回响应，客户端只能等到自己的超时
+            state.requests[endpoint]['timeout'] += 1
+            await asyncio.sleep(state.hang_seconds)
+            return False
+        if fault == 'reset':
+            state.requests[endpoint]['reset'] += 1
+            return False
+
+        await asyncio.sleep(state.latency[endpoint]())
+        if fault:
+            state.requests[endpoint][fault] += 1
+            writer.write(response_head(int(fault), 'text/plain', 0, keep_alive))
+            return keep_alive
+        if endpoint == 'chat':
+            # 登录用户和访客聊天共用，不校验token
+            state.requests[endpoint]['200'] += 1
+            await stream_chat(state, writer, keep_alive)
+            return keep_alive
+        status, content_type, payload = handle_api(state, endpoint, headers, body)
+        state.requests[endpoint][str(status)] += 1
+        writer.write(response_head(status, content_type, len(payload), keep_alive) + payload)
+        return keep_alive
+    finally:
+        state.inflight[endpoint] -= 1
+        if semaphore:
+            semaphore.release()
+
+
+async def handle_connection(state: MockState, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """HTTP/1.1 keep-alive 连接：按顺序读取请求（只支持Content-Length请求体）"""
+    state.connections += 1
+    state.accepted += 1
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                return
+            request_line, *header_lines = head.decode('latin-1').split("\r\n")
+            method, path, version = request_line.split(" ", 2)
+            headers = {}
+            for line in header_lines:
+                if line:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+            body = b""
+            length = int(headers.get('content-length', 0))
+            if length:
+                body = await reader.readexactly(length)
+            keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+            if not await serve_request(state, method, path, headers, body, writer, keep_alive):
+                return
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        state.connections -= 1
+        writer.close()
+
+
+async def run_server(args, sock: Optional[socket.socket] = None):
+    state = MockState(args)
+    server = await asyncio.start_server(lambda r, w: handle_connection(state, r, w), sock=sock,
+                                        backlog=args.backlog, limit=64 * 1024)
+    async with server:
+        await server.serve_forever()
+
+
+def make_socket(host: str, port: int, reuse_port: bool) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        # 多个进程绑定同一端口，由内核分配连接
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.setblocking(False)
+    return sock
+
+
+def serve(args, reuse_port: bool):
+    """在当前进程运行事件循环（有uvloop时使用uvloop）"""
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    asyncio.run(run_server(args, make_socket(args.host, args.port, reuse_port)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='🧪 本地模拟 GodGPT / auth-station 服务')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=8900, help='监听端口')
+    parser.add_argument('--processes', type=int, default=1, help='进程数（>1时使用SO_REUSEPORT，容量与统计按进程计算）')
+    parser.add_argument('--latency', action='append', metavar='ENDPOINT=DIST',
+                        help='接口延迟分布(毫秒): const:20 / uniform:10,50 / lognormal:中位数,sigma / exp:均值，'
+                             f"接口: {', '.join(ENDPOINTS)}, all（可重复）")
+    parser.add_argument('--capacity', action='append', metavar='ENDPOINT=N',
+                        help='接口同时处理的请求数上限，超过的请求排队（可重复）')
+    parser.add_argument('--queue-timeout', type=float, default=100.0,
+                        help='排队超过该秒数返回524（Cloudflare默认100秒）')
+    parser.add_argument('--fault', action='append', metavar='ENDPOINT=KIND:P,...',
+                        help='按概率注入故障: 状态码(500/502/503/524)、timeout(不响应)、reset(断开连接)（可重复）')
+    parser.add_argument('--hang-seconds', type=float, default=300.0, help='timeout故障保持连接不响应的秒数')
+    parser.add_argument('--password', default=DEFAULT_PASSWORD, help='所有账户的密码')
+    parser.add_argument('--token-ttl', type=int, default=3600, help='access_token有效期(秒)')
+    parser.add_argument('--unregistered-ratio', type=float, default=0.0,
+                        help='未注册账户比例（按邮箱哈希固定），未注册账户登录返回400')
+    parser.add_argument('--chat-chunks', type=int, default=20, help='SSE聊天每次推送的消息块数')
+    parser.add_argument('--chat-interval', type=float, default=50.0, help='SSE消息块间隔(毫秒)')
+    parser.add_argument('--backlog', type=int, default=4096, help='监听队列长度')
+    args = parser.parse_args()
+
+    # 启动前校验参数，避免子进程里才报错
+    parse_endpoint_options(args.latency, parse_latency)
+    parse_endpoint_options(args.fault, parse_faults)
+    parse_endpoint_options(args.capacity, int)
+
+    print(f"🧪 模拟服务: http://{args.host}:{args.port} ({args.processes} 个进程)")
+    print(f"   🔐 token接口: http://{args.host}:{args.port}/connect/token")
+    print(f"   📡 API前缀: http://{args.host}:{args.port}/godgptpressure-client/api")
+    print(f"   📊 统计: http://{args.host}:{args.port}/mock/stats")
+    if args.processes <= 1:
+        serve(args, reuse_port=False)
+        return
+
+    workers = [mp.Process(target=serve, args=(args, True), daemon=True) for _ in range(args.processes)]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量监控引擎（turbo_monitor / stable_monitor 共用）
+- 进度取自账户/邀请码索引库(results/code_store.db)：按 (prefix, updated_at) 索引统计时间窗口内的尝试数/成功数，
+  同一账户重试多次只计一次，不再按日期前缀扫描和解析批次JSON文件
+- 安装了watchdog时监听results目录的变更通知，目录无变化的tick不查询索引库；否则每次轮询都查询
+- turbo/stable运行中时额外attach共享内存进度块，读取亚秒级的实时计数（不涉及文件I/O）
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from code_store import CodeStore
+from progress_shm import ProgressBoard, default_name
+
+
+class _ChangeWatcher:
+    """用watchdog监听目录变更；未安装watchdog时不可用"""
+
+    def __init__(self, directory: str):
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        self.changed = threading.Event()
+        # 启动时先做一次完整扫描
+        self.changed.set()
+        changed = self.changed
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                # 忽略opened/closed等只读事件，否则监控器自己读文件也会触发变更
+                if event.event_type in ('created', 'modified', 'moved', 'deleted'):
+                    changed.set()
+
+        self.observer = Observer()
+        self.observer.schedule(_Handler(), directory, recursive=False)
+        self.observer.daemon = True
+        self.observer.start()
+
+    def consume(self) -> bool:
+        """返回自上次调用以来目录是否有变化"""
+        if not self.changed.is_set():
+            return False
+        self.changed.clear()
+        return True
+
+    def stop(self):
+        self.observer.stop()
+
+
+class RunMonitor:
+    """增量统计一次生成运行的进度"""
+
+    def __init__(self, prefix: str = "loadtestc", results_dir: str = "results", since: Optional[float] = None):
+        self.prefix = prefix
+        self.results_dir = results_dir
+        # 只统计该时间戳之后更新的账户，默认从今天0点开始
+        self.since = since if since is not None else datetime.now().replace(
+            hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+        os.makedirs(results_dir, exist_ok=True)
+        self.store = CodeStore(os.path.join(results_dir, os.path.basename(CodeStore.DEFAULT_PATH)))
+
+        self.watcher: Optional[_ChangeWatcher] = None
+        try:
+            self.watcher = _ChangeWatcher(results_dir)
+        except ImportError:
+            pass
+
+        self.board: Optional[ProgressBoard] = None
+        self.last_poll: Optional[float] = None
+        self.last_attempted = 0
+        self.last_codes = 0
+        self.snapshot: Dict = {}
+
+    @property
+    def mode(self) -> str:
+        return "watchdog" if self.watcher else "轮询"
+
+    def live(self) -> Optional[Dict[str, float]]:
+        """读取共享内存中的实时进度；生成器未运行时返回None"""
+        if self.board is None:
+            try:
+                self.board = ProgressBoard.attach(default_name(self.prefix))
+            except FileNotFoundError:
+                return None
+        totals = self.board.totals()
+        if totals['last_update'] < time.time() - 60:
+            # 进度块已不再更新（生成器已结束），下次重新attach新一轮运行的块
+            self.board.close()
+            self.board = None
+        return totals
+
+    def poll(self) -> Dict:
+        """返回当前进度快照；目录无变化时直接复用上次的统计"""
+        now = time.time()
+        if self.watcher is None or self.watcher.consume():
+            counts = self.store.progress(self.prefix, self.since)
+            self.snapshot = {
+                'codes': counts['succeeded'],
+                'attempted': counts['attempted'],
+                'succeeded': counts['succeeded'],
+            }
+
+        snapshot = dict(self.snapshot)
+        snapshot['live'] = self.live()
+        attempted = snapshot['attempted']
+        snapshot['success_rate'] = snapshot['succeeded'] / attempted * 100 if attempted else 0.0
+        # 近期速率按两次poll之间的真实间隔计算
+        dt = now - self.last_poll if self.last_poll else 0
+        snapshot['recent_attempt_rate'] = (attempted - self.last_attempted) / dt if dt > 0 else 0.0
+        snapshot['recent_code_rate'] = (snapshot['codes'] - self.last_codes) / dt if dt > 0 else 0.0
+        self.last_poll = now
+        self.last_attempted = attempted
+        self.last_codes = snapshot['codes']
+        return snapshot
+
+    def close(self):
+        if self.watcher:
+            self.watcher.stop()
+        if self.board:
+            self.board.close()
+        self.store.close()
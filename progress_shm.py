@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享内存进度计数器
+一块固定布局的共享内存（/dev/shm 下的mmap文件，与rate_limiter的做法一致）：头部 + 每个worker一个槽位
+    槽位: 已派发账户数 attempted / 成功 succeeded / 失败 failed / 在途请求数 inflight / 最后更新时间戳
+每个槽位只有一个写入进程（进程内多线程用线程锁合并），跨进程无锁；
+父进程和任意监控进程按名字attach即可读取汇总进度，亚秒级新鲜度且没有任何文件I/O
+
+用法:
+    python3 progress_shm.py watch --name loadtest_progress_loadtestc
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+# 头部: 魔数 + 槽位数
+_HEADER_FORMAT = '<8sI4x'
+_HEADER_SIZE = struct.calcsize(_HEADER_FORMAT)
+_MAGIC = b'LTPROG01'
+# 槽位: attempted, succeeded, failed, inflight, last_update（全部8字节对齐）
+_SLOT_FORMAT = '<QQQqd'
+_SLOT_SIZE = struct.calcsize(_SLOT_FORMAT)
+_FIELDS = ('attempted', 'succeeded', 'failed', 'inflight', 'last_update')
+# 优先放在内存文件系统上，读写不落盘
+_SHM_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+def default_name(prefix: str) -> str:
+    return f"loadtest_progress_{prefix}"
+
+
+class ProgressBoard:
+    """进度共享内存块（父进程create，worker和监控进程attach）"""
+
+    def __init__(self, name: str, fd: int, owner: bool):
+        self.name = name
+        self.path = self.path_for(name)
+        self.fd = fd
+        self.owner = owner
+        self.buf = mmap.mmap(fd, os.fstat(fd).st_size)
+        magic, self.slots = struct.unpack_from(_HEADER_FORMAT, self.buf, 0)
+        if magic != _MAGIC:
+            self.buf.close()
+            os.close(fd)
+            raise ValueError(f"{self.path} 不是进度计数块")
+
+    @staticmethod
+    def path_for(name: str) -> str:
+        return os.path.join(_SHM_DIR, f"{name}.bin")
+
+    @classmethod
+    def create(cls, name: str, slots: int) -> 'ProgressBoard':
+        """创建进度块；同名的残留块（上次运行被kill -9未清理）直接覆盖"""
+        fd = os.open(cls.path_for(name), os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.write(fd, struct.pack(_HEADER_FORMAT, _MAGIC, slots) + bytes(slots * _SLOT_SIZE))
+        return cls(name, fd, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> 'ProgressBoard':
+        """按名字打开已存在的进度块，不存在时抛出FileNotFoundError"""
+        return cls(name, os.open(cls.path_for(name), os.O_RDWR), owner=False)
+
+    def slot(self, index: int) -> 'ProgressSlot':
+        """第index个槽位的写入端；超出范围直接报错，不能让两个写入进程共用一个槽位互相覆盖计数"""
+        if not 0 <= index < self.slots:
+            raise IndexError(f"进度槽位 {index} 超出范围（{self.name} 只有 {self.slots} 个槽位）")
+        return ProgressSlot(self, index)
+
+    def read(self) -> List[Dict[str, float]]:
+        """读取所有槽位（只读，不加锁；单个字段不会撕裂，字段之间可能相差一次更新）"""
+        return [dict(zip(_FIELDS, struct.unpack_from(_SLOT_FORMAT, self.buf, _HEADER_SIZE + i * _SLOT_SIZE)))
+                for i in range(self.slots)]
+
+    def totals(self) -> Dict[str, float]:
+        """汇总所有槽位，并统计最近2秒内有更新的worker数"""
+        slots = self.read()
+        totals = {field: sum(slot[field] for slot in slots) for field in _FIELDS[:4]}
+        last_update = max((slot['last_update'] for slot in slots), default=0.0)
+        totals['last_update'] = last_update
+        totals['active_workers'] = sum(1 for slot in slots if slot['last_update'] >= time.time() - 2)
+        return totals
+
+    def close(self):
+        self.buf.close()
+        os.close(self.fd)
+        if self.owner:
+            os.unlink(self.path)
+
+
+def format_totals(totals: Dict[str, float], total_accounts: Optional[int] = None) -> str:
+    """格式化汇总进度（一行）"""
+    done = totals['succeeded'] + totals['failed']
+    progress = f" ({done / total_accounts * 100:.1f}%)" if total_accounts else ""
+    return (f"📟 已完成 {done:,}{progress} | 已派发 {totals['attempted']:,} | ✅ {totals['succeeded']:,} | "
+            f"❌ {totals['failed']:,} | 🔄 在途请求 {totals['inflight']} | 活跃worker {totals['active_workers']}")
+
+
+class ProgressSlot:
+    """单个worker进程的写入端：计数保存在本地，每次更新整体写回槽位"""
+
+    def __init__(self, board: ProgressBoard, index: int):
+        self.board = board
+        self.offset = _HEADER_SIZE + index * _SLOT_SIZE
+        # 同一进程内多个线程共用一个槽位，用线程锁合并；跨进程无需加锁
+        self.lock = threading.Lock()
+        self.attempted, self.succeeded, self.failed, self.inflight, _ = struct.unpack_from(
+            _SLOT_FORMAT, board.buf, self.offset)
+
+    def _publish(self):
+        struct.pack_into(_SLOT_FORMAT, self.board.buf, self.offset,
+                         self.attempted, self.succeeded, self.failed, self.inflight, time.time())
+
+    def dispatched(self):
+        with self.lock:
+            self.attempted += 1
+            self._publish()
+
+    def finished(self, success: bool):
+        with self.lock:
+            if success:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+            self._publish()
+
+    def request_started(self):
+        with self.lock:
+            self.inflight += 1
+            self._publish()
+
+    def request_finished(self):
+        with self.lock:
+            self.inflight -= 1
+            self._publish()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='📟 共享内存进度查看')
+    parser.add_argument('command', choices=['watch'], help='watch: 持续输出汇总进度')
+    parser.add_argument('--name', default=default_name("loadtestc"), help='共享内存块名字')
+    parser.add_argument('--interval', type=float, default=0.5, help='刷新间隔(秒)')
+    args = parser.parse_args()
+
+    board = ProgressBoard.attach(args.name)
+    last_done: Optional[int] = None
+    try:
+        while True:
+            totals = board.totals()
+            done = totals['succeeded'] + totals['failed']
+            rate = (done - last_done) / args.interval if last_done is not None else 0.0
+            last_done = done
+            print(f"\r{format_totals(totals)} | ⚡ {rate:.1f}/秒", end="")
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\n✋ 已停止")
+    finally:
+        board.close()
+
+
+if __name__ == "__main__":
+    main()
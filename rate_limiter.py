@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨进程全局令牌桶限速器
+令牌桶状态（剩余令牌数、上次更新时间）放在临时目录下一个16字节的mmap文件里，
+用 fcntl 文件锁做进程间互斥、threading.Lock 做进程内互斥。
+同名的桶在同一台机器上的所有线程、所有进程（包括turbo的子进程/进程池）之间共享同一份QPS预算，
+/connect/token 与 invitation/info 各用一个桶，分别配置预算
+"""
+
+import asyncio
+import fcntl
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Optional
+
+# 状态布局: 剩余令牌数(double) + 上次更新时间戳(double)
+_STATE_FORMAT = '<dd'
+_STATE_SIZE = struct.calcsize(_STATE_FORMAT)
+
+
+class SharedTokenBucket:
+    """按名字共享的令牌桶，采用预约模式：先扣令牌，再按欠额计算需要等待的时间"""
+
+    def __init__(self, name: str, rate: float, burst: Optional[float] = None,
+                 directory: str = tempfile.gettempdir()):
+        if rate <= 0:
+            raise ValueError("rate必须大于0")
+        self.name = name
+        self.rate = rate
+        # 默认允许约200ms的突发量，避免启动瞬间把整秒的预算一次打出去
+        self.burst = burst if burst is not None else max(1.0, rate / 5)
+        self.path = os.path.join(directory, f"loadtest_ratelimit_{name}.bin")
+
+        self.thread_lock = threading.Lock()
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            # 第一个打开的进程负责初始化状态
+            if os.fstat(self.fd).st_size < _STATE_SIZE:
+                os.ftruncate(self.fd, _STATE_SIZE)
+                os.pwrite(self.fd, struct.pack(_STATE_FORMAT, self.burst, time.time()), 0)
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self.state = mmap.mmap(self.fd, _STATE_SIZE)
+
+    def reserve(self) -> float:
+        """预约一个令牌，返回调用方需要等待的秒数（0表示可以立即发送）"""
+        with self.thread_lock:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+            try:
+                tokens, last = struct.unpack_from(_STATE_FORMAT, self.state, 0)
+                now = time.time()
+                tokens = min(self.burst, tokens + max(0.0, now - last) * self.rate) - 1
+                struct.pack_into(_STATE_FORMAT, self.state, 0, tokens, now)
+            finally:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+        # 令牌为负表示前面已有预约在排队，按欠额折算等待时间
+        return -tokens / self.rate if tokens < 0 else 0.0
+
+    def acquire(self):
+        """线程引擎：阻塞直到拿到令牌"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def async_acquire(self):
+        """async引擎：挂起协程直到拿到令牌"""
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def close(self):
+        self.state.close()
+        os.close(self.fd)
+
+
+class EndpointRateLimits:
+    """按端点分配的限速预算；未配置预算的端点不限速"""
+
+    def __init__(self, auth_qps: float = 0, api_qps: float = 0, namespace: str = "loadtest"):
+        self.buckets = {}
+        if auth_qps > 0:
+            self.buckets['auth'] = SharedTokenBucket(f"{namespace}_auth", auth_qps)
+        if api_qps > 0:
+            self.buckets['invitation'] = SharedTokenBucket(f"{namespace}_invitation", api_qps)
+
+    def acquire(self, endpoint: str):
+        bucket = self.buckets.get(endpoint)
+        if bucket:
+            bucket.acquire()
+
+    async def async_acquire(self, endpoint: str):
+        bucket = self.buckets.get(endpoint)
+        if bucket:
+            await bucket.async_acquire()
+
+    def describe(self) -> str:
+        return ", ".join(f"{endpoint} {bucket.rate:g} QPS" for endpoint, bucket in self.buckets.items())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量结果输出（result sink）
+fetcher每成功一个账户就把结果追加到按行分隔的 results/{prefix}_codes.ndjson（后台线程批量落盘），
+下游工具用 SinkReader 从上次读到的字节偏移继续读，合并、监控、导出k6数据
+都只处理新增的记录，不再反复解析整个结果文件
+
+行格式: {"e": 邮箱, "c": 邀请码, "t": 时间戳}
+
+用法:
+    python3 result_sink.py tail --prefix loadtestc
+    python3 result_sink.py export-k6 --prefix loadtestc --out scripts/stress/data/loadtest_invite_codes.json
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+from checkpoint import AppendLog
+
+
+class ResultSink(AppendLog):
+    """成功结果的追加写输出"""
+
+    FLUSH_EVERY = 100
+
+    def __init__(self, path: str, flush_every: int = FLUSH_EVERY):
+        super().__init__(path, flush_every)
+
+    @staticmethod
+    def default_path(prefix: str) -> str:
+        return f"results/{prefix}_codes.ndjson"
+
+    def add(self, email: str, invitation_code: str):
+        self.append(json.dumps({'e': email, 'c': invitation_code, 't': round(time.time(), 3)}, ensure_ascii=False))
+
+
+class SinkReader:
+    """从字节偏移处增量读取结果文件，只返回完整的行"""
+
+    def __init__(self, path: str, offset: int = 0):
+        self.path = path
+        self.offset = offset
+        # 文件被替换/截断时从头重读
+        self.inode: Optional[int] = None
+
+    @classmethod
+    def from_end(cls, path: str) -> 'SinkReader':
+        """从文件当前末尾开始读（只关心此后新增的记录）"""
+        return cls(path, os.path.getsize(path) if os.path.exists(path) else 0)
+
+    def read_new(self) -> List[Dict]:
+        """读取上次偏移之后新增的完整记录"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+
+        if self.inode is not None and (stat.st_ino != self.inode or stat.st_size < self.offset):
+            self.offset = 0
+        self.inode = stat.st_ino
+        if stat.st_size == self.offset:
+            return []
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(stat.st_size - self.offset)
+
+        # 最后一行可能还没写完，留到下次再读
+        end = data.rfind(b'\n') + 1
+        self.offset += end
+
+        records = []
+        for line in data[:end].splitlines():
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        return records
+
+
+def merge_codes(path: str, offset: int = 0) -> Dict[str, str]:
+    """读取结果文件（从offset开始）合并为 {邮箱: 邀请码}"""
+    return {record['e']: record['c'] for record in SinkReader(path, offset).read_new()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='📤 增量结果文件工具')
+    parser.add_argument('--prefix', '-p', default="loadtestc", help='邮箱前缀')
+    parser.add_argument('--sink', default=None, help='结果文件路径（默认 results/{prefix}_codes.ndjson）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    tail_parser = subparsers.add_parser('tail', help='持续输出新增的邀请码数量')
+    tail_parser.add_argument('--interval', type=float, default=2.0, help='轮询间隔(秒)')
+
+    export_parser = subparsers.add_parser('export-k6', help='导出k6可用的邀请码数组')
+    export_parser.add_argument('--out', required=True, help='输出文件路径')
+
+    args = parser.parse_args()
+    path = args.sink or ResultSink.default_path(args.prefix)
+
+    if args.command == 'tail':
+        reader = SinkReader(path)
+        codes: Dict[str, str] = {}
+        try:
+            while True:
+                new_records = reader.read_new()
+                for record in new_records:
+                    codes[record['e']] = record['c']
+                print(f"\r📊 邀请码: {len(codes):,} (本轮新增 {len(new_records)}) | 偏移: {reader.offset:,}B", end="")
+                time.sleep(args.interval)
+        except KeyboardInterrupt:
+            print("\n✋ 已停止")
+    elif args.command == 'export-k6':
+        codes = merge_codes(path)
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(list(codes.values()), f, ensure_ascii=False)
+        print(f"📁 已导出 {len(codes)} 个邀请码到: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
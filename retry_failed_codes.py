@@ -15,11 +15,20 @@ from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import logging
 
+from token_cache import TokenCache
+
+# 本脚本通过 /api/auth/email/login 登录，签发方和token格式都与 get_invitation_codes.py 使用的
+# /connect/token 不同；缓存按邮箱作键，两者共用一个文件会把错误签发方的token交给对方，因此默认使用单独的缓存文件
+TOKEN_CACHE_PATH = "results/token_cache_email_login.db"
+
 class FailedCodeRetriever:
-    def __init__(self, failed_file: str, workers: int = 30, password: str = "Password123"):
+    def __init__(self, failed_file: str, workers: int = 30, password: str = "Password123",
+                 token_cache: TokenCache = None):
         self.failed_file = failed_file
         self.workers = workers
         self.password = password
+        # token缓存（None表示每次都重新登录）
+        self.token_cache = token_cache
         
         # 优化连接池配置
         self.session = requests.Session()
@@ -37,6 +46,8 @@ class FailedCodeRetriever:
         
         self.invitation_codes = {}
         self.failed_accounts = []
+        # 本次需要重试的账户总数（加载失败账户文件后确定）
+        self.total = 0
         self.lock = threading.Lock()
         self.start_time = time.time()
         
@@ -59,12 +70,14 @@ class FailedCodeRetriever:
         self.logger = logging.getLogger(__name__)
         
     def load_failed_accounts(self):
-        """加载失败的账户列表"""
+        """加载失败的账户列表（每行一个邮箱，或 get_invitation_codes.py 输出的失败记录JSONL）"""
         failed_accounts = []
         try:
             with open(self.failed_file, 'r', encoding='utf-8') as f:
                 for line in f:
                     email = line.strip()
+                    if email.startswith('{'):
+                        email = json.loads(email)['email']
                     if email and '@' in email:
                         failed_accounts.append(email)
             self.logger.info(f"📥 加载了 {len(failed_accounts)} 个失败账户")
@@ -76,22 +89,27 @@ class FailedCodeRetriever:
     def get_invitation_code(self, email: str) -> str:
         """获取单个邀请码"""
         try:
-            # 获取token
-            auth_url = "https://auth-station-dev-staging.aevatar.ai/api/auth/email/login"
-            auth_data = {
-                "email": email,
-                "password": self.password,
-                "recaptcha_token": ""
-            }
-            
-            response = self.session.post(auth_url, json=auth_data, timeout=30)
-            response.raise_for_status()
-            
-            auth_result = response.json()
-            if not auth_result.get('success'):
-                return None
-            
-            token = auth_result['data']['access_token']
+            # 获取token（优先使用缓存）
+            token = self.token_cache.get(email) if self.token_cache else None
+            if not token:
+                auth_url = "https://auth-station-dev-staging.aevatar.ai/api/auth/email/login"
+                auth_data = {
+                    "email": email,
+                    "password": self.password,
+                    "recaptcha_token": ""
+                }
+                
+                issued_at = time.time()
+                response = self.session.post(auth_url, json=auth_data, timeout=30)
+                response.raise_for_status()
+                
+                auth_result = response.json()
+                if not auth_result.get('success'):
+                    return None
+                
+                token = auth_result['data']['access_token']
+                if self.token_cache:
+                    self.token_cache.put(email, token, auth_result['data'].get('expires_in'), issued_at)
             
             # 获取邀请码
             invitation_url = "https://auth-station-dev-staging.aevatar.ai/api/invitation/generate"
@@ -129,7 +147,8 @@ class FailedCodeRetriever:
                     success_rate = len(self.invitation_codes) / completed * 100 if completed > 0 else 0
                     elapsed = time.time() - self.start_time
                     speed = completed / elapsed if elapsed > 0 else 0
-                    self.logger.info(f"📊 重试进度: {completed}/398 ({completed/398*100:.1f}%), 成功率: {success_rate:.1f}%, 速度: {speed:.2f}账户/秒")
+                    self.logger.info(f"📊 重试进度: {completed}/{self.total} ({completed/self.total*100:.1f}%), "
+                                     f"成功率: {success_rate:.1f}%, 速度: {speed:.2f}账户/秒")
     
     def run_retry(self):
         """运行重试获取"""
@@ -141,6 +160,7 @@ class FailedCodeRetriever:
         if not failed_accounts:
             self.logger.error("❌ 没有找到失败的账户")
             return
+        self.total = len(failed_accounts)
         
         # 分配任务给线程
         chunk_size = len(failed_accounts) // self.workers + 1
@@ -159,6 +179,10 @@ class FailedCodeRetriever:
         
         # 保存结果
         self.save_results()
+        
+        if self.token_cache:
+            self.token_cache.close()
+            self.logger.info(f"🔐 Token缓存: 命中 {self.token_cache.hits} 个, 重新登录 {self.token_cache.misses} 个")
     
     def save_results(self):
         """保存结果"""
@@ -208,13 +232,17 @@ def main():
     parser.add_argument('--failed-file', required=True, help='失败账户文件路径')
     parser.add_argument('--workers', type=int, default=30, help='并发线程数')
     parser.add_argument('--password', default='Password123', help='账户密码')
+    parser.add_argument('--token-cache', default=TOKEN_CACHE_PATH,
+                        help='token缓存文件路径（/api/auth/email/login签发的token，不要与 /connect/token 的缓存共用）')
+    parser.add_argument('--no-token-cache', action='store_true', help='禁用token缓存，每个账户都重新登录')
     
     args = parser.parse_args()
     
     retriever = FailedCodeRetriever(
         failed_file=args.failed_file,
         workers=args.workers,
-        password=args.password
+        password=args.password,
+        token_cache=None if args.no_token_cache else TokenCache(args.token_cache)
     )
     
     retriever.run_retry()
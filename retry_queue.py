@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+瞬时失败的延迟重试队列
+fetcher把超时、连接断开、5xx（含Cloudflare 524）、429 等瞬时失败的账户放回延迟队列，
+按指数退避加随机抖动的时间重新执行，同一次运行内补齐覆盖率，不再需要跑 retry_failed_codes.py；
+400（密码错误）、401、响应缺字段等确定性失败直接记为失败，不浪费重试
+"""
+
+import asyncio
+import heapq
+import random
+import sys
+import threading
+import time
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+import requests
+
+# 视为瞬时失败的HTTP状态码（另外所有5xx均视为瞬时）
+TRANSIENT_STATUS = {408, 429}
+# 视为瞬时失败的异常类别
+TRANSIENT_ERRORS = {'timeout', 'connection'}
+# 队列暂无到期任务时的最长等待间隔（秒），期间可能有在途任务失败并加入新的重试
+POLL_INTERVAL = 0.05
+
+# 失败类别: HTTP状态码，或 classify_exception 返回的异常类别，或 invalid_response / no_code 等确定性失败
+Failure = Union[int, str]
+
+
+def classify_exception(error: BaseException) -> str:
+    """把requests/aiohttp/httpx抛出的异常归类为 timeout / connection / error"""
+    if isinstance(error, (requests.exceptions.Timeout, asyncio.TimeoutError)):
+        return 'timeout'
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                          ConnectionError)):
+        return 'connection'
+    # aiohttp只在async引擎下才会导入
+    aiohttp = sys.modules.get('aiohttp')
+    if aiohttp and isinstance(error, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)):
+        return 'connection'
+    # httpx只在--http2模式下才会导入；TimeoutException（含连接池等待超时）是TransportError的子类，先判断
+    httpx = sys.modules.get('httpx')
+    if httpx and isinstance(error, httpx.TimeoutException):
+        return 'timeout'
+    if httpx and isinstance(error, httpx.TransportError):
+        return 'connection'
+    return 'error'
+
+
+def describe_failure(failure: Optional[Failure]) -> str:
+    """失败类别的可读描述"""
+    return f"HTTP {failure}" if isinstance(failure, int) else str(failure)
+
+
+def is_transient(failure: Optional[Failure]) -> bool:
+    """判断失败是否值得重试"""
+    if isinstance(failure, int):
+        return failure >= 500 or failure in TRANSIENT_STATUS
+    return failure in TRANSIENT_ERRORS
+
+
+class RetryPolicy:
+    """重试次数上限与退避时间"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 1.0, max_delay: float = 30.0):
+        # 包含首次请求在内的最大尝试次数，1表示不重试
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        """第attempt次尝试失败后的等待时间：指数退避，一半固定一半随机抖动，避免大量账户同时重试"""
+        backoff = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return backoff / 2 + random.uniform(0, backoff / 2)
+
+    def should_retry(self, failure: Optional[Failure], attempt: int) -> bool:
+        return attempt < self.max_attempts and is_transient(failure)
+
+
+class RetryScheduler:
+    """把首次任务与到期的重试任务合并成一个 (index, attempt) 任务流（线程安全）
+
+    每个取出的任务最后必须调用一次 task_done，或在 task_done 之前调用 retry 放回队列；
+    首次任务取完后，只有重试队列为空且没有在途任务时任务流才结束
+    """
+
+    def __init__(self, indices: Iterable[int], policy: RetryPolicy):
+        self.indices = iter(indices)
+        self.policy = policy
+        self.lock = threading.Lock()
+        # 最小堆: (到期时间, 序号, index, attempt)
+        self.delayed: List[Tuple[float, int, int, int]] = []
+        self.sequence = 0
+        self.in_flight = 0
+        self.exhausted = False
+
+    def next_task(self) -> Tuple[Optional[Tuple[int, int]], Optional[float]]:
+        """非阻塞地取下一个任务，返回 (任务, None)；暂无可执行任务时返回 (None, 建议等待秒数)；全部完成返回 (None, None)"""
+        with self.lock:
+            now = time.monotonic()
+            # 到期的重试优先于新账户，避免重试一直排在队尾
+            if self.delayed and self.delayed[0][0] <= now:
+                _, _, index, attempt = heapq.heappop(self.delayed)
+                self.in_flight += 1
+                return (index, attempt), None
+            if not self.exhausted:
+                index = next(self.indices, None)
+                if index is not None:
+                    self.in_flight += 1
+                    return (index, 1), None
+                self.exhausted = True
+            if self.delayed:
+                return None, min(self.delayed[0][0] - now, POLL_INTERVAL)
+            if self.in_flight:
+                return None, POLL_INTERVAL
+            return None, None
+
+    def tasks(self) -> Iterator[Tuple[int, int]]:
+        """阻塞式任务流（线程引擎、流水线调度线程使用）"""
+        while True:
+            task, wait = self.next_task()
+            if task:
+                yield task
+            elif wait is None:
+                return
+            else:
+                time.sleep(wait)
+
+    def retry(self, index: int, attempt: int) -> float:
+        """把第attempt次失败的任务放回队列，返回等待秒数（调用方随后仍需调用task_done）"""
+        delay = self.policy.delay(attempt)
+        with self.lock:
+            self.sequence += 1
+            heapq.heappush(self.delayed, (time.monotonic() + delay, self.sequence, index, attempt + 1))
+        return delay
+
+    def task_done(self):
+        with self.lock:
+            self.in_flight -= 1
@@ -155,7 +155,7 @@ export default function () {
   const startTime = Date.now();
   
   // 构造token获取请求
-  const tokenUrl = `${config.baseUrl}/connect/token`;
+  const tokenUrl = __ENV.AUTH_URL || `${config.baseUrl}/connect/token`;
   
   // 为每个请求获取唯一邮箱
   const currentEmail = getNextEmail();
@@ -41,6 +41,10 @@ const chatSuccessCounter = new Counter('chat_success_total');            // 只
 
 // 从配置文件加载环境配置和测试数据
 const config = JSON.parse(open('../../../config/env.dev.json'));
+// BASE_URL 可指向本地 mock_server.py
+if (__ENV.BASE_URL) {
+  config.baseUrl = __ENV.BASE_URL;
+}
 const testData = JSON.parse(open('../../../config/test-data.json'));
 
 // 获取目标QPS参数，默认值为30
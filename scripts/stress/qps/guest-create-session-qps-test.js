@@ -14,6 +14,10 @@ const apiCallDuration = new Trend('api_call_duration');
 
 // 从配置文件加载环境配置
 const config = JSON.parse(open('../../../config/env.dev.json'));
+// BASE_URL 可指向本地 mock_server.py
+if (__ENV.BASE_URL) {
+  config.baseUrl = __ENV.BASE_URL;
+}
 
 // 获取目标QPS参数，默认值为30（较有挑战性的合理起点）
 const TARGET_QPS = __ENV.TARGET_QPS ? parseInt(__ENV.TARGET_QPS) : 30;
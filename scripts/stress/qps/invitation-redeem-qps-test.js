@@ -1,30 +1,36 @@
 import http from 'k6/http';
 import { check } from 'k6';
-import { Rate, Trend } from 'k6/metrics';
+import { Counter, Rate, Trend } from 'k6/metrics';
 import { SharedArray } from 'k6/data';
+import exec from 'k6/execution';
 import { getAccessToken, setupTest, teardownTest } from '../../utils/auth.js';
+import { isCodePool, parseCodePool, readPoolHeader } from '../../utils/code-pool.js';
 
 // 邀请码兑换QPS压力测试脚本使用说明：
 // 默认目标QPS: 1 QPS（每秒1个请求，持续5分钟）
 // 自定义目标QPS: k6 run -e TARGET_QPS=5 invitation-redeem-qps-test.js
 // 自定义邀请码文件: k6 run -e INVITE_CODES_FILE=../data/my_invite_codes.json invitation-redeem-qps-test.js
+// 定宽邀请码池: python3 export_code_pool.py 导出后默认加载 ../data/loadtest_invite_codes.pool（也可通过INVITE_CODES_FILE指定）
+// 推荐每次运行前分配切片: python3 code_ledger.py allocate --qps 10 --duration 600
+//   k6 run -e TARGET_QPS=10 -e INVITE_CODES_FILE=/绝对路径/results/code_slice_xxx.pool invitation-redeem-qps-test.js
 // 完整示例: k6 run -e TARGET_QPS=10 -e INVITE_CODES_FILE=../data/loadtest_invite_codes.json invitation-redeem-qps-test.js
 // 
 // 📋 邀请码数据来源：
-// 1. 默认使用: scripts/stress/data/loadtest_invite_codes.json (包含约29000个邀请码)
-// 2. 或运行: python3 get_invitation_codes.py --start 1 --count 1000 生成新的邀请码
-// 3. 支持数组格式 ["code1", "code2"] 或对象格式 {"user1@email.com": "code1"}
+// 1. 默认使用: scripts/stress/data/loadtest_invite_codes.pool，不存在时回退到 loadtest_invite_codes.json (包含约29000个邀请码)
+// 2. 或运行: python3 get_invitation_codes.py --start 1 --count 1000 生成新的邀请码，再用 export_code_pool.py 导出
+// 3. 支持定宽邀请码池、数组格式 ["code1", "code2"] 或对象格式 {"user1@email.com": "code1"}
 // 
 // ⚠️  压测注意事项：
 // - 如果出现大量超时(>30s)，说明服务器压力过大，建议降低QPS
 // - 推荐从低QPS开始测试：1 → 3 → 5 → 10，逐步提升
 // - 监控服务器CPU、内存使用率，避免影响生产环境
-// - 新算法确保每个请求使用不同邀请码，避免重复使用导致错误
+// - 邀请码按VU切成连续区间，每个VU顺序取自己区间内的下一个，同一次运行内不会重复；
+//   切片文件由台账分配，与之前的运行也不重复。区间用完的VU不再发送请求（计入invitation_code_exhausted）
 
 // 自定义性能指标
 const invitationRedeemSuccessRate = new Rate('invitation_redeem_success_rate');  // 邀请码兑换成功率
 const invitationRedeemDuration = new Trend('invitation_redeem_duration');        // 邀请码兑换响应时间
-const invitationCodeUniqueness = new Rate('invitation_code_uniqueness_rate');    // 邀请码唯一性指标
+const invitationCodeExhausted = new Counter('invitation_code_exhausted');        // 因VU区间用完而跳过的迭代数
 
 // 从配置文件加载环境配置和测试数据
 const config = JSON.parse(open('../../../config/env.dev.json'));
@@ -38,13 +44,32 @@ try {
   console.log('⚠️  未找到tokens.json配置文件，将使用环境变量或默认token');
 }
 
+// 优先从环境变量指定的文件加载，默认使用data目录下的定宽邀请码池，没有时回退到JSON数组
+function openInviteCodesFile() {
+  if (__ENV.INVITE_CODES_FILE) {
+    return { inviteCodesFile: __ENV.INVITE_CODES_FILE, content: open(__ENV.INVITE_CODES_FILE) };
+  }
+  try {
+    return { inviteCodesFile: '../data/loadtest_invite_codes.pool', content: open('../data/loadtest_invite_codes.pool') };
+  } catch (error) {
+    return { inviteCodesFile: '../data/loadtest_invite_codes.json', content: open('../data/loadtest_invite_codes.json') };
+  }
+}
+
 // 使用SharedArray确保所有VU共享相同的邀请码数据
 const invitationCodes = new SharedArray('invitationCodes', function () {
   try {
-    // 优先从环境变量指定的文件加载，默认使用data目录下的邀请码文件
-    const inviteCodesFile = __ENV.INVITE_CODES_FILE || '../data/loadtest_invite_codes.json';
-    const rawData = JSON.parse(open(inviteCodesFile));
+    const { inviteCodesFile, content } = openInviteCodesFile();
+    
+    // 定宽邀请码池：无需JSON解析，按宽度直接切分
+    if (isCodePool(content)) {
+      const codes = parseCodePool(content);
+      console.log(`✅ 从邀请码池 ${inviteCodesFile} 加载 ${codes.length} 个邀请码`);
+      console.log(`📋 Debug: 前5个邀请码示例: ${codes.slice(0, 5).join(', ')}`);
+      return codes;
+    }
     
+    const rawData = JSON.parse(content);
     let codes = [];
     // 如果是数组格式，直接使用
     if (Array.isArray(rawData)) {
@@ -67,11 +92,28 @@ const invitationCodes = new SharedArray('invitationCodes', function () {
   }
 });
 
+// 台账分配的切片在头部记录了预先切分的VU数（普通邀请码文件为0）
+const codePoolInfo = new SharedArray('invitationCodePoolInfo', function () {
+  try {
+    const { content } = openInviteCodesFile();
+    return [isCodePool(content) ? readPoolHeader(content).vus : 0];
+  } catch (error) {
+    return [0];
+  }
+});
+const SLICE_VUS = codePoolInfo[0];
+
 // 获取目标QPS参数，默认值为1（降低以避免服务器超时）
 const TARGET_QPS = __ENV.TARGET_QPS ? parseInt(__ENV.TARGET_QPS) : 1;
 
-// Debug: 记录已使用的邀请码，用于验证唯一性（每个VU维护自己的记录）
-let usedInviteCodes = new Set();
+// VU数：加载切片时与切片一致并全部预分配（到达率执行器轮流复用VU，各区间消耗均匀）
+const MAX_VUS = SLICE_VUS || Math.min(Math.max(TARGET_QPS * 4, 6), 100);
+const PRE_ALLOCATED_VUS = SLICE_VUS || Math.min(Math.max(TARGET_QPS * 2, 3), 50);
+// 每个VU独占的连续区间长度
+const CODES_PER_VU = Math.floor(invitationCodes.length / MAX_VUS);
+
+// 当前VU在自己区间内的下一个位置
+let vuCursor = 0;
 let requestCounter = 0;
 
 // 生成随机UUID的函数 - 用于userId参数
@@ -84,93 +126,36 @@ function generateRandomUUID() {
   });
 }
 
-// VU内请求计数器，用于生成更可靠的唯一索引
-let vuRequestCounter = 0;
-
-// 全局请求计数器，确保跨VU的唯一性
-let globalRequestId = 0;
-
-// 当前使用的邀请码信息缓存
-let currentInviteInfo = null;
-
-// 获取下一个不同的邀请码
-// 使用改进的分布式算法确保高QPS场景下每个请求使用不同的邀请码
+// 获取下一个邀请码：第v个VU只使用区间 [(v-1)*CODES_PER_VU, v*CODES_PER_VU)，O(1)且不会与其他VU冲突
+// 区间用完时返回null，本次迭代不发送请求
 function getNextInviteCode() {
-  if (invitationCodes.length === 0) {
+  const vuId = exec.vu.idInTest;
+  if (CODES_PER_VU === 0) {
+    // 邀请码少于VU数（例如回退到默认邀请码），只能循环使用
     return {
-      inviteCode: 'uSTbNld',
+      inviteCode: invitationCodes.length ? invitationCodes[exec.scenario.iterationInTest % invitationCodes.length] : 'uSTbNld',
       userId: generateRandomUUID()
     };
   }
-  
-  // 改进的分布式算法确保高QPS场景下的唯一性
-  const vuId = __VU || 1;              // 当前VU的ID
-  const iterNum = __ITER || 0;         // 当前VU的迭代次数
-  const timestamp = Date.now();        // 完整时间戳
-  vuRequestCounter++;                  // VU内请求序号
-  globalRequestId++;                   // 全局请求ID，确保跨VU唯一性
-  
-  // 高QPS分布式算法优化：
-  // 1. 基于VU和全局请求ID的组合索引
-  // 2. 使用质数避免周期性重复
-  // 3. 动态步长确保更好的分布
-  // 4. 防冲突机制
-  
-  // 计算VU基础步长，使用质数确保更好的分布
-  const VU_STEP_SIZE = 293;  // 使用质数作为步长
-  const vuBaseIndex = (vuId - 1) * VU_STEP_SIZE;
-  
-  // 基于全局请求ID和VU内计数的复合索引
-  const globalOffset = globalRequestId * 17;  // 使用质数17作为全局步长
-  const vuOffset = vuRequestCounter * 7;      // 使用质数7作为VU内步长
-  const timeOffset = (timestamp % 1009) * 3;  // 使用质数1009和3避免时间冲突
-  
-  // 组合唯一索引，使用大质数分布
-  let uniqueIndex = (vuBaseIndex + globalOffset + vuOffset + timeOffset) % invitationCodes.length;
-  
-  // 防冲突检查：如果在当前VU内已使用过此索引，则递增查找下一个可用的
-  const originalIndex = uniqueIndex;
-  let attempts = 0;
-  while (usedInviteCodes.has(invitationCodes[uniqueIndex]) && attempts < 100) {
-    uniqueIndex = (uniqueIndex + 1) % invitationCodes.length;
-    attempts++;
+  if (vuId > MAX_VUS || vuCursor >= CODES_PER_VU) {
+    return null;
   }
   
-  const inviteCode = invitationCodes[uniqueIndex];
-  
-  // Debug: 验证邀请码唯一性（在当前VU范围内）
+  const index = (vuId - 1) * CODES_PER_VU + vuCursor;
+  vuCursor++;
   requestCounter++;
-  const isCodeReusedInVU = usedInviteCodes.has(inviteCode);
-  
-  if (!isCodeReusedInVU) {
-    usedInviteCodes.add(inviteCode);
-  }
+  const inviteCode = invitationCodes[index];
   
-  // 生成随机userId用于兑换
-  const userId = generateRandomUUID();
-  
-  // Debug 详细日志（高QPS模式下简化日志）
-  const isHighQPS = __ENV.TARGET_QPS && parseInt(__ENV.TARGET_QPS) > 10;
+  // Debug 日志（高QPS模式下简化日志）
+  const isHighQPS = TARGET_QPS > 10;
   if (!isHighQPS || requestCounter % 10 === 1) {  // 高QPS时只显示部分日志
-    console.log(`🔄 [VU${vuId}-请求${requestCounter}] 兑换邀请码: ${inviteCode} (索引: ${uniqueIndex})`);
-    console.log(`   📊 算法详情: VU基础=${vuBaseIndex}, 全局偏移=${globalOffset}, VU偏移=${vuOffset}, 时间偏移=${timeOffset}`);
-    console.log(`   🔍 VU内唯一性: ${isCodeReusedInVU ? '❌ VU内重复' : '✅ VU内首次'}, VU内已用=${usedInviteCodes.size}`);
-    console.log(`   📦 原始索引=${originalIndex}, 最终索引=${uniqueIndex}, 查找次数=${attempts}, 邀请码池=${invitationCodes.length}`);
-  }
-  
-  // 如果检测到VU内重复使用，记录警告
-  if (isCodeReusedInVU) {
-    console.log(`⚠️  警告: VU${vuId}内邀请码 ${inviteCode} 被重复使用! 索引=${uniqueIndex}, 查找了${attempts}次`);
+    console.log(`🔄 [VU${vuId}-请求${requestCounter}] 兑换邀请码: ${inviteCode} (索引: ${index}, VU区间剩余: ${CODES_PER_VU - vuCursor})`);
   }
   
-  // 缓存当前邀请码信息供后续验证使用
-  currentInviteInfo = {
-    inviteCode: inviteCode,  // 每次使用不同的邀请码
-    userId: userId,         // 随机生成的用户ID
-    isUniqueInVU: !isCodeReusedInVU
+  return {
+    inviteCode: inviteCode,         // 每次使用不同的邀请码
+    userId: generateRandomUUID()    // 随机生成的用户ID
   };
-  
-  return currentInviteInfo;
 }
 
 // 固定QPS压力测试场景配置
@@ -184,8 +169,8 @@ export const options = {
       duration: '10m',               // 测试持续时间：10分钟
       // 🎯 QPS超稳定配置：基于实际响应时间动态调整VU分配
       // 实际测试显示平均响应时间仅38ms，大幅降低VU需求
-      preAllocatedVUs: Math.min(Math.max(TARGET_QPS * 2, 3), 50),   // 2倍预分配，38ms响应时间下足够
-      maxVUs: Math.min(Math.max(TARGET_QPS * 4, 6), 100),          // 4倍最大值，应对偶发延迟波动
+      preAllocatedVUs: PRE_ALLOCATED_VUS,   // 2倍预分配，38ms响应时间下足够（切片模式为切片VU数）
+      maxVUs: MAX_VUS,                      // 4倍最大值，应对偶发延迟波动（切片模式为切片VU数）
       tags: { test_type: 'fixed_qps_invitation_redeem' },
     },
   },
@@ -208,6 +193,11 @@ export default function (data) {
   
   // 获取下一个不同的邀请码用于兑换
   const inviteInfo = getNextInviteCode();
+  if (!inviteInfo) {
+    // 本VU的区间已用完：不再发送注定失败的重复兑换请求
+    invitationCodeExhausted.add(1);
+    return;
+  }
   
   // 构造邀请码兑换请求
   const invitationRedeemUrl = `${data.baseUrl}/godgpt/invitation/redeem`;
@@ -262,11 +252,6 @@ export default function (data) {
   // 记录邀请码兑换指标 - 直接使用检查结果
   invitationRedeemSuccessRate.add(isInvitationRedeemSuccess);
   
-  // 记录邀请码唯一性指标（在VU内是否首次使用）
-  if (currentInviteInfo) {
-    invitationCodeUniqueness.add(currentInviteInfo.isUniqueInVU);
-  }
-  
   // 只有成功的请求才记录到响应时间指标中
   if (isInvitationRedeemSuccess) {
     invitationRedeemDuration.add(invitationRedeemResponse.timings.duration);
@@ -278,22 +263,15 @@ export function setup() {
   console.log(`🚀 Debug: 开始邀请码兑换QPS测试`);
   console.log(`📊 Debug: 目标QPS=${TARGET_QPS}, 邀请码池大小=${invitationCodes.length}`);
   
-  // 高QPS支持能力分析 - 基于新的分布式算法
-  const VU_STEP_SIZE = 293;  // 与算法中一致的VU步长
-  const maxSupportedVUs = Math.floor(invitationCodes.length / VU_STEP_SIZE);  // 每个VU分配的理论空间
-  const estimatedVUs = Math.max(TARGET_QPS, Math.ceil(TARGET_QPS / 5));  // 估算需要的VU数
-  
-  console.log(`🔧 算法支持能力: 使用质数分布，最大支持${maxSupportedVUs}个VU, 当前估算需要${estimatedVUs}个VU`);
-  
-  if (estimatedVUs > maxSupportedVUs) {
-    console.log(`⚠️  警告: 当前QPS可能超出算法最优范围，建议QPS不超过${maxSupportedVUs * 5}`);
-  } else {
-    console.log(`✅ QPS范围适合: 新的分布式算法可以很好支持${TARGET_QPS} QPS`);
+  // 容量分析：每个VU独占一段连续区间
+  console.log(`🔧 邀请码分配: ${MAX_VUS}个VU × 每VU ${CODES_PER_VU}个${SLICE_VUS ? '（台账切片）' : ''}`);
+  if (!SLICE_VUS) {
+    console.log(`💡 未使用台账切片，可能与之前的运行重复使用邀请码，建议先运行: python3 code_ledger.py allocate --qps ${TARGET_QPS}`);
   }
   
-  // 理论运行时间计算（考虑防冲突机制）
-  const theoreticalRuntime = Math.floor(invitationCodes.length * 0.8 / TARGET_QPS);  // 80%利用率
-  console.log(`🔧 Debug: 预期能运行约 ${theoreticalRuntime} 秒不重复邀请码（考虑80%利用率）`);
+  // 理论运行时间计算（各VU区间同时用完的理想情况）
+  const theoreticalRuntime = Math.floor(CODES_PER_VU * MAX_VUS / TARGET_QPS);
+  console.log(`🔧 Debug: 预期能运行约 ${theoreticalRuntime} 秒不重复邀请码`);
   
   if (TARGET_QPS > 10) {
     console.log(`💡 高QPS模式: 日志已简化，仅显示每10个请求中的1个详细信息`);
@@ -1,11 +1,39 @@
 import http from 'k6/http';
 
+// token缓存剩余有效期不足该秒数时视为过期（与token_cache.py的EXPIRY_MARGIN一致）
+const TOKEN_EXPIRY_MARGIN = 300;
+
+// 本地token缓存（由 python3 token_cache.py export-k6 导出），只能在init阶段读取
+// 格式: {"email": {"access_token": "...", "expires_at": 1700000000}}
+let tokenCacheEntries = {};
+if (__ENV.TOKEN_CACHE_FILE) {
+  try {
+    tokenCacheEntries = JSON.parse(open(__ENV.TOKEN_CACHE_FILE));
+  } catch (error) {
+    console.log(`⚠️  无法读取token缓存文件 ${__ENV.TOKEN_CACHE_FILE}: ${error.message}`);
+  }
+}
+
+/**
+ * 从本地token缓存中查找仍然有效的token
+ * @param {string} username - 账户邮箱
+ * @returns {string|null} 有效token，未命中或即将过期返回null
+ */
+export function getCachedToken(username) {
+  const entry = tokenCacheEntries[username];
+  if (entry && entry.expires_at - TOKEN_EXPIRY_MARGIN > Date.now() / 1000) {
+    return entry.access_token;
+  }
+  return null;
+}
+
 /**
  * 动态获取Bearer Token的函数 (使用password模式认证)
- * 优先级：环境变量BEARER_TOKEN > 动态获取(使用用户名密码) > 配置文件回退
+ * 优先级：环境变量BEARER_TOKEN > 本地token缓存 > 动态获取(使用用户名密码) > 配置文件回退
  * 
  * 环境变量说明：
  * - BEARER_TOKEN: 直接指定token，跳过动态获取
+ * - TOKEN_CACHE_FILE: token缓存文件（python3 token_cache.py export-k6 导出，建议使用绝对路径）
  * - AUTH_USERNAME: 认证用户名 (默认: loadtestloadwh1@teml.net)
  * - AUTH_PASSWORD: 认证密码 (默认: Wh520520!)
  * 
@@ -19,14 +47,21 @@ export function getAccessToken(tokenConfig = {}) {
     return __ENV.BEARER_TOKEN;
   }
 
-  console.log('🔄 正在动态获取Bearer Token...');
-  
   // 从环境变量获取用户名和密码，或使用默认值
   const username = __ENV.AUTH_USERNAME || 'loadtestloadwh1@teml.net';
   const password = __ENV.AUTH_PASSWORD || 'Wh520520!';
+
+  // 本地缓存中有未过期的token时不再请求authserver
+  const cachedToken = getCachedToken(username);
+  if (cachedToken) {
+    console.log(`🔐 使用本地缓存的Bearer Token: ${username}`);
+    return cachedToken;
+  }
+
+  console.log('🔄 正在动态获取Bearer Token...');
   
   // 动态获取token - 使用password模式
-  const tokenResponse = http.post('https://auth-station-dev-staging.aevatar.ai/connect/token', {
+  const tokenResponse = http.post(__ENV.AUTH_URL || 'https://auth-station-dev-staging.aevatar.ai/connect/token', {
     'grant_type': 'password',
     'client_id': 'AevatarAuthServer',
     'apple_app_id': 'com.gpt.god',
@@ -68,9 +103,11 @@ export function getAccessToken(tokenConfig = {}) {
  */
 export function setupTest(config, tokenConfig, testName, targetQps, apiEndpoint, additionalInfo = '') {
   const startTime = new Date().toLocaleString('zh-CN', { timeZone: 'Asia/Shanghai' });
+  // BASE_URL 可指向本地 mock_server.py
+  const baseUrl = __ENV.BASE_URL || config.baseUrl;
   console.log(`🎯 开始 ${testName} 固定QPS压力测试...`);
   console.log(`🕐 测试开始时间: ${startTime}`);
-  console.log(`📡 测试目标: ${config.baseUrl}${apiEndpoint}`);
+  console.log(`📡 测试目标: ${baseUrl}${apiEndpoint}`);
   console.log(`🔧 测试场景: 固定QPS测试 (${targetQps} QPS，持续5分钟)`);
   console.log(`⚡ 目标QPS: ${targetQps} (可通过 TARGET_QPS 环境变量配置)`);
   console.log(`🔄 预估总请求数: ${targetQps * 300} 个 (${targetQps} QPS × 300秒)`);
@@ -92,7 +129,7 @@ export function setupTest(config, tokenConfig, testName, targetQps, apiEndpoint,
   }
   
   return { 
-    baseUrl: config.baseUrl,
+    baseUrl: baseUrl,
     bearerToken: bearerToken
   };
 }
@@ -0,0 +1,77 @@
+// 定宽邀请码池解析（由 python3 export_code_pool.py 导出）
+// 文件格式: 第一行 "LTPOOL1 count=N width=W crc32=xxxxxxxx"，第二行为N个W位邀请码首尾相连
+// 在SharedArray的回调里调用：文件只读取、校验、切分一次，所有VU共享同一份数据
+
+// 头部: 数量、宽度、CRC32，运行切片额外带 vus=N
+const POOL_HEADER = /^LTPOOL1 count=(\d+) width=(\d+) crc32=([0-9a-f]{8})(?: vus=(\d+))?$/;
+
+let crcTable = null;
+
+function crc32(text) {
+  if (!crcTable) {
+    crcTable = new Array(256);
+    for (let n = 0; n < 256; n++) {
+      let c = n;
+      for (let k = 0; k < 8; k++) {
+        c = c & 1 ? 0xedb88320 ^ (c >>> 1) : c >>> 1;
+      }
+      crcTable[n] = c >>> 0;
+    }
+  }
+  let crc = 0xffffffff;
+  for (let i = 0; i < text.length; i++) {
+    crc = crcTable[(crc ^ text.charCodeAt(i)) & 0xff] ^ (crc >>> 8);
+  }
+  return (crc ^ 0xffffffff) >>> 0;
+}
+
+/**
+ * 判断文件内容是否为定宽邀请码池
+ * @param {string} text - open() 读取的文件内容
+ * @returns {boolean}
+ */
+export function isCodePool(text) {
+  return text.startsWith('LTPOOL1 ');
+}
+
+/**
+ * 解析并校验定宽邀请码池
+ * @param {string} text - open() 读取的文件内容
+ * @returns {string[]} 邀请码数组（按导出顺序）
+ */
+export function parseCodePool(text) {
+  const newline = text.indexOf('\n');
+  const match = POOL_HEADER.exec(newline >= 0 ? text.substring(0, newline) : text);
+  if (!match) {
+    throw new Error('不是邀请码池文件（缺少LTPOOL1头部）');
+  }
+  const count = parseInt(match[1]);
+  const width = parseInt(match[2]);
+  const body = newline >= 0 ? text.substring(newline + 1) : '';
+  if (body.length !== count * width) {
+    throw new Error(`邀请码池长度不符: 头部 ${count}x${width}, 实际 ${body.length} 字符`);
+  }
+  if (crc32(body) !== parseInt(match[3], 16)) {
+    throw new Error('邀请码池CRC32校验失败');
+  }
+
+  const codes = new Array(count);
+  for (let i = 0; i < count; i++) {
+    codes[i] = body.substring(i * width, (i + 1) * width);
+  }
+  return codes;
+}
+
+/**
+ * 读取邀请码池头部
+ * @param {string} text - open() 读取的文件内容
+ * @returns {{count: number, width: number, vus: number}} vus为预先切分的VU数（code_ledger.py 分配的切片），普通池为0
+ */
+export function readPoolHeader(text) {
+  const newline = text.indexOf('\n');
+  const match = POOL_HEADER.exec(newline >= 0 ? text.substring(0, newline) : text);
+  if (!match) {
+    throw new Error('不是邀请码池文件（缺少LTPOOL1头部）');
+  }
+  return { count: parseInt(match[1]), width: parseInt(match[2]), vus: match[4] ? parseInt(match[4]) : 0 };
+}
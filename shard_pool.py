@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程池分片执行器
+长驻的worker进程直接导入InvitationCodeFetcher，在整个运行期间复用同一个fetcher（连接池、TLS连接、token缓存），
+按索引区间领取任务，并通过队列把结果流式回传父进程。
+取代"每个批次启动一个新解释器"的做法：省去解释器启动、导入、连接池重建和每批单独的日志/结果文件
+"""
+
+import logging
+import multiprocessing as mp
+import os
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import metrics
+from account_registry import AccountRegistry
+from adaptive_limiter import AIMDLimiter
+from checkpoint import CheckpointJournal
+from code_store import CodeStore
+from failure_report import FailureReport
+from get_invitation_codes import Config, InvitationCodeFetcher, build_rate_limits, describe_warmup
+from latency_histogram import LatencyRecorder
+from log_pipeline import setup_queue_logging
+from progress_shm import ProgressBoard
+from result_sink import ResultSink
+from token_cache import TokenCache
+
+# 每累计多少条结果向父进程发送一次
+RESULT_CHUNK_SIZE = 50
+
+# worker进程内的全局状态（由初始化函数创建，进程存活期间一直复用）
+_fetcher: Optional[InvitationCodeFetcher] = None
+_result_queue = None
+_resume = False
+_buffer: List[Tuple[str, Optional[str], Optional[dict]]] = []
+
+
+def _flush_buffer():
+    """把缓冲的结果发送给父进程"""
+    global _buffer
+    with _fetcher.lock:
+        chunk, _buffer = _buffer, []
+    if chunk:
+        _result_queue.put(('results', os.getpid(), chunk))
+
+
+def _on_result(email: str, invitation_code: Optional[str], failure: Optional[dict]):
+    with _fetcher.lock:
+        _buffer.append((email, invitation_code, failure))
+        should_flush = len(_buffer) >= RESULT_CHUNK_SIZE
+    if should_flush:
+        _flush_buffer()
+
+
+def _init_worker(prefix: str, workers: int, password: str, urls: Tuple[str, str], token_cache_path: Optional[str],
+                 checkpoint: bool, result_sink: bool, code_store_path: Optional[str], adaptive_max: int,
+                 qps_budget: Tuple[float, float], resume: bool, metrics_port: Optional[int], metrics_host: str,
+                 progress_name: Optional[str], skip_unregistered: bool, http2: bool, warmup: bool, slot_counter,
+                 result_queue):
+    """worker进程初始化：创建整个进程生命周期内复用的fetcher"""
+    global _fetcher, _result_queue, _resume
+    # 接口地址由父进程显式传入：spawn启动的worker会重新导入模块，Config里只有默认的staging地址
+    Config.AUTH_URL, Config.INVITATION_CODE_URL = urls
+    os.makedirs("results", exist_ok=True)
+    # 后台线程写日志；worker退出时由multiprocessing的退出钩子把队列写完
+    setup_queue_logging([logging.FileHandler(f"results/shard_worker_{prefix}_{os.getpid()}.log", encoding='utf-8')])
+    if metrics_port:
+        # 每个worker从同一个起始端口往后找空闲端口，各自提供本进程的指标
+        metrics.start_metrics_server(metrics_port, metrics_host)
+
+    token_cache = TokenCache(token_cache_path) if token_cache_path else None
+    # 自适应模式下workers作为起始并发，每个进程在分到的上限内各自收敛（adaptive_max为0表示固定并发）
+    limiter = AIMDLimiter(workers, min_limit=Config.ADAPTIVE_MIN_INFLIGHT,
+                          max_limit=adaptive_max) if adaptive_max else None
+    progress = None
+    if progress_name:
+        # 每个worker进程领取一个独占槽位，之后只有本进程写它
+        with slot_counter.get_lock():
+            slot_index = slot_counter.value
+            slot_counter.value += 1
+        progress = ProgressBoard.attach(progress_name).slot(slot_index)
+
+    # 起止索引由每个任务单独指定，这里只是占位
+    # 令牌桶按名字跨进程共享，所有worker合计不超过预算
+    _fetcher = InvitationCodeFetcher(prefix, 0, -1, workers, password, token_cache=token_cache, limiter=limiter,
+                                     rate_limits=build_rate_limits(*qps_budget),
+                                     journal=CheckpointJournal(CheckpointJournal.default_path(prefix))
+                                     if checkpoint else None,
+                                     sink=ResultSink(ResultSink.default_path(prefix)) if result_sink else None,
+                                     progress=progress,
+                                     store=CodeStore(code_store_path) if code_store_path else None,
+                                     registry=AccountRegistry(prefix) if skip_unregistered else None,
+                                     http2=http2)
+    _fetcher.result_callback = _on_result
+    _result_queue = result_queue
+    _resume = resume
+    if warmup:
+        # 每个worker进程只预热一次，之后领取的所有分片都在热连接池上执行
+        _result_queue.put(('warmup', os.getpid(), _fetcher.warm_up(workers)))
+
+
+def _fetch_shard(task: Tuple[int, int, int]):
+    """处理一个索引区间；无论成败最后都发送一条done消息"""
+    shard_id, start_idx, end_idx = task
+    error = None
+    try:
+        if _resume:
+            _fetcher.restore_checkpoint(start_idx, end_idx)
+        _fetcher.fetch_range(start_idx, end_idx)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        logging.error(f"💥 分片 {shard_id} 异常: {error}")
+    _flush_buffer()
+    for output in (_fetcher.journal, _fetcher.sink, _fetcher.store, _fetcher.token_cache):
+        if output:
+            output.flush()
+    _reset_shard_results()
+    if _fetcher.limiter:
+        logging.info(f"🎚️ 分片 {shard_id} 结束时自适应并发上限: {_fetcher.limiter.summary()}")
+    # 本分片的延迟直方图增量，由父进程合并
+    _result_queue.put(('latency', os.getpid(), _fetcher.latency.drain()))
+    # 同一进程的队列消息按顺序到达，done一定排在该分片所有结果之后
+    _result_queue.put(('done', os.getpid(), (shard_id, start_idx, end_idx, error)))
+
+
+def _reset_shard_results():
+    """清空fetcher上本分片的结果：结果已经流式回传父进程，常驻worker的内存不随处理过的分片数增长"""
+    with _fetcher.lock:
+        _fetcher.invitation_codes.clear()
+        _fetcher.failed_accounts.clear()
+        _fetcher.resumed_indices.clear()
+    _fetcher.failures = FailureReport()
+
+
+def split_ranges(start_index: int, end_index: int, shard_size: int) -> List[Tuple[int, int, int]]:
+    """把索引范围切成 (shard_id, start, end) 分片"""
+    shards = []
+    for shard_id, shard_start in enumerate(range(start_index, end_index + 1, shard_size), 1):
+        shards.append((shard_id, shard_start, min(shard_start + shard_size - 1, end_index)))
+    return shards
+
+
+def run_sharded(prefix: str, shards: List[Tuple[int, int, int]], processes: int, workers: int,
+                password: str = Config.DEFAULT_PASSWORD,
+                auth_url: Optional[str] = None,
+                invitation_url: Optional[str] = None,
+                token_cache_path: Optional[str] = TokenCache.DEFAULT_PATH,
+                checkpoint: bool = False,
+                result_sink: bool = False,
+                code_store_path: Optional[str] = CodeStore.DEFAULT_PATH,
+                adaptive: bool = False,
+                auth_qps: float = Config.DEFAULT_AUTH_QPS,
+                api_qps: float = Config.DEFAULT_API_QPS,
+                resume: bool = False,
+                metrics_port: Optional[int] = None,
+                metrics_host: str = metrics.DEFAULT_HOST,
+                progress_name: Optional[str] = None,
+                skip_unregistered: bool = False,
+                http2: bool = False,
+                warmup: bool = False,
+                latency: Optional[LatencyRecorder] = None,
+                failures: Optional[FailureReport] = None,
+                on_shard_done: Optional[Callable[..., None]] = None
+                ) -> Tuple[Dict[str, str], List[str]]:
+    """用长驻进程池处理全部分片，返回 (邀请码映射, 失败账户列表)
+    auth_url / invitation_url 默认取父进程当前的 Config 地址，显式传给worker（不依赖fork继承）；
+    结果默认只写入 code_store_path 指向的结果索引库（为None时不写），checkpoint / result_sink 额外开启断点日志和增量结果文件；
+    resume 从结果索引库（不写结果索引库时从断点日志）读取已成功的账户；
+    传入latency时把各worker的延迟直方图合并进去，传入failures时收集各worker的失败记录；
+    progress_name指向的进度块至少要有processes个槽位（每个worker进程独占一个，不够时worker初始化失败）
+    """
+    invitation_codes: Dict[str, str] = {}
+    failed_accounts: List[str] = []
+
+    if resume and not code_store_path and not checkpoint:
+        raise ValueError("resume 需要结果索引库或断点日志")
+    if resume and shards:
+        # 父进程先装入已成功的结果，worker按分片跳过这些索引（与worker的 restore_checkpoint 读同一个来源）
+        if code_store_path:
+            store = CodeStore(code_store_path)
+            restored = store.successes(prefix, shards[0][1], shards[-1][2])
+            store.close()
+        else:
+            restored = CheckpointJournal.load_successes(CheckpointJournal.default_path(prefix),
+                                                        shards[0][1], shards[-1][2])
+        invitation_codes.update(restored.values())
+        print(f"♻️ 断点恢复: {len(restored)} 个账户已成功，本次跳过")
+
+    # 自适应并发上限是所有进程合计的，按进程数平分（不低于起始并发）
+    adaptive_max = max(workers, Config.ADAPTIVE_MAX_INFLIGHT // processes) if adaptive else 0
+    urls = (auth_url or Config.AUTH_URL, invitation_url or Config.INVITATION_CODE_URL)
+    result_queue = mp.Queue()
+    # 不用mp.Pool：mp.Pool会重建异常退出的worker，被杀进程手上的分片永远不会完成，
+    # 初始化失败时还会不停重建同样失败的worker；ProcessPoolExecutor在worker进程意外退出
+    # （段错误、OOM被杀、初始化异常）时把所有未完成的任务以BrokenProcessPool结束
+    executor = ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                   initargs=(prefix, workers, password, urls, token_cache_path, checkpoint,
+                                             result_sink, code_store_path, adaptive_max,
+                                             (auth_qps, api_qps), resume, metrics_port, metrics_host, progress_name,
+                                             skip_unregistered, http2, warmup, mp.Value('i', 0), result_queue))
+    try:
+        futures = [executor.submit(_fetch_shard, shard) for shard in shards]
+
+        finished = 0
+        while finished < len(shards):
+            try:
+                kind, pid, payload = result_queue.get(timeout=1)
+            except queue.Empty:
+                # 分片在_fetch_shard内的异常会作为done消息回传，future带异常结束只可能是进程池已损坏，立即抛出
+                for future in futures:
+                    if future.done() and future.exception():
+                        future.result()
+                continue
+
+            if kind == 'results':
+                for email, invitation_code, _ in payload:
+                    if invitation_code:
+                        invitation_codes[email] = invitation_code
+                    else:
+                        failed_accounts.append(email)
+                if failures is not None:
+                    failures.extend(failure for _, _, failure in payload if failure)
+            elif kind == 'latency':
+                if latency:
+                    latency.merge_dict(payload)
+            elif kind == 'warmup':
+                print(f"🔥 worker {pid} 预热: {describe_warmup(payload)}")
+            elif kind == 'done':
+                finished += 1
+                if on_shard_done:
+                    on_shard_done(*payload, len(invitation_codes), len(failed_accounts))
+
+        for future in futures:
+            future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    return invitation_codes, failed_accounts
+
+
+def print_shard_progress(total_shards: int, start_time: float) -> Callable[..., None]:
+    """返回一个打印分片完成进度的回调（turbo/stable脚本共用）"""
+    state = {'finished': 0}
+
+    def on_shard_done(shard_id: int, start_idx: int, end_idx: int, error: Optional[str],
+                      success_count: int, failed_count: int):
+        state['finished'] += 1
+        elapsed = time.time() - start_time
+        if error:
+            print(f"❌ 分片 {shard_id} ({start_idx}-{end_idx}) 异常: {error}")
+        else:
+            print(f"✅ 分片 {shard_id} ({start_idx}-{end_idx}) 完成")
+        eta_minutes = (total_shards - state['finished']) * elapsed / state['finished'] / 60
+        print(f"📊 进度: {state['finished']}/{total_shards} 分片完成, "
+              f"已获取 {success_count} 个邀请码, 失败 {failed_count} 个 "
+              f"(预计剩余: {eta_minutes:.1f}分钟)")
+
+    return on_shard_done
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+有界流式任务提交
+从生成器中惰性取出任务提交给线程池，任何时刻最多保留 workers × k 个未完成的future，
+完成一个补一个；已完成的future产出后即被释放，内存占用与账户范围大小无关
+"""
+
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from typing import Callable, Iterable, Iterator, Union
+
+# 每个工作线程对应的最大待处理任务数
+PENDING_PER_WORKER = 4
+
+
+def submit_bounded(executor: Executor, fn: Callable, items: Iterable,
+                   max_pending: Union[int, Callable[[], int]]) -> Iterator[Future]:
+    """按完成顺序产出future，未完成的future不超过max_pending个
+    max_pending也可以是函数，每次提交前重新取值（自适应并发时跟随限制器的当前上限）
+    """
+    limit = max_pending if callable(max_pending) else lambda: max_pending
+    pending = set()
+    for item in items:
+        while len(pending) >= max(1, limit()):
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from done
+        pending.add(executor.submit(fn, item))
+
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        yield from done
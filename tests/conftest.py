@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""各模块都是仓库根目录下的独立脚本，测试时把根目录加入导入路径；
+mock_server fixture 在后台线程里启动 mock_server.py 的模拟服务，fetcher的集成测试不访问外网
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mock_server as mock  # noqa: E402
+
+
+class RunningMock:
+    """一个在后台事件循环上运行的模拟服务"""
+
+    def __init__(self, **overrides):
+        options = dict(latency=['all=const:1'], fault=None, capacity=None, queue_timeout=100.0, hang_seconds=5.0,
+                       password=mock.DEFAULT_PASSWORD, token_ttl=3600, unregistered_ratio=0.0, chat_chunks=2,
+                       chat_interval=1.0, backlog=1024)
+        options.update(overrides)
+        self.state = mock.MockState(argparse.Namespace(**options))
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='mock-server', daemon=True)
+        self.thread.start()
+        sock = mock.make_socket('127.0.0.1', 0, reuse_port=False)
+        self.port = sock.getsockname()[1]
+        self.server = asyncio.run_coroutine_threadsafe(self._start(sock), self.loop).result(5)
+        self.auth_url = f"http://127.0.0.1:{self.port}/connect/token"
+        self.invitation_url = f"http://127.0.0.1:{self.port}/godgptpressure-client/api/godgpt/invitation/info"
+
+    async def _start(self, sock):
+        return await asyncio.start_server(lambda r, w: mock.handle_connection(self.state, r, w), sock=sock)
+
+    def requests(self, endpoint: str) -> int:
+        """某个接口收到的请求总数"""
+        return sum(self.state.requests[endpoint].values())
+
+    async def _shutdown(self):
+        """停止监听并取消仍挂在keep-alive连接上的处理协程，避免事件循环关闭后才被回收"""
+        self.server.close()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+
+
+@pytest.fixture
+def mock_server(monkeypatch, tmp_path):
+    """返回 start(**模拟服务参数)；fetcher的两个接口地址指向启动的模拟服务，结果文件写到临时目录"""
+    from get_invitation_codes import Config
+
+    monkeypatch.chdir(tmp_path)
+    servers = []
+
+    def start(**overrides) -> RunningMock:
+        server = RunningMock(**overrides)
+        servers.append(server)
+        monkeypatch.setattr(Config, 'AUTH_URL', server.auth_url)
+        monkeypatch.setattr(Config, 'INVITATION_CODE_URL', server.invitation_url)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
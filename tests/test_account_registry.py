@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""account_registry: 2位状态位图的读写、扩容、有效期和落盘"""
+
+import json
+
+import pytest
+
+from account_registry import REGISTERED, UNKNOWN, UNREGISTERED, AccountRegistry
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return AccountRegistry('lt', str(tmp_path))
+
+
+def test_neighbouring_indices_do_not_clobber_each_other(registry):
+    # 同一字节里的4个索引各占2位
+    states = [REGISTERED, UNREGISTERED, UNKNOWN, UNREGISTERED, REGISTERED]
+    for index, state in enumerate(states, 4):
+        registry.set(index, state, day=100)
+    assert [registry.state(index) for index in range(4, 9)] == states
+    registry.set(5, REGISTERED, day=100)
+    assert [registry.state(index) for index in range(4, 9)] == [REGISTERED, REGISTERED, UNKNOWN, UNREGISTERED,
+                                                                REGISTERED]
+
+
+def test_unset_and_out_of_range_indices_are_unknown(registry):
+    assert registry.state(10) == UNKNOWN
+    assert registry.state(-1) == UNKNOWN
+    registry.set(10, REGISTERED, day=100)
+    assert registry.state(10_000_000) == UNKNOWN
+    assert registry.checked_day(10_000_000) == 0
+
+
+def test_grows_in_4096_blocks_and_keeps_existing_entries(registry):
+    registry.set(3, UNREGISTERED, day=100)
+    assert registry.capacity == 4096
+    registry.set(10_000, REGISTERED, day=101)
+    assert registry.capacity == 12288
+    assert registry.state(3) == UNREGISTERED
+    assert registry.checked_day(3) == 100
+    assert registry.state(10_000) == REGISTERED
+
+
+def test_needs_check_uses_max_age(registry):
+    registry.set(1, REGISTERED, day=100)
+    registry.set(2, UNREGISTERED, day=90)
+    assert not registry.needs_check(1, max_age_days=7, now_day=107)
+    assert registry.needs_check(1, max_age_days=7, now_day=108)
+    assert registry.needs_check(2, max_age_days=7, now_day=100)
+    assert registry.needs_check(3, max_age_days=7, now_day=100)
+
+
+def test_counts_and_indices(registry):
+    for index in (1, 3, 5):
+        registry.set(index, REGISTERED)
+    registry.set(4, UNREGISTERED)
+    assert registry.counts(1, 6) == {'unknown': 2, 'registered': 3, 'unregistered': 1}
+    assert list(registry.indices(REGISTERED, 1, 6)) == [1, 3, 5]
+    assert list(registry.stale_indices(1, 6)) == [2, 6]
+
+
+def test_save_and_reload(registry, tmp_path):
+    registry.set(7, UNREGISTERED, day=200)
+    registry.set(5000, REGISTERED, day=201)
+    registry.save()
+    assert not list(tmp_path.glob('*.tmp'))
+
+    reloaded = AccountRegistry('lt', str(tmp_path))
+    assert reloaded.capacity == registry.capacity
+    assert reloaded.state(7) == UNREGISTERED
+    assert reloaded.checked_day(7) == 200
+    assert reloaded.state(5000) == REGISTERED
+    assert reloaded.checked_day(5000) == 201
+
+
+def test_rejects_foreign_file(tmp_path):
+    (tmp_path / 'lt.bin').write_bytes(b'NOTAREG!' + bytes(8))
+    with pytest.raises(ValueError):
+        AccountRegistry('lt', str(tmp_path))
+
+
+def test_import_verification_results(registry, tmp_path):
+    path = tmp_path / 'lt_verification_complete_20250808_143022.json'
+    path.write_text(json.dumps({'registered': ['lt1@test.com', 'lt2@test.com'],
+                                'unregistered': ['lt3@test.com', 'other9@test.com']}))
+    assert registry.import_results(str(path)) == 3
+    assert [registry.state(index) for index in (1, 2, 3, 9)] == [REGISTERED, REGISTERED, UNREGISTERED, UNKNOWN]
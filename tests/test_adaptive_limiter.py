@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""adaptive_limiter: AIMD上限的加性增长、乘性收缩、冷却、按端点的延迟基线与阻塞语义"""
+
+import asyncio
+import threading
+
+import pytest
+
+from adaptive_limiter import AIMDLimiter, is_overload_status
+
+
+def feed(limiter: AIMDLimiter, latencies, overloaded=False, endpoint='default'):
+    for latency in latencies:
+        limiter.acquire()
+        limiter.release(latency, overloaded, endpoint)
+
+
+@pytest.mark.parametrize("status, expected", [(500, True), (524, True), (429, True), (400, False), (200, False)])
+def test_is_overload_status(status, expected):
+    assert is_overload_status(status) is expected
+
+
+def test_initial_limit_is_clamped():
+    assert AIMDLimiter(1, min_limit=4, max_limit=10).limit == 4
+    assert AIMDLimiter(50, min_limit=4, max_limit=10).limit == 10
+    assert AIMDLimiter(5, min_limit=8, max_limit=2).max_limit == 8
+
+
+def test_healthy_window_adds_one_up_to_max():
+    limiter = AIMDLimiter(10, max_limit=12, latency_target=0.1, window=10)
+    feed(limiter, [0.05] * 10)
+    assert limiter.limit == 11
+    feed(limiter, [0.05] * 30)
+    assert limiter.limit == 12
+    assert limiter.peak_limit == 12
+
+
+def test_overload_halves_once_per_cooldown():
+    limiter = AIMDLimiter(40, min_limit=4, window=10)
+    # 同一波并发失败只收缩一次
+    feed(limiter, [0.2] * 3, overloaded=True)
+    assert limiter.limit == 20
+    limiter.cooldown_until = 0
+    feed(limiter, [0.2], overloaded=True)
+    assert limiter.limit == 10
+    assert limiter.lowest_limit == 10
+
+
+def test_limit_never_drops_below_min():
+    limiter = AIMDLimiter(5, min_limit=4)
+    for _ in range(5):
+        limiter.cooldown_until = 0
+        feed(limiter, [0.1], overloaded=True)
+    assert limiter.limit == 4
+
+
+def test_slow_p95_shrinks_limit():
+    limiter = AIMDLimiter(40, latency_target=0.1, window=20)
+    feed(limiter, [0.05] * 10 + [0.5] * 10)
+    assert limiter.limit == 20
+
+
+def test_errors_during_cooldown_count_towards_window_error_rate():
+    limiter = AIMDLimiter(40, latency_target=1.0, window=20, max_error_rate=0.02)
+    # 冷却期内的过载样本不再立即收缩，只计入窗口错误数
+    limiter.cooldown_until = float('inf')
+    feed(limiter, [0.05] * 2, overloaded=True)
+    assert limiter.limit == 40
+    limiter.cooldown_until = 0
+    feed(limiter, [0.05] * 18)
+    # 窗口错误率 10% 超过 2%，即使延迟达标也收缩
+    assert limiter.limit == 20
+
+
+def test_mixed_latency_endpoints_keep_separate_baselines():
+    limiter = AIMDLimiter(32, min_limit=4, max_limit=500, window=20)
+    # token缓存命中阶段：只有快的invitation/info，基线压到10ms
+    for _ in range(5):
+        feed(limiter, [0.010] * 20, endpoint='invitation')
+    # 之后混入慢的/connect/token，两者都按各自的基线判断，都是健康的
+    for _ in range(10):
+        feed(limiter, [0.120] * 20, endpoint='auth')
+        feed(limiter, [0.010] * 20, endpoint='invitation')
+    assert limiter.limit == 32 + 5 + 20
+    assert limiter.lowest_limit == 32
+    assert limiter.best_p95 == {'invitation': 0.010, 'auth': 0.120}
+
+
+def test_baseline_drifts_up_after_lasting_latency_shift():
+    limiter = AIMDLimiter(40, min_limit=4, window=10)
+    feed(limiter, [0.010] * 10)
+    # 延迟持续升到5倍：先判为不健康收缩，基线随后逐步回升，上限不会一直卡在下限
+    for _ in range(60):
+        limiter.cooldown_until = 0
+        feed(limiter, [0.050] * 10)
+    assert limiter.best_p95['default'] > 0.025
+    assert limiter.limit > limiter.min_limit
+
+
+def test_cooldown_keeps_recent_window_samples():
+    limiter = AIMDLimiter(40, latency_target=0.1, window=10)
+    limiter.cooldown_until = float('inf')
+    feed(limiter, [0.5] * 25)
+    # 冷却期内不健康的窗口不收缩也不清空，只保留最近window个样本
+    assert limiter.limit == 40
+    assert len(limiter.samples['default']) == 10
+    limiter.cooldown_until = 0
+    feed(limiter, [0.5])
+    assert limiter.limit == 20
+    assert limiter.samples['default'] == []
+
+
+def test_acquire_blocks_at_limit_until_release():
+    limiter = AIMDLimiter(4, min_limit=4, max_limit=4)
+    for _ in range(4):
+        limiter.acquire()
+    acquired = threading.Event()
+    thread = threading.Thread(target=lambda: (limiter.acquire(), acquired.set()))
+    thread.start()
+    assert not acquired.wait(0.1)
+    limiter.release(0.01, False)
+    assert acquired.wait(2)
+    thread.join()
+    assert limiter.inflight == 4
+
+
+def test_async_acquire_and_release():
+    limiter = AIMDLimiter(4, min_limit=4, max_limit=4, latency_target=0.1, window=4)
+
+    async def request():
+        await limiter.async_acquire()
+        await asyncio.sleep(0.01)
+        await limiter.async_release(0.01, False)
+
+    async def main():
+        await asyncio.gather(*(request() for _ in range(8)))
+
+    asyncio.run(main())
+    assert limiter.inflight == 0
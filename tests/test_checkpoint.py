@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""checkpoint: 断点日志的缓冲追加、后台落盘与 --resume 读取"""
+
+import threading
+import time
+
+from checkpoint import AppendLog, CheckpointJournal
+
+
+def test_append_is_buffered_until_flush(tmp_path):
+    path = tmp_path / 'log.jsonl'
+    log = AppendLog(str(path), flush_every=1000)
+    log.append('one')
+    log.append('two')
+    assert path.read_text() == ''
+    log.flush()
+    assert path.read_text() == 'one\ntwo\n'
+    log.close()
+
+
+def test_full_batch_is_written_by_background_writer(tmp_path):
+    path = tmp_path / 'log.jsonl'
+    log = AppendLog(str(path), flush_every=3)
+    for line in ('a', 'b', 'c'):
+        log.append(line)
+    deadline = time.time() + 5
+    while path.read_text() != 'a\nb\nc\n' and time.time() < deadline:
+        time.sleep(0.01)
+    assert path.read_text() == 'a\nb\nc\n'
+    log.close()
+
+
+def test_concurrent_appends_keep_every_line_whole(tmp_path):
+    path = tmp_path / 'log.jsonl'
+    logs = [AppendLog(str(path), flush_every=7) for _ in range(2)]
+
+    def writer(log, worker):
+        for i in range(500):
+            log.append(f"{worker}-{i}")
+
+    threads = [threading.Thread(target=writer, args=(logs[worker % 2], worker)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for log in logs:
+        log.close()
+    lines = path.read_text().splitlines()
+    assert sorted(lines) == sorted(f"{worker}-{i}" for worker in range(4) for i in range(500))
+
+
+def test_load_successes_filters_range_failures_and_torn_lines(tmp_path):
+    path = str(tmp_path / 'lt_checkpoint.jsonl')
+    journal = CheckpointJournal(path)
+    journal.record(1, 'lt1@test.com', 'AAAAAAA')
+    journal.record(2, 'lt2@test.com', None)
+    journal.record(3, 'lt3@test.com', 'CCCCCCC')
+    journal.record(9, 'lt9@test.com', 'IIIIIII')
+    # 失败后重跑成功，以成功记录为准
+    journal.record(2, 'lt2@test.com', 'BBBBBBB')
+    journal.close()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"i": 4, "e": "lt4@test.com", "c": "DDD')
+
+    assert CheckpointJournal.load_successes(path, 1, 5) == {
+        1: ('lt1@test.com', 'AAAAAAA'),
+        2: ('lt2@test.com', 'BBBBBBB'),
+        3: ('lt3@test.com', 'CCCCCCC'),
+    }
+    assert CheckpointJournal.load_successes(str(tmp_path / 'missing.jsonl'), 1, 5) == {}
+
+
+def test_default_path():
+    assert CheckpointJournal.default_path('loadtestc') == 'results/loadtestc_checkpoint.jsonl'
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""code_ledger: 切片分配互不重叠、按VU整除、归还与剩余数量"""
+
+import pytest
+
+from code_ledger import CodeLedger, default_vus, estimate_count
+from export_code_pool import pool_codes, read_pool, write_pool
+
+CODES = [f"C{i:06d}" for i in range(100)]
+
+
+@pytest.fixture
+def pool(tmp_path):
+    path = tmp_path / 'codes.pool'
+    write_pool(CODES, str(path))
+    return str(path)
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = CodeLedger(str(tmp_path / 'ledger.db'))
+    yield ledger
+    ledger.close()
+
+
+def test_allocate_writes_vu_sliced_pool(ledger, pool, tmp_path):
+    slice_path = str(tmp_path / 'run1.pool')
+    assert ledger.allocate(pool, 30, 4, slice_path, 'run1') == (28, 7)
+    header, body = read_pool(slice_path)
+    assert header['vus'] == 4
+    assert pool_codes(header, body) == CODES[:28]
+    assert ledger.remaining(pool) == 72
+
+
+def test_consecutive_runs_never_share_codes(ledger, pool, tmp_path):
+    ledger.allocate(pool, 40, 5, str(tmp_path / 'run1.pool'), 'run1')
+    ledger.allocate(pool, 40, 5, str(tmp_path / 'run2.pool'), 'run2')
+    first = pool_codes(*read_pool(str(tmp_path / 'run1.pool')))
+    second = pool_codes(*read_pool(str(tmp_path / 'run2.pool')))
+    assert not set(first) & set(second)
+    assert second == CODES[40:80]
+    assert [run['run_id'] for run in ledger.runs()] == ['run1', 'run2']
+
+
+def test_short_pool_is_split_evenly_across_vus(ledger, pool, tmp_path):
+    ledger.allocate(pool, 90, 10, str(tmp_path / 'run1.pool'), 'run1')
+    # 只剩10个，请求30个按3个VU均分
+    assert ledger.allocate(pool, 30, 3, str(tmp_path / 'run2.pool'), 'run2') == (9, 3)
+    # 剩1个，不够每个VU一个
+    assert ledger.allocate(pool, 30, 3, str(tmp_path / 'run3.pool'), 'run3') == (0, 0)
+    assert [run['run_id'] for run in ledger.runs()] == ['run1', 'run2']
+
+
+def test_release_returns_codes_to_the_pool(ledger, pool, tmp_path):
+    ledger.allocate(pool, 50, 5, str(tmp_path / 'run1.pool'), 'run1')
+    assert ledger.release('run1') == 50
+    assert ledger.remaining(pool) == 100
+    assert ledger.runs() == []
+    ledger.allocate(pool, 10, 5, str(tmp_path / 'run2.pool'), 'run2')
+    assert pool_codes(*read_pool(str(tmp_path / 'run2.pool'))) == CODES[:10]
+
+
+def test_ledger_persists_across_instances(pool, tmp_path):
+    path = str(tmp_path / 'ledger.db')
+    first = CodeLedger(path)
+    first.allocate(pool, 20, 2, str(tmp_path / 'run1.pool'), 'run1')
+    first.close()
+    second = CodeLedger(path)
+    assert second.remaining(pool) == 80
+    second.close()
+
+
+def test_count_estimates():
+    assert estimate_count(10, 600) == 6600
+    assert default_vus(None) == 100
+    assert default_vus(1) == 6
+    assert default_vus(10) == 40
+    assert default_vus(50) == 100
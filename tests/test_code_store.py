@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""code_store: 账户结果upsert规则、范围查询、覆盖率与旧文件导入"""
+
+import json
+import time
+
+import pytest
+
+from code_store import CodeStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CodeStore(str(tmp_path / 'store.db'))
+    yield store
+    store.close()
+
+
+def test_success_is_not_overwritten_by_later_failure(store):
+    store.add('lt', 1, 'lt1@test.com', 'AAAAAAA')
+    store.add('lt', 1, 'lt1@test.com', None, 'token_timeout')
+    store.add('lt', 2, 'lt2@test.com', None, 'token_timeout')
+    store.add('lt', 2, 'lt2@test.com', 'BBBBBBB')
+    assert store.codes('lt', 1, 2) == {'lt1@test.com': 'AAAAAAA', 'lt2@test.com': 'BBBBBBB'}
+
+
+def test_codes_are_ordered_and_filtered_by_prefix_range_and_time(store):
+    for index in (5, 3, 4):
+        store.add('lt', index, f"lt{index}@test.com", f"CODE00{index}")
+    store.add('other', 3, 'other3@test.com', 'OTHER03')
+    assert list(store.codes('lt', 1, 4)) == ['lt3@test.com', 'lt4@test.com']
+    assert store.codes('lt', 1, 10, since=time.time() + 60) == {}
+
+
+
+def test_successes_for_resume(store):
+    store.add('lt', 1, 'lt1@test.com', 'AAAAAAA')
+    store.add('lt', 2, 'lt2@test.com', None, 'http_401')
+    store.add('lt', 9, 'lt9@test.com', 'IIIIIII')
+    store.add('other', 1, 'other1@test.com', 'OTHER01')
+    assert store.successes('lt', 1, 5) == {1: ('lt1@test.com', 'AAAAAAA')}
+
+def test_coverage_counts_failures_by_reason(store):
+    store.add('lt', 2, 'lt2@test.com', 'BBBBBBB')
+    store.add('lt', 4, 'lt4@test.com', 'DDDDDDD')
+    store.add('lt', 5, 'lt5@test.com', None, 'invitation_http_5xx')
+    store.add('lt', 6, 'lt6@test.com', None, 'invitation_http_5xx')
+    store.add('lt', 7, 'lt7@test.com', None)
+    assert store.coverage('lt', 1, 10) == {
+        'total': 10, 'success': 2, 'failed': 3, 'missing': 5,
+        'reasons': {'invitation_http_5xx': 2, 'unknown': 1},
+        'min_index': 2, 'max_index': 4,
+    }
+
+
+def test_progress_and_stats(store):
+    since = time.time() - 1
+    store.add('lt', 1, 'lt1@test.com', 'AAAAAAA')
+    store.add('lt', 2, 'lt2@test.com', None, 'token_timeout')
+    assert store.progress('lt', since) == {'attempted': 2, 'succeeded': 1}
+    assert store.stats() == {'lt': {'total': 2, 'success': 1, 'min_index': 1, 'max_index': 2}}
+
+
+def test_results_are_visible_to_another_connection_after_flush(store, tmp_path):
+    store.add('lt', 1, 'lt1@test.com', 'AAAAAAA')
+    store.flush()
+    reader = CodeStore(str(tmp_path / 'store.db'))
+    assert reader.codes('lt', 1, 1) == {'lt1@test.com': 'AAAAAAA'}
+    reader.close()
+
+
+def test_import_legacy_json(store, tmp_path):
+    path = tmp_path / 'lt_invitation_codes_20250808_143022.json'
+    path.write_text(json.dumps({'lt7@test.com': 'GGGGGGG', 'lt8@test.com': '', 'x9@test.com': 'XXXXXXX'}))
+    assert store.import_json(str(path), 'lt') == 1
+    assert store.codes('lt', 1, 10) == {'lt7@test.com': 'GGGGGGG'}
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""export_code_pool: LTPOOL1 定宽邀请码池的写入、读取与校验"""
+
+import pytest
+
+from export_code_pool import pool_codes, read_pool, write_pool
+
+CODES = ['uSTbNld', 'A1b2C3d', 'zzzzzzz', '0000000']
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / 'codes.pool'
+    count, skipped = write_pool(CODES, str(path))
+    assert (count, skipped) == (4, [])
+
+    header, body = read_pool(str(path))
+    assert header['count'] == 4
+    assert header['width'] == 7
+    assert header['vus'] == 0
+    assert pool_codes(header, body) == CODES
+    # 头部一行，正文是首尾相连的定宽邀请码，没有分隔符
+    assert path.read_bytes().split(b"\n", 1)[1] == "".join(CODES).encode('ascii')
+
+
+def test_vus_recorded_in_header(tmp_path):
+    path = tmp_path / 'slice.pool'
+    write_pool(CODES, str(path), vus=2)
+    assert path.read_text().startswith('LTPOOL1 count=4 width=7 crc32=')
+    assert read_pool(str(path))[0]['vus'] == 2
+
+
+def test_codes_of_wrong_width_or_non_ascii_are_skipped(tmp_path):
+    path = tmp_path / 'codes.pool'
+    count, skipped = write_pool(CODES + ['short', 'toolong12', 'ab邀请码cde'], str(path))
+    assert count == 4
+    assert skipped == ['short', 'toolong12', 'ab邀请码cde']
+    assert pool_codes(*read_pool(str(path))) == CODES
+
+
+def test_corrupted_body_fails_crc(tmp_path):
+    path = tmp_path / 'codes.pool'
+    write_pool(CODES, str(path))
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0x01
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match='CRC32'):
+        read_pool(str(path))
+
+
+def test_truncated_body_fails_length_check(tmp_path):
+    path = tmp_path / 'codes.pool'
+    write_pool(CODES, str(path))
+    path.write_bytes(path.read_bytes()[:-3])
+    with pytest.raises(ValueError, match='长度不符'):
+        read_pool(str(path))
+
+
+def test_non_pool_file_is_rejected(tmp_path):
+    path = tmp_path / 'codes.json'
+    path.write_text('["uSTbNld"]\n')
+    with pytest.raises(ValueError, match='不是邀请码池文件'):
+        read_pool(str(path))
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""failure_report: 原因代码、记录字段、汇总表、JSONL读写与索引区间压缩"""
+
+from failure_report import FailureReport, index_ranges, load_failures, reason_code, summarize
+
+
+def test_reason_code():
+    assert reason_code('token', 400) == 'token_http_400'
+    assert reason_code('invitation', 'timeout') == 'invitation_timeout'
+    assert reason_code('invitation', 'no_code') == 'invitation_no_code'
+    assert reason_code('token', None) == 'token_unknown'
+
+
+def test_add_splits_status_and_error():
+    report = FailureReport()
+    http = report.add(3, 'lt3@test.com', 'invitation', 524, 1.23456, 3)
+    timeout = report.add(1, 'lt1@test.com', 'token', 'timeout', None, 1)
+    assert (http['status'], http['error'], http['latency_ms']) == (524, None, 1234.6)
+    assert (timeout['status'], timeout['error'], timeout['latency_ms']) == (None, 'timeout', None)
+    assert len(report) == 2
+
+
+def test_summary_sorted_by_count():
+    report = FailureReport()
+    report.add(1, 'lt1@test.com', 'token', 'timeout', 10.0, 3)
+    report.add(2, 'lt2@test.com', 'invitation', 524, 0.1, 2)
+    report.add(3, 'lt3@test.com', 'invitation', 524, 0.3, 2)
+    lines = report.summary_lines()
+    assert len(lines) == 3
+    assert lines[1].split() == ['invitation_http_524', '2', '66.7%', '200ms', '300ms', '2.0']
+    assert lines[2].split() == ['token_timeout', '1', '33.3%', '10000ms', '10000ms', '3.0']
+    assert summarize([]) == []
+
+
+def test_save_and_load_keeps_last_record_per_account(tmp_path):
+    first, second = FailureReport(), FailureReport()
+    first.add(2, 'lt2@test.com', 'token', 'timeout', None, 3)
+    first.add(1, 'lt1@test.com', 'token', 401, 0.05, 1)
+    second.add(2, 'lt2@test.com', 'invitation', 'no_code', 0.02, 1)
+    first.save(str(tmp_path / 'first.jsonl'))
+    second.save(str(tmp_path / 'second.jsonl'))
+
+    # 按索引顺序写出
+    assert [line.count('"index": 1') for line in (tmp_path / 'first.jsonl').read_text().splitlines()] == [1, 0]
+    records = load_failures([str(tmp_path / 'first.jsonl'), str(tmp_path / 'second.jsonl')])
+    assert {record['email']: record['reason'] for record in records} == {
+        'lt1@test.com': 'token_http_401',
+        'lt2@test.com': 'invitation_no_code',
+    }
+
+
+def test_index_ranges():
+    assert index_ranges([5, 1, 2, 3, 7, 8, 10]) == ['1-3', '5', '7-8', '10']
+    assert index_ranges([]) == []
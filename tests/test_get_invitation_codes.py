@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""get_invitation_codes: 线程/async引擎与两阶段流水线对模拟服务的端到端获取、refresh_token回退、吊销token作废、失败重试、连接预热"""
+
+import asyncio
+import importlib.util
+import logging
+import time
+
+import pytest
+
+from get_invitation_codes import Config, InvitationCodeFetcher
+from mock_server import invite_code_for
+from retry_queue import RetryPolicy
+from token_cache import TokenCache
+
+
+def make_fetcher(count: int, workers: int = 8, **kwargs) -> InvitationCodeFetcher:
+    kwargs.setdefault('log_sample', 0)
+    return InvitationCodeFetcher('lt', 1, count, workers, Config.DEFAULT_PASSWORD, **kwargs)
+
+
+def expected_codes(fetcher: InvitationCodeFetcher, count: int):
+    return {fetcher.generate_email(index): invite_code_for(fetcher.generate_email(index))
+            for index in range(1, count + 1)}
+
+
+def test_thread_engine_fetches_every_code(mock_server):
+    server = mock_server()
+    fetcher = make_fetcher(60)
+    fetcher.fetch_range(1, 60)
+    assert fetcher.invitation_codes == expected_codes(fetcher, 60)
+    assert fetcher.failed_accounts == []
+    assert server.requests('token') == 60
+    assert server.requests('info') == 60
+
+
+
+def test_summary_goes_through_logger(mock_server, tmp_path, capsys, caplog):
+    mock_server()
+    (tmp_path / 'results').mkdir(exist_ok=True)
+    fetcher = make_fetcher(5)
+    fetcher.fetch_range(1, 5)
+    with caplog.at_level(logging.INFO):
+        fetcher.save_results()
+    # 总结和其余日志走同一个队列，不会与后台线程写出的记录交错
+    assert capsys.readouterr().out == ''
+    messages = [record.getMessage() for record in caplog.records]
+    assert messages.index("🎯 获取总结:") < messages.index("   ✅ 成功获取: 5 个")
+
+def test_async_engine_matches_thread_engine(mock_server):
+    server = mock_server()
+    fetcher = make_fetcher(60, max_inflight=16)
+    asyncio.run(fetcher._run_fetch_async())
+    assert fetcher.invitation_codes == expected_codes(fetcher, 60)
+    assert fetcher.failed_accounts == []
+    assert server.requests('info') == 60
+
+
+def test_async_engine_without_aiohttp_exits_with_install_hint(monkeypatch):
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, 'find_spec', lambda name: None if name == 'aiohttp' else find_spec(name))
+    with pytest.raises(SystemExit, match="pip install aiohttp"):
+        make_fetcher(5).run_fetch_async()
+
+
+def expired_cache(tmp_path, emails, refresh_token):
+    """每个账户一个已过期的access_token，refresh_token由调用方指定"""
+    cache = TokenCache(str(tmp_path / 'tokens.db'))
+    for email in emails:
+        cache.put(email, f"mock.{email}.0", 3600, time.time() - 7200, refresh_token(email))
+    return cache
+
+
+def test_expired_tokens_are_refreshed_without_password_login(mock_server, tmp_path):
+    server = mock_server()
+    emails = [f"lt{index}@teml.net" for index in range(1, 21)]
+    cache = expired_cache(tmp_path, emails, lambda email: f"mockrefresh.{email}")
+    fetcher = make_fetcher(20, token_cache=cache)
+    fetcher.fetch_range(1, 20)
+    assert len(fetcher.invitation_codes) == 20
+    assert fetcher.auth_counts == {'refresh_token': 20}
+    assert server.requests('token') == 20
+    cache.close()
+
+
+def test_rejected_refresh_token_falls_back_to_password(mock_server, tmp_path):
+    mock_server()
+    emails = [f"lt{index}@teml.net" for index in range(1, 11)]
+    cache = expired_cache(tmp_path, emails, lambda email: "revoked")
+    fetcher = make_fetcher(10, token_cache=cache)
+    fetcher.fetch_range(1, 10)
+    assert len(fetcher.invitation_codes) == 10
+    assert fetcher.auth_counts == {'refresh_failed': 10, 'password': 10}
+    cache.close()
+
+
+def test_revoked_cached_token_is_dropped_and_refreshed(mock_server, tmp_path):
+    server = mock_server()
+    cache = TokenCache(str(tmp_path / 'tokens.db'))
+    for index in range(1, 11):
+        email = f"lt{index}@teml.net"
+        # 缓存里的token仍在有效期内，但服务端已不认（mock以401拒绝）
+        cache.put(email, f"mock.{email}.1", 3600, time.time(), f"mockrefresh.{email}")
+    fetcher = make_fetcher(10, token_cache=cache)
+    fetcher.fetch_range(1, 10)
+    assert fetcher.invitation_codes == expected_codes(fetcher, 10)
+    assert fetcher.auth_counts == {'refresh_token': 10}
+    assert server.requests('info') == 20
+    # 重新认证得到的新token写回缓存，下次运行直接命中
+    assert all(cache.get(f"lt{index}@teml.net") != f"mock.lt{index}@teml.net.1" for index in range(1, 11))
+    cache.close()
+
+
+def test_revoked_cached_token_is_refreshed_in_async_engine_and_pipeline(mock_server, tmp_path):
+    mock_server()
+    cache = TokenCache(str(tmp_path / 'tokens.db'))
+    for index in range(1, 21):
+        email = f"lt{index}@teml.net"
+        cache.put(email, f"mock.{email}.1", 3600, time.time(), f"mockrefresh.{email}")
+    fetcher = make_fetcher(10, token_cache=cache)
+    asyncio.run(fetcher._run_fetch_async())
+    assert fetcher.auth_counts == {'refresh_token': 10}
+    pipelined = make_fetcher(20, token_cache=cache, pipeline=(2, 2))
+    pipelined.fetch_range(11, 20)
+    assert len(pipelined.invitation_codes) == 10
+    assert pipelined.auth_counts == {'refresh_token': 10}
+    cache.close()
+
+
+def test_transient_refresh_failure_does_not_fall_back_to_password(mock_server, tmp_path):
+    server = mock_server(fault=['token=524:1.0'])
+    emails = [f"lt{index}@teml.net" for index in range(1, 11)]
+    cache = expired_cache(tmp_path, emails, lambda email: f"mockrefresh.{email}")
+    fetcher = make_fetcher(10, token_cache=cache, retry_policy=RetryPolicy(max_attempts=1))
+    fetcher.fetch_range(1, 10)
+    # authserver过载（524）时不再追加一次昂贵的password登录
+    assert fetcher.auth_counts == {'refresh_failed': 10}
+    assert server.requests('token') == 10
+    assert {record['reason'] for record in fetcher.failures.records} == {'token_http_524'}
+    cache.close()
+
+
+
+def test_permanent_failures_are_not_retried(mock_server):
+    server = mock_server(password='another-password')
+    fetcher = make_fetcher(10)
+    fetcher.fetch_range(1, 10)
+    assert fetcher.invitation_codes == {}
+    assert len(fetcher.failed_accounts) == 10
+    # 400密码错误是确定性失败，每个账户只请求一次
+    assert server.requests('token') == 10
+    assert {record['reason'] for record in fetcher.failures.records} == {'token_http_400'}
+
+
+def test_transient_failures_are_retried_until_success(mock_server):
+    server = mock_server(fault=['info=524:0.2'])
+    fetcher = make_fetcher(40, retry_policy=RetryPolicy(8, 0.01, 0.05))
+    fetcher.fetch_range(1, 40)
+    assert fetcher.invitation_codes == expected_codes(fetcher, 40)
+    assert fetcher.failed_accounts == []
+    assert fetcher.retry_counts['scheduled'] > 0
+    assert server.requests('info') > 40
+
+
+def test_pipeline_fetches_every_code(mock_server):
+    server = mock_server()
+    fetcher = make_fetcher(80, pipeline=(4, 4))
+    fetcher.fetch_range(1, 80)
+    assert fetcher.invitation_codes == expected_codes(fetcher, 80)
+    assert fetcher.failed_accounts == []
+    assert server.requests('token') == 80
+    assert server.requests('info') == 80
+
+
+def test_warm_up_opens_keep_alive_connections(mock_server):
+    server = mock_server()
+    fetcher = make_fetcher(40, workers=4)
+    stats = fetcher.warm_up(4)
+    assert stats['connections'] == {f"127.0.0.1:{server.port}": 4}
+    assert stats['requested'] == 4
+    assert server.state.accepted == 4
+    fetcher.fetch_range(1, 40)
+    assert len(fetcher.invitation_codes) == 40
+    # 计时阶段直接复用预热好的连接
+    assert server.state.accepted == 4
+
+
+def test_warm_up_is_off_by_default(mock_server, tmp_path):
+    server = mock_server()
+    (tmp_path / 'results').mkdir()
+    fetcher = make_fetcher(5)
+    assert fetcher.warmup == 0
+    fetcher.run_fetch()
+    assert server.state.requests['info']['HEAD'] == 0
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""http2_session: 多线程共用的httpx客户端对模拟服务的请求、http://地址警告、缺少依赖时的提示"""
+
+import importlib.util
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from get_invitation_codes import Config, InvitationCodeFetcher
+from http2_session import Http2Session, plaintext_urls
+from mock_server import invite_code_for
+
+
+def test_plaintext_urls():
+    assert plaintext_urls(['https://a.example/token', 'http://127.0.0.1:8900/info']) == ['http://127.0.0.1:8900/info']
+    assert plaintext_urls([]) == []
+
+
+def test_requests_from_many_threads_share_the_session(mock_server):
+    server = mock_server()
+    session = Http2Session(4)
+    try:
+        def fetch(index: int):
+            email = f"lt{index}@teml.net"
+            token = session.request('POST', server.auth_url, timeout=5,
+                                    data={'grant_type': 'password', 'username': email,
+                                          'password': Config.DEFAULT_PASSWORD}).json()['access_token']
+            response = session.request('GET', server.invitation_url, timeout=5,
+                                       headers={'authorization': f"Bearer {token}"})
+            return response.status_code, response.json()['data']['inviteCode']
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = list(executor.map(fetch, range(1, 41)))
+    finally:
+        session.close()
+    assert results == [(200, invite_code_for(f"lt{index}@teml.net")) for index in range(1, 41)]
+    # http://地址退回HTTP/1.1，连接数不超过上限
+    assert server.state.accepted <= 4
+
+
+def test_plaintext_urls_log_a_warning(caplog):
+    with caplog.at_level(logging.WARNING):
+        session = Http2Session(4, urls=['https://auth.example/connect/token', 'http://127.0.0.1:8900/info'])
+    session.close()
+    warnings = [record.getMessage() for record in caplog.records if record.levelno == logging.WARNING]
+    assert len(warnings) == 1 and 'http://127.0.0.1:8900/info' in warnings[0]
+
+
+def test_fetcher_with_http2_against_mock(mock_server, caplog):
+    server = mock_server()
+    with caplog.at_level(logging.WARNING):
+        fetcher = InvitationCodeFetcher('lt', 1, 30, 8, Config.DEFAULT_PASSWORD, http2=True, log_sample=0)
+    try:
+        fetcher.fetch_range(1, 30)
+    finally:
+        fetcher.session.close()
+    assert len(fetcher.invitation_codes) == 30
+    assert server.requests('info') == 30
+    assert any('HTTP/1.1' in record.getMessage() for record in caplog.records)
+
+
+def test_missing_h2_exits_with_install_hint(monkeypatch):
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, 'find_spec', lambda name: None if name == 'h2' else find_spec(name))
+    with pytest.raises(SystemExit, match="httpx\\[http2\\]"):
+        Http2Session(4)
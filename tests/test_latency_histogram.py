@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""latency_histogram: 对数分桶的边界、分位数精度、合并与序列化"""
+
+import pytest
+
+from latency_histogram import LatencyRecorder, LogHistogram, _bucket_index, _bucket_upper
+
+
+def test_bucket_bounds_contain_value_and_are_contiguous():
+    previous_index = -1
+    for micros in list(range(0, 5000)) + [2 ** 20 - 1, 2 ** 20, 3_000_000, 60_000_000]:
+        index = _bucket_index(micros)
+        assert index >= previous_index
+        # 值落在桶的 (上一个桶上界, 本桶上界] 区间内
+        lower = _bucket_upper(index - 1) if index else -1
+        assert lower < micros <= _bucket_upper(index)
+        previous_index = index
+
+
+def test_bucket_relative_error_is_within_one_sub_bucket():
+    for micros in (17, 100, 1234, 65_535, 999_999, 12_345_678):
+        upper = _bucket_upper(_bucket_index(micros))
+        assert (upper - micros) / micros <= 1 / 16
+
+
+def test_percentiles_of_uniform_distribution():
+    histogram = LogHistogram()
+    for millis in range(1, 1001):
+        histogram.record(millis / 1000)
+    assert histogram.count == 1000
+    for p, expected in ((50, 0.5), (90, 0.9), (99, 0.99)):
+        assert histogram.percentile(p) == pytest.approx(expected, rel=1 / 16)
+    # 分位数取桶上界，但不超过观测到的最大值
+    assert histogram.percentile(100) == pytest.approx(1.0)
+    assert histogram.mean() == pytest.approx(0.5005)
+
+
+def test_empty_histogram():
+    histogram = LogHistogram()
+    assert histogram.percentile(99) == 0.0
+    assert histogram.mean() == 0.0
+    assert LogHistogram.from_dict(histogram.to_dict()).min is None
+
+
+def test_merge_equals_recording_everything_in_one_histogram():
+    left, right, combined = LogHistogram(), LogHistogram(), LogHistogram()
+    for i, seconds in enumerate([0.003, 0.02, 0.15, 0.4, 1.2, 0.08, 0.011, 2.5]):
+        (left if i % 2 else right).record(seconds)
+        combined.record(seconds)
+    left.merge(right)
+    assert left.to_dict() == combined.to_dict()
+
+
+def test_dict_round_trip():
+    histogram = LogHistogram()
+    for seconds in (0.001, 0.05, 0.05, 0.7):
+        histogram.record(seconds)
+    restored = LogHistogram.from_dict(histogram.to_dict())
+    assert restored.to_dict() == histogram.to_dict()
+    assert restored.percentile(50) == histogram.percentile(50)
+
+
+def test_recorder_drain_and_merge_dict():
+    worker = LatencyRecorder()
+    worker.record('token', 'success', 0.06)
+    worker.record('invitation', 'success', 0.02)
+    worker.record('invitation', 'failed', 5.0)
+    shard = worker.drain()
+    assert sorted(shard) == ['invitation/failed', 'invitation/success', 'token/success']
+    # drain之后worker从空开始，下一个分片只回传增量
+    assert worker.to_dict() == {}
+
+    parent = LatencyRecorder()
+    parent.merge_dict(shard)
+    parent.merge_dict(shard)
+    assert parent.histograms[('invitation', 'success')].count == 2
+    assert parent.histograms[('invitation', 'failed')].max == 5_000_000
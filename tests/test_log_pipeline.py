@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""log_pipeline / background_writer: 日志采样、队列日志和后台落盘线程"""
+
+import io
+import logging
+import threading
+import time
+
+import background_writer
+from background_writer import BackgroundWriter
+from log_pipeline import LogSampler, setup_queue_logging
+
+
+class FlushCounter:
+    def __init__(self, fail: bool = False):
+        self.flushed = threading.Event()
+        self.count = 0
+        self.fail = fail
+
+    def flush(self):
+        self.count += 1
+        self.flushed.set()
+        if self.fail:
+            raise OSError("disk full")
+
+
+def test_sampler_every_n():
+    every_third, everything, nothing = LogSampler(3), LogSampler(1), LogSampler(0)
+    assert [every_third.hit() for _ in range(9)] == [False, False, True] * 3
+    assert all(everything.hit() for _ in range(5))
+    assert not any(nothing.hit() for _ in range(5))
+
+
+def test_queue_logging_writes_through_background_listener():
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    root.handlers = []
+    stream = io.StringIO()
+    try:
+        assert setup_queue_logging([logging.StreamHandler(stream)]) is not None
+        assert isinstance(root.handlers[0], logging.handlers.QueueHandler)
+        logging.info("✅ 账户完成")
+    finally:
+        root.handlers = saved_handlers
+        root.setLevel(saved_level)
+    # 记录由后台线程写出（listener在进程退出时由退出钩子停止）
+    deadline = time.time() + 5
+    while not stream.getvalue() and time.time() < deadline:
+        time.sleep(0.01)
+    assert stream.getvalue().rstrip().endswith("INFO - ✅ 账户完成")
+
+
+def test_queue_logging_leaves_configured_root_alone():
+    root = logging.getLogger()
+    handler = logging.NullHandler()
+    root.addHandler(handler)
+    try:
+        assert setup_queue_logging([logging.StreamHandler(io.StringIO())]) is None
+        assert handler in root.handlers
+    finally:
+        root.removeHandler(handler)
+
+
+def test_writer_flushes_on_wake_and_after_unregister_stops():
+    writer = BackgroundWriter(interval=60)
+    target = FlushCounter()
+    writer.register(target)
+    writer.wake()
+    assert target.flushed.wait(5)
+    writer.unregister(target)
+    count = target.count
+    writer.flush_all()
+    assert target.count == count
+
+
+def test_writer_survives_failing_target():
+    writer = BackgroundWriter(interval=60)
+    failing, healthy = FlushCounter(fail=True), FlushCounter()
+    writer.register(failing)
+    writer.register(healthy)
+    writer.wake()
+    assert healthy.flushed.wait(5)
+    healthy.flushed.clear()
+    writer.wake()
+    # 一个目标落盘失败不影响后台线程和其他目标
+    assert healthy.flushed.wait(5)
+    assert writer.thread.is_alive()
+
+
+def test_background_writer_is_per_process(monkeypatch):
+    writer = background_writer.background_writer()
+    assert background_writer.background_writer() is writer
+    # fork出的子进程里pid不同，重新启动一个后台线程
+    monkeypatch.setattr(background_writer, '_writer_pid', -1)
+    assert background_writer.background_writer() is not writer
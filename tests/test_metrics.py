@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""metrics: 指标渲染格式、直方图累计桶和HTTP服务的监听地址"""
+
+import json
+import urllib.request
+
+import metrics
+from metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+
+def test_counter_and_gauge_render():
+    registry = MetricsRegistry()
+    requests = registry.register(Counter("t_requests_total", "请求数", ("endpoint", "status")))
+    inflight = registry.register(Gauge("t_inflight", "在途请求数"))
+    requests.inc(endpoint="token", status=200)
+    requests.inc(2, endpoint="token", status=200)
+    requests.inc(endpoint="token", status=524)
+    inflight.inc()
+    inflight.inc()
+    inflight.dec()
+    assert registry.render().splitlines() == [
+        "# HELP t_requests_total 请求数",
+        "# TYPE t_requests_total counter",
+        't_requests_total{endpoint="token",status="200"} 3',
+        't_requests_total{endpoint="token",status="524"} 1',
+        "# HELP t_inflight 在途请求数",
+        "# TYPE t_inflight gauge",
+        "t_inflight 1",
+    ]
+    assert registry.snapshot() == {'t_requests_total': {'token,200': 3, 'token,524': 1}, 't_inflight': {'_': 1}}
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("t_latency_seconds", "延迟", ("endpoint",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, endpoint="info")
+    lines = histogram.render()[2:]
+    assert lines[:3] == [
+        't_latency_seconds_bucket{endpoint="info",le="0.1"} 1',
+        't_latency_seconds_bucket{endpoint="info",le="1"} 3',
+        't_latency_seconds_bucket{endpoint="info",le="+Inf"} 4',
+    ]
+    assert lines[3] == 't_latency_seconds_count{endpoint="info"} 4'
+    assert lines[4] == 't_latency_seconds_sum{endpoint="info"} 4.250000'
+    assert histogram.snapshot() == {'info': {'count': 4, 'sum': 4.25}}
+
+
+def test_metrics_server_binds_localhost_by_default(monkeypatch):
+    bound = []
+
+    class RecordingServer(metrics.ThreadingHTTPServer):
+        def __init__(self, address, handler):
+            bound.append(address[0])
+            super().__init__(address, handler)
+
+    monkeypatch.setattr(metrics, 'ThreadingHTTPServer', RecordingServer)
+    port = metrics.start_metrics_server(19100)
+    assert bound == ['127.0.0.1']
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics.json", timeout=5) as response:
+        assert 'loadtest_requests_total' in json.load(response)
+    # 显式指定 --metrics-host 时按指定地址监听
+    metrics.start_metrics_server(port + 1, host='0.0.0.0')
+    assert bound[-1] == '0.0.0.0'
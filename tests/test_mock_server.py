@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""mock_server: 参数解析、邀请码格式和各接口的业务逻辑"""
+
+import argparse
+import json
+import re
+from urllib.parse import urlencode
+
+import pytest
+
+import mock_server
+from mock_server import (DEFAULT_PASSWORD, MockState, handle_api, invite_code_for, parse_endpoint_options,
+                         parse_faults, parse_latency, route)
+
+
+def make_state(**overrides) -> MockState:
+    options = dict(latency=None, fault=None, capacity=None, queue_timeout=100.0, hang_seconds=300.0,
+                   password=DEFAULT_PASSWORD, token_ttl=3600, unregistered_ratio=0.0, chat_chunks=20,
+                   chat_interval=50.0)
+    options.update(overrides)
+    return MockState(argparse.Namespace(**options))
+
+
+def login(state, **form):
+    status, _, body = handle_api(state, 'token', {}, urlencode(form).encode())
+    return status, json.loads(body)
+
+
+def test_parse_latency():
+    assert parse_latency('const:20')() == pytest.approx(0.02)
+    assert 0.01 <= parse_latency('uniform:10,50')() <= 0.05
+    assert parse_latency('lognormal:80,0.5')() > 0
+    with pytest.raises(ValueError):
+        parse_latency('gamma:1')
+
+
+def test_parse_faults_and_endpoint_options():
+    assert parse_faults('524:0.02,timeout:0.01') == (('524', 0.02), ('timeout', 0.01))
+    with pytest.raises(ValueError):
+        parse_faults('boom:0.5')
+    options = parse_endpoint_options(['all=const:5', 'token=const:50'], str)
+    assert options['token'] == 'const:50'
+    assert options['info'] == 'const:5'
+    with pytest.raises(ValueError):
+        parse_endpoint_options(['invitation=const:5'], str)
+
+
+def test_route_matches_suffix_with_any_prefix():
+    assert route('/connect/token') == 'token'
+    assert route('/godgptpressure-client/api/godgpt/invitation/info?x=1') == 'info'
+    assert route('/api/godgpt/guest/chat/') == 'chat'
+    assert route('/api/unknown') == 'other'
+
+
+def test_invite_codes_are_stable_and_match_real_format():
+    code = invite_code_for('loadtestc1@test.com')
+    assert code == invite_code_for('loadtestc1@test.com')
+    # 与真实邀请码一样是7位区分大小写的字母数字
+    assert re.fullmatch(r'[A-Za-z0-9]{7}', code)
+    codes = {invite_code_for(f"loadtestc{i}@test.com") for i in range(2000)}
+    assert len(codes) == 2000
+    assert any(c.islower() for c in "".join(codes)) and any(c.isupper() for c in "".join(codes))
+
+
+def test_password_and_refresh_grants():
+    state = make_state()
+    status, token = login(state, grant_type='password', username='a@test.com', password=DEFAULT_PASSWORD)
+    assert status == 200
+    assert token['refresh_token'] == 'mockrefresh.a@test.com'
+    status, error = login(state, grant_type='password', username='a@test.com', password='wrong')
+    assert (status, error['error']) == (400, 'invalid_grant')
+
+    status, refreshed = login(state, grant_type='refresh_token', refresh_token=token['refresh_token'])
+    assert status == 200
+    assert refreshed['access_token'].startswith('mock.a@test.com.')
+    status, error = login(state, grant_type='refresh_token', refresh_token='forged')
+    assert (status, error['error']) == (400, 'invalid_grant')
+
+
+def test_info_requires_valid_bearer_token(monkeypatch):
+    state = make_state(token_ttl=60)
+    _, token = login(state, grant_type='password', username='a@test.com', password=DEFAULT_PASSWORD)
+    headers = {'authorization': f"Bearer {token['access_token']}"}
+    status, _, body = handle_api(state, 'info', headers, b'')
+    assert status == 200
+    assert json.loads(body)['data']['inviteCode'] == invite_code_for('a@test.com')
+    assert handle_api(state, 'info', {}, b'')[0] == 401
+    # 过期的token返回401
+    monkeypatch.setattr(mock_server.time, 'time', lambda: 10 ** 12)
+    assert handle_api(state, 'info', headers, b'')[0] == 401
+
+
+def test_redeem_once_per_code():
+    state = make_state()
+    _, token = login(state, grant_type='password', username='a@test.com', password=DEFAULT_PASSWORD)
+    headers = {'authorization': f"Bearer {token['access_token']}"}
+    body = json.dumps({'inviteCode': 'uSTbNld'}).encode()
+    assert json.loads(handle_api(state, 'redeem', headers, body)[2])['code'] == '20000'
+    assert json.loads(handle_api(state, 'redeem', headers, body)[2])['code'] == '40001'
+
+
+def test_unregistered_ratio_is_deterministic():
+    state = make_state(unregistered_ratio=0.3)
+    emails = [f"loadtestc{i}@test.com" for i in range(2000)]
+    registered = [state.is_registered(email) for email in emails]
+    assert registered == [state.is_registered(email) for email in emails]
+    assert 0.25 < registered.count(False) / len(emails) < 0.35
+    status, _ = login(state, grant_type='password', username=emails[registered.index(False)],
+                      password=DEFAULT_PASSWORD)
+    assert status == 400
+
+
+def test_pick_fault_probabilities(monkeypatch):
+    state = make_state(fault=['info=524:0.1,timeout:0.2'])
+    rolls = iter([0.05, 0.15, 0.29, 0.5, 0.0])
+    monkeypatch.setattr(mock_server.random, 'random', lambda: next(rolls))
+    assert [state.pick_fault('info') for _ in range(4)] == ['524', 'timeout', 'timeout', None]
+    assert state.pick_fault('token') is None
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""monitor_engine: 从结果索引库统计进度与速率、watchdog变更通知、未安装watchdog时退回轮询"""
+
+import sys
+import time
+
+import pytest
+
+import monitor_engine
+from code_store import CodeStore
+from monitor_engine import RunMonitor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = time.time()
+
+    def time(self):
+        return self.now
+
+
+def add_results(results_dir, succeeded: int, failed: int = 0, start: int = 1):
+    store = CodeStore(str(results_dir / 'code_store.db'))
+    for index in range(start, start + succeeded):
+        store.add('mon', index, f"mon{index}@teml.net", f"C{index:06d}")
+    for index in range(start + succeeded, start + succeeded + failed):
+        store.add('mon', index, f"mon{index}@teml.net", None, 'token_timeout')
+    store.close()
+
+
+@pytest.fixture
+def no_watchdog(monkeypatch):
+    # sys.modules中的None会让import抛出ImportError，与未安装watchdog时一样
+    for name in ('watchdog', 'watchdog.events', 'watchdog.observers'):
+        monkeypatch.setitem(sys.modules, name, None)
+
+
+def test_rates_follow_code_store_progress(tmp_path, monkeypatch, no_watchdog):
+    clock = FakeClock()
+    monkeypatch.setattr(monitor_engine, 'time', clock)
+    monitor = RunMonitor('mon', str(tmp_path), since=0)
+    try:
+        first = monitor.poll()
+        assert (first['attempted'], first['codes'], first['recent_attempt_rate']) == (0, 0, 0.0)
+        assert first['success_rate'] == 0.0 and first['live'] is None
+
+        add_results(tmp_path, succeeded=8, failed=2)
+        clock.now += 2
+        second = monitor.poll()
+        assert (second['attempted'], second['succeeded'], second['codes']) == (10, 8, 8)
+        assert second['success_rate'] == 80.0
+        assert second['recent_attempt_rate'] == 5.0 and second['recent_code_rate'] == 4.0
+
+        # 速率只按两次poll之间新增的账户计算
+        add_results(tmp_path, succeeded=4, start=11)
+        clock.now += 4
+        third = monitor.poll()
+        assert third['attempted'] == 14
+        assert third['recent_attempt_rate'] == 1.0 and third['recent_code_rate'] == 1.0
+    finally:
+        monitor.close()
+
+
+def test_since_excludes_earlier_results(tmp_path, no_watchdog):
+    add_results(tmp_path, succeeded=5)
+    monitor = RunMonitor('mon', str(tmp_path), since=time.time() + 60)
+    try:
+        assert monitor.poll()['attempted'] == 0
+    finally:
+        monitor.close()
+
+
+def test_falls_back_to_polling_without_watchdog(tmp_path, no_watchdog):
+    monitor = RunMonitor('mon', str(tmp_path), since=0)
+    try:
+        assert monitor.watcher is None and monitor.mode == "轮询"
+        assert monitor.poll()['codes'] == 0
+        # 没有变更通知时每次poll都查询索引库
+        add_results(tmp_path, succeeded=3)
+        assert monitor.poll()['codes'] == 3
+    finally:
+        monitor.close()
+
+
+def test_watchdog_change_triggers_requery(tmp_path):
+    pytest.importorskip('watchdog')
+    monitor = RunMonitor('mon', str(tmp_path), since=0)
+    try:
+        assert monitor.mode == "watchdog"
+        assert monitor.poll()['codes'] == 0
+        add_results(tmp_path, succeeded=6)
+        deadline = time.time() + 5
+        while monitor.poll()['codes'] != 6 and time.time() < deadline:
+            time.sleep(0.05)
+        assert monitor.poll()['codes'] == 6
+    finally:
+        monitor.close()
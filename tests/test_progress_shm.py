@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""progress_shm: 进度槽位的写入、跨进程汇总和越界保护"""
+
+import multiprocessing
+
+import pytest
+
+import progress_shm
+from progress_shm import ProgressBoard
+
+
+@pytest.fixture(autouse=True)
+def shm_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(progress_shm, '_SHM_DIR', str(tmp_path))
+
+
+def _work_in_child(name, slot_index, count):
+    board = ProgressBoard.attach(name)
+    slot = board.slot(slot_index)
+    for i in range(count):
+        slot.dispatched()
+        slot.request_started()
+        slot.request_finished()
+        slot.finished(success=i % 4 != 0)
+    board.close()
+
+
+def test_slot_counters_are_published():
+    board = ProgressBoard.create('t', 2)
+    slot = board.slot(1)
+    slot.dispatched()
+    slot.dispatched()
+    slot.request_started()
+    slot.finished(True)
+    first, second = board.read()
+    assert first['attempted'] == 0
+    assert (second['attempted'], second['succeeded'], second['failed'], second['inflight']) == (2, 1, 0, 1)
+    assert second['last_update'] > 0
+    board.close()
+
+
+def test_totals_across_processes():
+    board = ProgressBoard.create('t', 3)
+    children = [multiprocessing.Process(target=_work_in_child, args=('t', slot, 100)) for slot in range(3)]
+    for child in children:
+        child.start()
+    for child in children:
+        child.join(10)
+    totals = board.totals()
+    assert (totals['attempted'], totals['succeeded'], totals['failed'], totals['inflight']) == (300, 225, 75, 0)
+    assert totals['active_workers'] == 3
+    board.close()
+
+
+def test_out_of_range_slot_is_rejected():
+    board = ProgressBoard.create('t', 2)
+    # 槽位数不够时不能让两个写入进程共用一个槽位
+    with pytest.raises(IndexError):
+        board.slot(2)
+    with pytest.raises(IndexError):
+        board.slot(-1)
+    board.close()
+
+
+def test_owner_close_removes_board():
+    board = ProgressBoard.create('t', 1)
+    reader = ProgressBoard.attach('t')
+    reader.close()
+    board.close()
+    with pytest.raises(FileNotFoundError):
+        ProgressBoard.attach('t')
+
+
+def test_attach_rejects_foreign_file(tmp_path):
+    (tmp_path / 'foreign.bin').write_bytes(b'NOTPROG!' + bytes(8))
+    with pytest.raises(ValueError):
+        ProgressBoard.attach('foreign')
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""rate_limiter: 共享令牌桶的突发量、预约等待时间和跨实例/跨进程共享"""
+
+import multiprocessing
+import os
+
+import pytest
+
+from rate_limiter import EndpointRateLimits, SharedTokenBucket
+
+
+def _reserve_in_child(name, directory, queue):
+    bucket = SharedTokenBucket(name, 10, burst=2, directory=directory)
+    queue.put(bucket.reserve())
+    bucket.close()
+
+
+def test_burst_then_waits_grow_by_one_interval(tmp_path):
+    bucket = SharedTokenBucket('t', 10, burst=2, directory=str(tmp_path))
+    waits = [bucket.reserve() for _ in range(4)]
+    assert waits[:2] == [0.0, 0.0]
+    # 预约模式：每多一个排队的请求多等 1/rate 秒
+    assert waits[2] == pytest.approx(0.1, abs=0.01)
+    assert waits[3] == pytest.approx(0.2, abs=0.01)
+    bucket.close()
+
+
+def test_default_burst_is_a_fifth_of_a_second(tmp_path):
+    for rate, burst in ((50, 10), (2, 1)):
+        bucket = SharedTokenBucket(f"rate{rate}", rate, directory=str(tmp_path))
+        assert bucket.burst == burst
+        bucket.close()
+
+
+def test_rate_must_be_positive(tmp_path):
+    with pytest.raises(ValueError):
+        SharedTokenBucket('t', 0, directory=str(tmp_path))
+
+
+def test_same_name_shares_one_budget(tmp_path):
+    first = SharedTokenBucket('shared', 10, burst=2, directory=str(tmp_path))
+    second = SharedTokenBucket('shared', 10, burst=2, directory=str(tmp_path))
+    assert first.reserve() == 0.0
+    assert second.reserve() == 0.0
+    assert first.reserve() > 0
+    other = SharedTokenBucket('other', 10, burst=2, directory=str(tmp_path))
+    assert other.reserve() == 0.0
+    for bucket in (first, second, other):
+        bucket.close()
+
+
+def test_budget_is_shared_across_processes(tmp_path):
+    bucket = SharedTokenBucket('procs', 10, burst=2, directory=str(tmp_path))
+    bucket.reserve()
+    bucket.reserve()
+    queue = multiprocessing.Queue()
+    child = multiprocessing.Process(target=_reserve_in_child, args=('procs', str(tmp_path), queue))
+    child.start()
+    child.join(10)
+    assert queue.get(timeout=5) > 0
+    bucket.close()
+
+
+def test_endpoint_limits_only_throttle_configured_endpoints():
+    limits = EndpointRateLimits(auth_qps=5, api_qps=0, namespace='pytest_endpoint_limits')
+    assert set(limits.buckets) == {'auth'}
+    assert limits.describe() == 'auth 5 QPS'
+    # 未配置预算的端点直接放行
+    limits.acquire('invitation')
+    for bucket in limits.buckets.values():
+        bucket.close()
+        os.unlink(bucket.path)
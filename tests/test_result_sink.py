@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""result_sink: 增量结果文件的写入与按偏移增量读取"""
+
+import os
+
+from result_sink import ResultSink, SinkReader, merge_codes
+
+
+def test_reader_returns_only_new_complete_lines(tmp_path):
+    path = tmp_path / 'codes.ndjson'
+    path.write_text('{"e": "a@test.com", "c": "AAAAAAA", "t": 1}\n{"e": "b@test.com"')
+    reader = SinkReader(str(path))
+    assert [record['e'] for record in reader.read_new()] == ['a@test.com']
+    # 写了一半的行留到补全后再读
+    assert reader.read_new() == []
+    with open(path, 'a') as f:
+        f.write(', "c": "BBBBBBB", "t": 2}\n')
+    assert reader.read_new() == [{'e': 'b@test.com', 'c': 'BBBBBBB', 't': 2}]
+    assert reader.offset == path.stat().st_size
+
+
+def test_reader_restarts_when_file_is_replaced(tmp_path):
+    path = tmp_path / 'codes.ndjson'
+    path.write_text('{"e": "a@test.com", "c": "AAAAAAA"}\n{"e": "b@test.com", "c": "BBBBBBB"}\n')
+    reader = SinkReader(str(path))
+    assert len(reader.read_new()) == 2
+    path.write_text('{"e": "c@test.com", "c": "CCCCCCC"}\n')
+    assert reader.read_new() == [{'e': 'c@test.com', 'c': 'CCCCCCC'}]
+
+
+def test_from_end_skips_existing_records(tmp_path):
+    path = tmp_path / 'codes.ndjson'
+    path.write_text('{"e": "a@test.com", "c": "AAAAAAA"}\n')
+    reader = SinkReader.from_end(str(path))
+    assert reader.read_new() == []
+    assert SinkReader.from_end(str(tmp_path / 'missing.ndjson')).offset == 0
+
+
+def test_sink_and_merge_codes(tmp_path):
+    path = str(tmp_path / 'codes.ndjson')
+    sink = ResultSink(path)
+    sink.add('a@test.com', 'AAAAAAA')
+    sink.add('b@test.com', 'BBBBBBB')
+    sink.close()
+    first_size = os.path.getsize(path)
+    sink = ResultSink(path)
+    sink.add('a@test.com', 'ZZZZZZZ')
+    sink.close()
+
+    assert merge_codes(path) == {'a@test.com': 'ZZZZZZZ', 'b@test.com': 'BBBBBBB'}
+    assert merge_codes(path, first_size) == {'a@test.com': 'ZZZZZZZ'}
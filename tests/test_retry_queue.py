@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""retry_queue: 瞬时失败判定、退避时间和延迟重试任务流"""
+
+import pytest
+
+import retry_queue
+from retry_queue import POLL_INTERVAL, RetryPolicy, RetryScheduler, is_transient
+
+
+@pytest.mark.parametrize("failure, expected", [
+    (500, True), (502, True), (524, True), (429, True), (408, True),
+    (400, False), (401, False), (404, False),
+    ('timeout', True), ('connection', True), ('no_code', False), ('error', False), (None, False),
+])
+def test_is_transient(failure, expected):
+    assert is_transient(failure) is expected
+
+
+def test_should_retry_respects_max_attempts():
+    policy = RetryPolicy(max_attempts=3)
+    assert policy.should_retry(524, 1)
+    assert policy.should_retry(524, 2)
+    assert not policy.should_retry(524, 3)
+    assert not policy.should_retry(400, 1)
+    assert not RetryPolicy(max_attempts=1).should_retry('timeout', 1)
+
+
+def test_delay_is_exponential_with_half_jitter_and_capped(monkeypatch):
+    policy = RetryPolicy(base_delay=1.0, max_delay=30.0)
+    # 抖动取下界时等待时间是退避的一半，取上界时是完整退避
+    monkeypatch.setattr(retry_queue.random, 'uniform', lambda low, high: low)
+    assert [policy.delay(attempt) for attempt in (1, 2, 3)] == [0.5, 1.0, 2.0]
+    monkeypatch.setattr(retry_queue.random, 'uniform', lambda low, high: high)
+    assert [policy.delay(attempt) for attempt in (1, 2, 3)] == [1.0, 2.0, 4.0]
+    assert policy.delay(10) == 30.0
+
+
+def test_scheduler_yields_new_indices_in_order():
+    scheduler = RetryScheduler([1, 2, 3], RetryPolicy())
+    assert [scheduler.next_task()[0] for _ in range(3)] == [(1, 1), (2, 1), (3, 1)]
+    # 首次任务取完但仍有在途任务：让调用方稍后再取
+    assert scheduler.next_task() == (None, POLL_INTERVAL)
+    for _ in range(3):
+        scheduler.task_done()
+    assert scheduler.next_task() == (None, None)
+
+
+def test_due_retry_runs_before_new_indices():
+    scheduler = RetryScheduler([1, 2, 3], RetryPolicy(base_delay=0))
+    task, _ = scheduler.next_task()
+    assert task == (1, 1)
+    scheduler.retry(*task)
+    scheduler.task_done()
+    assert scheduler.next_task()[0] == (1, 2)
+    assert scheduler.next_task()[0] == (2, 1)
+
+
+def test_pending_retry_keeps_stream_open_until_due():
+    scheduler = RetryScheduler([7], RetryPolicy(base_delay=60))
+    task, _ = scheduler.next_task()
+    scheduler.retry(*task)
+    scheduler.task_done()
+    task, wait = scheduler.next_task()
+    assert task is None
+    assert 0 < wait <= POLL_INTERVAL
+
+
+def test_tasks_drains_retries_until_every_task_is_done():
+    scheduler = RetryScheduler(range(1, 4), RetryPolicy(max_attempts=3, base_delay=0))
+    seen = []
+    for index, attempt in scheduler.tasks():
+        seen.append((index, attempt))
+        # 索引2一直失败，直到用完尝试次数
+        if index == 2 and scheduler.policy.should_retry(524, attempt):
+            scheduler.retry(index, attempt)
+        scheduler.task_done()
+    assert sorted(seen) == [(1, 1), (2, 1), (2, 2), (2, 3), (3, 1)]
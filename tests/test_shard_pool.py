@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""shard_pool: 分片切分、长驻进程池对模拟服务的端到端获取、worker输出开关"""
+
+import os
+
+import pytest
+
+import shard_pool
+from code_store import CodeStore
+from get_invitation_codes import Config
+from latency_histogram import LatencyRecorder
+from mock_server import invite_code_for
+from shard_pool import run_sharded, split_ranges
+
+
+def expected_codes(start: int, end: int):
+    return {f"lt{index}@teml.net": invite_code_for(f"lt{index}@teml.net") for index in range(start, end + 1)}
+
+
+def test_split_ranges_covers_range_with_last_shard_truncated():
+    assert split_ranges(1, 10, 4) == [(1, 1, 4), (2, 5, 8), (3, 9, 10)]
+    assert split_ranges(5, 5, 100) == [(1, 5, 5)]
+    assert split_ranges(1, 0, 10) == []
+
+
+def test_run_sharded_collects_every_code(mock_server):
+    # Linux默认fork启动worker，模拟服务的地址（Config上的monkeypatch）会被继承
+    mock_server()
+    done = []
+    latency = LatencyRecorder()
+    codes, failed = run_sharded('lt', split_ranges(1, 60, 20), processes=2, workers=4, token_cache_path=None,
+                                latency=latency, on_shard_done=lambda *args: done.append(args))
+    assert codes == expected_codes(1, 60)
+    assert failed == []
+    assert sorted(shard_id for shard_id, *_ in done) == [1, 2, 3]
+    assert all(error is None for _, _, _, error, _, _ in done)
+    assert latency.histograms[('invitation', 'success')].count == 60
+
+
+def test_run_sharded_passes_urls_and_output_switches_to_workers(mock_server, monkeypatch, tmp_path):
+    server = mock_server()
+    # 父进程的Config指向不可达地址：worker只能用显式传入的地址（与spawn启动时一样不依赖继承）
+    monkeypatch.setattr(Config, 'AUTH_URL', 'http://127.0.0.1:9/connect/token')
+    monkeypatch.setattr(Config, 'INVITATION_CODE_URL', 'http://127.0.0.1:9/invitation/info')
+    codes, failed = run_sharded('lt', split_ranges(1, 40, 10), processes=2, workers=4, auth_url=server.auth_url,
+                                invitation_url=server.invitation_url, token_cache_path=None, checkpoint=False,
+                                result_sink=False, code_store_path=None)
+    assert codes == expected_codes(1, 40)
+    assert failed == []
+    # 只剩worker日志，没有断点日志、增量结果文件和结果索引库
+    assert all(name.startswith('shard_worker_') for name in os.listdir(tmp_path / 'results'))
+
+
+def test_resume_requires_store_or_checkpoint():
+    with pytest.raises(ValueError):
+        run_sharded('lt', split_ranges(1, 10, 10), processes=1, workers=1, code_store_path=None, resume=True)
+
+
+def test_resume_reads_successes_from_code_store(mock_server, tmp_path):
+    server = mock_server()
+    store = CodeStore(str(tmp_path / 'store.db'))
+    for index in range(1, 11):
+        store.add('lt', index, f"lt{index}@teml.net", invite_code_for(f"lt{index}@teml.net"))
+    store.close()
+    codes, failed = run_sharded('lt', split_ranges(1, 20, 10), processes=1, workers=4, token_cache_path=None,
+                                code_store_path=str(tmp_path / 'store.db'), resume=True)
+    assert codes == expected_codes(1, 20)
+    assert failed == []
+    # 已在结果索引库中的账户不再请求；默认不写断点日志和增量结果文件
+    assert server.requests('info') == 10
+    assert not any(name.endswith(('.jsonl', '.ndjson')) for name in os.listdir(tmp_path / 'results'))
+
+
+def test_worker_results_are_cleared_after_each_shard(mock_server, monkeypatch):
+    mock_server()
+    sent = []
+
+    class Queue:
+        def put(self, message):
+            sent.append(message)
+
+    # 在测试进程内直接初始化worker状态：不接管根日志，测试结束后还原模块级全局变量
+    monkeypatch.setattr(shard_pool, 'setup_queue_logging', lambda handlers: None)
+    for name in ('_fetcher', '_result_queue', '_resume'):
+        monkeypatch.setattr(shard_pool, name, None)
+    shard_pool._init_worker('lt', 4, Config.DEFAULT_PASSWORD, (Config.AUTH_URL, Config.INVITATION_CODE_URL), None,
+                            False, False, None, 0, (0, 0), False, None, '127.0.0.1', None, False, False, False,
+                            None, Queue())
+    shard_pool._fetch_shard((1, 1, 20))
+    shard_pool._fetch_shard((2, 21, 30))
+    fetcher = shard_pool._fetcher
+    # 结果都已经回传，常驻worker自身不再保留
+    assert fetcher.invitation_codes == {} and fetcher.failed_accounts == [] and len(fetcher.failures) == 0
+    returned = [email for kind, _, payload in sent if kind == 'results' for email, _, _ in payload]
+    assert sorted(returned) == sorted(expected_codes(1, 30))
+    assert [payload[:3] for kind, _, payload in sent if kind == 'done'] == [(1, 1, 20), (2, 21, 30)]
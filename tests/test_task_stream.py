@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""task_stream: 有界提交下未完成future数的上限与结果完整性"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from task_stream import submit_bounded
+
+
+class PendingProbe:
+    """记录同一时刻提交但未完成的任务数的峰值"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.peak = 0
+
+    def items(self, count):
+        for item in range(count):
+            with self.lock:
+                self.pending += 1
+                self.peak = max(self.peak, self.pending)
+            yield item
+
+    def work(self, item):
+        time.sleep(0.001)
+        with self.lock:
+            self.pending -= 1
+        return item * 2
+
+
+def test_every_item_is_processed_once():
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = [future.result() for future in submit_bounded(executor, lambda x: x * 2, range(1000), 8)]
+    assert sorted(results) == [x * 2 for x in range(1000)]
+
+
+def test_pending_futures_never_exceed_limit():
+    probe = PendingProbe()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = [future.result() for future in submit_bounded(executor, probe.work, probe.items(200), 6)]
+    assert len(results) == 200
+    # 生成器先产出下一项才会等待，峰值最多比上限多1
+    assert probe.peak <= 7
+
+
+def test_items_are_consumed_lazily():
+    consumed = []
+
+    def items():
+        for item in range(10_000):
+            consumed.append(item)
+            yield item
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        stream = submit_bounded(executor, lambda x: x, items(), 4)
+        next(stream)
+        assert len(consumed) <= 6
+        stream.close()
+
+
+def test_callable_limit_is_reevaluated():
+    probe = PendingProbe()
+    limit = {'value': 2}
+
+    def items():
+        for item in probe.items(100):
+            if item == 50:
+                limit['value'] = 10
+            yield item
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(submit_bounded(executor, probe.work, items(), lambda: limit['value']))
+    assert len(results) == 100
+    assert 3 < probe.peak <= 11
+
+
+def test_zero_limit_still_makes_progress():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert len(list(submit_bounded(executor, lambda x: x, range(5), lambda: 0))) == 5
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""token_cache: 过期判定、refresh_token保留、作废、内存查找与后台落盘"""
+
+import logging
+import time
+
+import pytest
+
+from token_cache import TokenCache
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / 'tokens.db')
+
+
+@pytest.fixture
+def cache(cache_path):
+    cache = TokenCache(cache_path, expiry_margin=300)
+    yield cache
+    cache.close()
+
+
+def test_is_valid_applies_expiry_margin(cache):
+    now = 1_000_000.0
+    assert cache.is_valid(3600, now - 3000, now)
+    # 剩余不足300秒的安全余量视为已过期
+    assert not cache.is_valid(3600, now - 3400, now)
+    assert not cache.is_valid(3600, now - 4000, now)
+
+
+def test_lookup_hit_miss_and_expired(cache):
+    now = time.time()
+    cache.put('fresh@test.com', 'access-fresh', 3600, now, 'refresh-fresh')
+    cache.put('expired@test.com', 'access-old', 3600, now - 3500, 'refresh-old')
+
+    assert cache.lookup('fresh@test.com') == ('access-fresh', 'refresh-fresh')
+    # 过期的token不返回，但refresh_token仍可用于刷新
+    assert cache.lookup('expired@test.com') == (None, 'refresh-old')
+    assert cache.lookup('missing@test.com') == (None, None)
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_put_without_refresh_token_keeps_the_previous_one(cache_path):
+    cache = TokenCache(cache_path)
+    cache.put('a@test.com', 'access-1', 3600, refresh_token='refresh-1')
+    cache.put('a@test.com', 'access-2', 3600)
+    assert cache.lookup('a@test.com') == ('access-2', 'refresh-1')
+    cache.close()
+    # 落盘后的COALESCE与内存中的合并结果一致
+    reloaded = TokenCache(cache_path)
+    assert reloaded.lookup('a@test.com') == ('access-2', 'refresh-1')
+    reloaded.close()
+
+
+def test_put_ignores_empty_access_token(cache):
+    cache.put('a@test.com', '', 3600)
+    assert cache.stats()['total'] == 0
+
+
+def test_put_without_expires_in_uses_default_ttl_and_warns_once(cache, caplog):
+    now = time.time()
+    with caplog.at_level(logging.WARNING):
+        cache.put('a@test.com', 'access-a', None, now)
+        cache.put('b@test.com', 'access-b', 0, now)
+    assert cache.entries['a@test.com'][1] == TokenCache.DEFAULT_EXPIRES_IN
+    assert cache.get('b@test.com') == 'access-b'
+    assert len([record for record in caplog.records if 'expires_in' in record.getMessage()]) == 1
+
+
+def test_invalidate_drops_access_token_but_keeps_refresh_token(cache_path):
+    cache = TokenCache(cache_path)
+    cache.put('a@test.com', 'access-a', 3600, refresh_token='refresh-a')
+    cache.invalidate('a@test.com')
+    cache.invalidate('missing@test.com')
+    assert cache.lookup('a@test.com') == (None, 'refresh-a')
+    assert cache.stats() == {'total': 1, 'valid': 0, 'refreshable': 1}
+    cache.close()
+    # 作废状态会落盘，下次运行不会再用被吊销的token
+    reloaded = TokenCache(cache_path)
+    assert reloaded.lookup('a@test.com') == (None, 'refresh-a')
+    reloaded.close()
+
+
+def test_tokens_are_preloaded_across_instances(cache_path):
+    first = TokenCache(cache_path)
+    first.put('a@test.com', 'access-a', 3600, refresh_token='refresh-a')
+    first.close()
+
+    second = TokenCache(cache_path)
+    assert second.entries['a@test.com'][0] == 'access-a'
+    assert second.get('a@test.com') == 'access-a'
+    second.close()
+
+
+def test_background_writer_flushes_full_batches(cache, cache_path, monkeypatch):
+    monkeypatch.setattr(TokenCache, 'FLUSH_EVERY', 5)
+    for i in range(5):
+        cache.put(f"user{i}@test.com", f"access-{i}", 3600)
+    # 攒满一个批次后由后台线程写入，请求线程不等待
+    deadline = time.time() + 5
+    while cache.pending and time.time() < deadline:
+        time.sleep(0.01)
+    assert not cache.pending
+    reader = TokenCache(cache_path)
+    assert len(reader.entries) == 5
+    reader.close()
+
+
+def test_valid_entries_and_stats(cache):
+    now = time.time()
+    cache.put('fresh@test.com', 'access-fresh', 3600, now, 'refresh-fresh')
+    cache.put('expired@test.com', 'access-old', 3600, now - 7200)
+    entries = cache.valid_entries()
+    assert list(entries) == ['fresh@test.com']
+    assert entries['fresh@test.com'] == {'access_token': 'access-fresh', 'expires_at': int(now + 3600)}
+    assert cache.stats() == {'total': 2, 'valid': 1, 'refreshable': 1}
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bearer Token 本地缓存
+按账户持久化 access_token / refresh_token / expires_in / 签发时间，跨运行复用未过期的token，
+过期后可用refresh_token刷新，避免每次运行都对 /connect/token 发起password模式登录
+（authserver是压测链路最薄弱的一环）
+
+用法:
+    python3 token_cache.py stats
+    python3 token_cache.py export-k6 --out results/token_cache_k6.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from background_writer import background_writer
+
+
+class TokenCache:
+    """基于SQLite(WAL)的token缓存，线程安全，多进程可同时读写
+    启动时把全部token读进内存，lookup只查字典；put只更新字典和待写入列表，由后台落盘线程批量写SQLite
+    """
+
+    DEFAULT_PATH = "results/token_cache.db"
+    # 距离过期不足该秒数的token视为已过期，避免请求途中失效
+    EXPIRY_MARGIN = 300
+    # 累计多少条待写入记录后唤醒后台线程落盘（否则按后台线程的时间间隔落盘）
+    FLUSH_EVERY = 200
+    # 登录响应缺少expires_in时假定的有效期（秒）；实际有效期更短时，token被401拒绝后会由invalidate清除
+    DEFAULT_EXPIRES_IN = 3600
+
+    def __init__(self, path: str = DEFAULT_PATH, expiry_margin: int = EXPIRY_MARGIN):
+        self.path = path
+        self.expiry_margin = expiry_margin
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS tokens (
+                account      TEXT PRIMARY KEY,
+                access_token TEXT NOT NULL,
+                expires_in   INTEGER NOT NULL,
+                issued_at    REAL NOT NULL
+            )
+        """)
+        # 兼容旧版本缓存文件：补充refresh_token列
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(tokens)")]
+        if 'refresh_token' not in columns:
+            self.conn.execute("ALTER TABLE tokens ADD COLUMN refresh_token TEXT")
+        self.conn.commit()
+
+        # {account: (access_token, expires_in, issued_at, refresh_token)}
+        self.entries: Dict[str, Tuple[str, int, float, Optional[str]]] = {
+            row[0]: row[1:] for row in self.conn.execute(
+                "SELECT account, access_token, expires_in, issued_at, refresh_token FROM tokens")
+        }
+        # lock只保护内存字典、待写入列表和计数；write_lock串行化SQLite连接的使用
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.pending: List[Tuple[str, str, int, float, Optional[str]]] = []
+        self.hits = 0
+        self.misses = 0
+        self.warned_default_ttl = False
+        self.writer = background_writer()
+        self.writer.register(self)
+
+    def is_valid(self, expires_in: int, issued_at: float, now: Optional[float] = None) -> bool:
+        """判断token在安全余量内是否仍然有效"""
+        now = time.time() if now is None else now
+        return issued_at + expires_in - self.expiry_margin > now
+
+    def lookup(self, account: str) -> Tuple[Optional[str], Optional[str]]:
+        """返回 (仍有效的access_token, refresh_token)，access_token未命中或即将过期时为None"""
+        with self.lock:
+            entry = self.entries.get(account)
+            if entry and self.is_valid(entry[1], entry[2]):
+                self.hits += 1
+                return entry[0], entry[3]
+            self.misses += 1
+            return None, (entry[3] if entry else None)
+
+    def get(self, account: str) -> Optional[str]:
+        """返回账户仍有效的access_token，未命中或即将过期返回None"""
+        return self.lookup(account)[0]
+
+    def put(self, account: str, access_token: str, expires_in: int, issued_at: Optional[float] = None,
+            refresh_token: Optional[str] = None):
+        """写入新获取的token（后台批量落盘）；refresh_token为空时保留已有的refresh_token，
+        expires_in为空时按 DEFAULT_EXPIRES_IN 缓存（只警告一次）
+        """
+        if not access_token:
+            return
+        if not expires_in:
+            expires_in = self.DEFAULT_EXPIRES_IN
+            if not self.warned_default_ttl:
+                self.warned_default_ttl = True
+                logging.warning(f"⚠️ 登录响应中没有expires_in（{account}），按 {expires_in} 秒有效期缓存")
+        issued_at = time.time() if issued_at is None else issued_at
+        with self.lock:
+            previous = self.entries.get(account)
+            self.entries[account] = (access_token, int(expires_in), issued_at,
+                                     refresh_token or (previous[3] if previous else None))
+            self.pending.append((account, access_token, int(expires_in), issued_at, refresh_token))
+            full = len(self.pending) >= self.FLUSH_EVERY
+        if full:
+            self.writer.wake()
+
+    def invalidate(self, account: str):
+        """作废账户的access_token（服务端已吊销、以401拒绝时调用），保留refresh_token供下次刷新"""
+        with self.lock:
+            entry = self.entries.get(account)
+            if entry is None:
+                return
+            # expires_in记为0即视为过期；落盘时refresh_token为空会保留库里已有的值
+            self.entries[account] = (entry[0], 0, entry[2], entry[3])
+            self.pending.append((account, entry[0], 0, entry[2], None))
+
+    def flush(self):
+        """把待写入的token落盘"""
+        with self.write_lock:
+            with self.lock:
+                pending, self.pending = self.pending, []
+            if not pending or self.conn is None:
+                return
+            self.conn.executemany("""
+                INSERT INTO tokens (account, access_token, expires_in, issued_at, refresh_token)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(account) DO UPDATE SET
+                    access_token  = excluded.access_token,
+                    expires_in    = excluded.expires_in,
+                    issued_at     = excluded.issued_at,
+                    refresh_token = COALESCE(excluded.refresh_token, tokens.refresh_token)
+            """, pending)
+            self.conn.commit()
+
+    def close(self):
+        """落盘并关闭连接"""
+        self.writer.unregister(self)
+        self.flush()
+        with self.write_lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    def valid_entries(self) -> Dict[str, Dict]:
+        """导出全部仍有效的token: {account: {access_token, expires_at}}"""
+        now = time.time()
+        self.flush()
+        with self.write_lock:
+            rows = self.conn.execute("SELECT account, access_token, expires_in, issued_at FROM tokens").fetchall()
+        return {
+            account: {'access_token': token, 'expires_at': int(issued_at + expires_in)}
+            for account, token, expires_in, issued_at in rows
+            if self.is_valid(expires_in, issued_at, now)
+        }
+
+    def stats(self) -> Dict[str, int]:
+        """缓存总体统计"""
+        self.flush()
+        with self.write_lock:
+            total = self.conn.execute("SELECT COUNT(*) FROM tokens").fetchone()[0]
+            refreshable = self.conn.execute(
+                "SELECT COUNT(*) FROM tokens WHERE refresh_token IS NOT NULL"
+            ).fetchone()[0]
+        return {'total': total, 'valid': len(self.valid_entries()), 'refreshable': refreshable}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='🔐 Bearer Token 本地缓存工具')
+    parser.add_argument('--cache', default=TokenCache.DEFAULT_PATH, help='缓存文件路径')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('stats', help='查看缓存统计')
+
+    export_parser = subparsers.add_parser('export-k6', help='导出k6 auth.js可读取的token文件')
+    export_parser.add_argument('--out', default='results/token_cache_k6.json', help='输出文件路径')
+
+    args = parser.parse_args()
+    cache = TokenCache(args.cache)
+
+    if args.command == 'stats':
+        stats = cache.stats()
+        print(f"📦 缓存token总数: {stats['total']}")
+        print(f"✅ 仍有效: {stats['valid']}")
+        print(f"🔄 可刷新(含refresh_token): {stats['refreshable']}")
+    elif args.command == 'export-k6':
+        entries = cache.valid_entries()
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False)
+        print(f"📁 已导出 {len(entries)} 个有效token到: {args.out}")
+        print(f"💡 使用示例: k6 run -e TOKEN_CACHE_FILE={os.path.abspath(args.out)} xxx-qps-test.js")
+
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()